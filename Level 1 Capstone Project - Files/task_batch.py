@@ -0,0 +1,176 @@
+import argparse
+import csv
+import sys
+import time
+from task_manager_functions import open_task_store, render_tasks, \
+parse_task_date, write_reports, enable_instrumentation, instrumented, \
+TASK_STORE_BACKENDS, TASK_REPORT_FILE, USER_REPORT_FILE, INSTRUMENT_VARIABLE
+
+# Number of fields each command takes after its name
+COMMAND_FIELDS = {
+    "register": 2,
+    "assign": 4,
+    "view": (0, 1),
+    "view-archived": (0, 1),
+    "stats": 0,
+    "complete": 2,
+    "overdue": (0, 1),
+    "due-week": (0, 1),
+    "search": 1,
+    "archive": (0, 1),
+    "report": 0,
+}
+
+def run_command(store, command, fields):
+    """Handles running one command row against the task store.
+    """
+    if command == "register":
+        if not store.register_user(*fields):
+            print(f"User already registered: {fields[0]}")
+
+    elif command == "assign":
+        store.assign_task(*fields)
+
+    elif command in ("view", "view-archived"):
+        archived = command == "view-archived"
+        if fields:
+            task_count = render_tasks(store.user_tasks(fields[0].lower(),
+                                                       archived))
+        else:
+            task_count = render_tasks(store.tasks(archived))
+        if not task_count:
+            print("\nNo tasks found.\n")
+
+    elif command == "stats":
+        task_stats = store.stats()
+        print(f"\nTotal Users: {task_stats['total_users']}")
+        print(f"Total Tasks: {task_stats['total_tasks']}")
+        print(f"Completed Tasks: {task_stats['completed']}")
+        print(f"Incomplete Tasks: {task_stats['incomplete']}")
+        print(f"Overdue Tasks: {task_stats['overdue']}\n")
+
+    elif command in ("overdue", "due-week"):
+        username = fields[0].lower() if fields else None
+        if command == "overdue":
+            task_count = render_tasks(store.overdue_tasks(username))
+        else:
+            task_count = render_tasks(store.tasks_due_this_week(username))
+        if not task_count:
+            print("\nNo tasks found.\n")
+
+    elif command == "search":
+        if not render_tasks(store.search_tasks(fields[0])):
+            print("\nNo tasks found.\n")
+
+    elif command == "archive":
+        cutoff = None
+        if fields:
+            cutoff = parse_task_date(fields[0])
+            if cutoff is None:
+                raise ValueError(f"invalid date \"{fields[0]}\"")
+        print(f"Archived {store.archive_tasks(cutoff)} tasks.")
+
+    elif command == "report":
+        write_reports(store.stats(), store.login_dict)
+        print(f"Reports written to {TASK_REPORT_FILE} and "
+              f"{USER_REPORT_FILE}.")
+
+    elif command == "complete":
+        if not store.complete_task(fields[0].lower(), int(fields[1])):
+            print(f"Task already complete: {fields[0]} {fields[1]}")
+
+def run_batch(store, command_file):
+    """Handles running every command in a CSV command file, returning the
+    number of commands run and the number that failed.
+
+    Each row is a command name followed by its fields, for example
+    "assign,bob,Title,Description,12 October 2022". Blank rows and rows
+    starting with "#" are skipped.
+    """
+    command_count = 0
+    error_count = 0
+    for line_number, row in enumerate(csv.reader(command_file), 1):
+        if not row or row[0].startswith("#"):
+            continue
+
+        command = row[0].strip().lower()
+        fields = [field.strip() for field in row[1:]]
+        expected = COMMAND_FIELDS.get(command)
+        if isinstance(expected, int):
+            expected = (expected,)
+
+        # Reports bad rows and carries on with the rest of the file
+        try:
+            if expected is None:
+                raise ValueError(f"unknown command \"{command}\"")
+            if len(fields) not in expected:
+                expected = " or ".join(map(str, expected))
+                raise ValueError(f"{command} takes {expected} fields, "
+                                 f"not {len(fields)}")
+            with instrumented(f"batch {command}"):
+                run_command(store, command, fields)
+            command_count += 1
+        except KeyError as error:
+            print(f"Line {line_number}: unknown user {error}")
+            error_count += 1
+        except (ValueError, IndexError) as error:
+            print(f"Line {line_number}: {error}")
+            error_count += 1
+
+    return command_count, error_count
+
+#====Runtime Section====
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Runs task manager commands from a CSV file without "
+        "the interactive menu.")
+    parser.add_argument("commands",
+                        help = "CSV command file, or - to read standard input")
+    parser.add_argument("--directory", default = ".",
+                        help = "directory holding tasks.txt and user.txt")
+    parser.add_argument("--backend", choices = tuple(TASK_STORE_BACKENDS),
+                        default = None,
+                        help = "storage backend (default: sqlite if "
+                        "tasks.db exists, otherwise text)")
+    parser.add_argument("--batch-size", type = int, default = 1000,
+                        help = "records written per group commit")
+    parser.add_argument("--batch-seconds", type = float, default = None,
+                        help = "longest time a record waits to be committed")
+    parser.add_argument("--fsync", action = "store_true",
+                        help = "fsync tasks.txt and user.txt on every commit")
+    parser.add_argument("--workers", type = int, default = None,
+                        help = "processes used to rebuild the snapshot or "
+                        "recount statistics (default: one per CPU for large "
+                        "files)")
+    parser.add_argument("--instrument", default = None,
+                        help = "measure each command and the file helpers "
+                        "it uses: stderr or jsonl:<path> (default: "
+                        f"the {INSTRUMENT_VARIABLE} environment variable)")
+    arguments = parser.parse_args()
+    if arguments.instrument:
+        try:
+            enable_instrumentation(arguments.instrument)
+        except (ValueError, OSError) as error:
+            parser.error(str(error))
+
+    start = time.perf_counter()
+    with open_task_store(arguments.directory, arguments.backend,
+                         batch_size = arguments.batch_size,
+                         batch_seconds = arguments.batch_seconds,
+                         fsync = arguments.fsync,
+                         stats_workers = arguments.workers) as store:
+        if arguments.commands == "-":
+            results = run_batch(store, sys.stdin)
+        else:
+            with open(arguments.commands, "r", encoding = "utf-8",
+                      newline = "") as command_file:
+                results = run_batch(store, command_file)
+    elapsed = time.perf_counter() - start
+    lock_waits = store.lock_wait_stats()
+
+    print(f"Ran {results[0]} commands with {results[1]} errors "
+          f"in {elapsed:.2f} s.", file = sys.stderr)
+    print(f"Waited {lock_waits['seconds'] * 1000:.1f} ms for "
+          f"{lock_waits['waits']} file locks "
+          f"({lock_waits['max'] * 1000:.1f} ms longest).", file = sys.stderr)
@@ -0,0 +1,403 @@
+import argparse
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from task_manager_functions import format_task, iter_task_records, \
+split_task_line, convert_tasks_to_binary, load_binary_tasks, \
+recount_task_stats, login_dict_function, user_auth, render_tasks, \
+hash_password, open_task_store, import_text_files, TASKS_FILE, USERS_FILE, \
+SNAPSHOT_FILE, DATABASE_FILE, TASK_STORE_BACKENDS
+from task_generator import generate_sample_data
+
+try:
+    import resource
+except ImportError:
+    # resource is not available on Windows, where peak RSS is not reported
+    resource = None
+
+#====Sample Data Section====
+
+def write_sample_tasks(tasks_path, task_count, user_count):
+    """Handles writing a tasks.txt style file with task_count tasks spread
+    evenly across user_count users.
+    """
+    with open(tasks_path, "w", encoding = "utf-8") as task_info:
+        for task_number in range(task_count):
+            if task_number:
+                task_info.write("\n")
+            task_info.write(f"user{task_number % user_count}, "
+                            f"Task {task_number}, "
+                            f"Description for task number {task_number}, "
+                            f"12 October 2022, 01 October 2022, No")
+
+#====Listing Section====
+
+def text_listing(tasks_path, sink, username = None):
+    """Handles listing tasks with the original text-mode loop.
+    """
+    with open(tasks_path, "r", encoding = "utf-8") as task_info:
+        for line in task_info:
+            task_entry = line.strip().split(", ")
+            if username is None or task_entry[0] == username:
+                sink.write(format_task(task_entry))
+
+def mapped_listing(tasks_path, sink, username = None):
+    """Handles listing tasks with the memory-mapped reader.
+    """
+    for task_entry in iter_task_records(tasks_path, username):
+        sink.write(format_task(task_entry))
+
+def measure(listing, tasks_path, username = None):
+    """Handles timing a listing, then running it again to record its peak
+    Python allocations without tracing slowing down the timed run.
+    """
+    with open(os.devnull, "w", encoding = "utf-8") as sink:
+        start = time.perf_counter()
+        listing(tasks_path, sink, username)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        listing(tasks_path, sink, username)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak
+
+def compare_listings(tasks_path, username = None):
+    """Handles printing the time and peak memory of both listings.
+    """
+    label = "all tasks" if username is None else f"tasks for {username}"
+    print(f"\n--- Listing {label} ---")
+    for name, listing in (("text loop", text_listing),
+                          ("mmap reader", mapped_listing)):
+        elapsed, peak = measure(listing, tasks_path, username)
+        print(f"{name:<12} {elapsed:8.3f} s   peak {peak / 1024:10.1f} KiB")
+
+#====Format Section====
+
+def load_text_tasks(tasks_path):
+    """Handles parsing tasks.txt into task entry lists the way the view
+    menus do.
+    """
+    with open(tasks_path, "r", encoding = "utf-8") as task_info:
+        return [split_task_line(line) for line in task_info]
+
+def measure_load(loader, path):
+    """Handles timing a loader, then loading again under tracemalloc to
+    measure the memory held by the loaded tasks.
+    """
+    start = time.perf_counter()
+    tasks = loader(path)
+    elapsed = time.perf_counter() - start
+    task_count = len(tasks)
+    del tasks
+
+    # Keeps the loaded tasks alive until their memory has been measured
+    tracemalloc.start()
+    _ = loader(path)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, held / task_count
+
+def compare_formats(tasks_path, binary_path):
+    """Handles printing the load time and memory per task of tasks.txt and
+    the binary task format.
+    """
+    convert_tasks_to_binary(tasks_path, binary_path)
+    print("\n--- Loading every task ---")
+    for name, loader, path in (
+        ("text lists", load_text_tasks, tasks_path),
+        ("binary columns", load_binary_tasks, binary_path),
+        ("binary Tasks", lambda path: list(load_binary_tasks(path)),
+         binary_path)):
+        elapsed, per_task = measure_load(loader, path)
+        size = os.path.getsize(path) / (1024 * 1024)
+        print(f"{name:<15} {elapsed:8.3f} s   {per_task:7.1f} bytes/task"
+              f"   file {size:7.1f} MiB")
+
+#====Statistics Section====
+
+def compare_stats_workers(tasks_path, max_workers):
+    """Handles timing a full statistics recount with a doubling number of
+    worker processes, printing the speed-up over one process.
+    """
+    print("\n--- Recounting statistics ---")
+    workers = 1
+    single_elapsed = None
+    while workers <= max_workers:
+        start = time.perf_counter()
+        recount_task_stats(tasks_path, workers)
+        elapsed = time.perf_counter() - start
+        if single_elapsed is None:
+            single_elapsed = elapsed
+        print(f"{workers:>3} workers {elapsed:8.3f} s   "
+              f"speed-up {single_elapsed / elapsed:5.2f}x")
+        workers *= 2
+
+#====Suite Section====
+
+def peak_rss_kib():
+    """Handles returning the peak resident set size of this process in KiB,
+    or None where it cannot be read.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # macOS reports bytes where Linux reports KiB
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak
+
+def percentile(values, fraction):
+    """Handles returning the nearest-rank percentile of a list of values.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+def time_operation(operation, runs):
+    """Handles calling operation runs times after one cold call, returning
+    the cold time, the warm times and the number of items the last call
+    handled.
+    """
+    start = time.perf_counter()
+    item_count = operation()
+    cold_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        item_count = operation()
+        latencies.append(time.perf_counter() - start)
+    return cold_seconds, latencies, item_count
+
+def summarise(cold_seconds, latencies, item_count, unit):
+    """Handles turning the times of one operation into its JSON report.
+    """
+    total = sum(latencies)
+    return {"runs": len(latencies),
+            "items_per_run": item_count,
+            "cold_ms": round(cold_seconds * 1000, 3),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "throughput": round(item_count * len(latencies) / total, 1)
+            if total else None,
+            "unit": unit,
+            "peak_rss_kib": peak_rss_kib()}
+
+def login_operation(users_path, username, password):
+    """Handles building a login operation that logs in through user_auth()
+    with the answers fed in on standard input, as "cu" does.
+
+    The password is hashed the way register_user() stores it, so the cold
+    run derives the hash and warm runs use the verifier cache.
+    """
+    login_dict = login_dict_function(users_path)
+    login_dict[username] = hash_password(password)
+    def login():
+        stdin = sys.stdin
+        sys.stdin = io.StringIO(f"{username}\n{password}\n")
+        try:
+            with redirect_stdout(io.StringIO()):
+                user_auth(login_dict)
+        finally:
+            sys.stdin = stdin
+        return 1
+    return login
+
+def view_operation(task_entries, sink):
+    """Handles building a view operation that renders the tasks returned by
+    task_entries() into sink, as the view menus do.
+    """
+    def view():
+        return render_tasks(task_entries(), output = sink)
+    return view
+
+def run_suite(directory, runs, appends, backend = "text"):
+    """Handles timing startup, login, va, vm, vu, s and append through the
+    task store of a backend on the files in directory, returning the report
+    dictionary.
+
+    startup opens and closes the task store, on the text backend first
+    without a snapshot so the cold run scans tasks.txt, then with the
+    snapshot it saved.
+
+    The SQLite backend runs on a tasks.db in a temporary directory that is
+    deleted afterwards, so directory is never switched to SQLite. It is a
+    copy of directory's tasks.db if there is one, and otherwise imported
+    from the text files, with the import time reported.
+    """
+    report = {"backend": backend}
+    with tempfile.TemporaryDirectory() as database_directory:
+        store_directory = directory
+        if backend == "sqlite":
+            store_directory = database_directory
+            database_path = os.path.join(database_directory, DATABASE_FILE)
+            if os.path.exists(os.path.join(directory, DATABASE_FILE)):
+                copy_database(os.path.join(directory, DATABASE_FILE),
+                              database_path)
+            else:
+                start = time.perf_counter()
+                import_text_files(directory, database_path)
+                report["import_seconds"] = round(time.perf_counter() - start,
+                                                 3)
+        report.update(operations = time_operations(
+            directory, store_directory, runs, appends, backend),
+            peak_rss_kib = peak_rss_kib())
+    return report
+
+def copy_database(source_path, copy_path):
+    """Handles copying an SQLite database with SQLite's backup, which also
+    copies changes still held in its write-ahead log.
+    """
+    source = sqlite3.connect(source_path)
+    copy = sqlite3.connect(copy_path)
+    with copy:
+        source.backup(copy)
+    copy.close()
+    source.close()
+
+def time_operations(directory, store_directory, runs, appends, backend):
+    """Handles timing each suite operation for run_suite(), with users read
+    from directory and the task store opened on store_directory.
+
+    vm is timed for admin, the user with the most tasks, and vu for the
+    user listed last in user.txt, who has the fewest.
+    """
+    users_path = os.path.join(directory, USERS_FILE)
+    with open(users_path, "r", encoding = "utf-8") as user_info:
+        user_entries = [line.strip().split(", ") for line in user_info
+                        if line.strip()]
+    operations = {}
+
+    snapshot_path = os.path.join(store_directory, SNAPSHOT_FILE)
+    if os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+    def startup():
+        open_task_store(store_directory, backend).close()
+        return 1
+    operations["startup"] = summarise(*time_operation(startup, runs),
+                                      "starts/s")
+
+    operations["login"] = summarise(*time_operation(
+        login_operation(users_path, *user_entries[0]), runs), "logins/s")
+
+    with open_task_store(store_directory, backend) as store, \
+        open(os.devnull, "w", encoding = "utf-8") as sink:
+
+        for name, task_entries in (
+            ("va", store.tasks),
+            ("vm", lambda: store.user_tasks(user_entries[0][0])),
+            ("vu", lambda: store.user_tasks(user_entries[-1][0]))):
+            operations[name] = summarise(*time_operation(
+                view_operation(task_entries, sink), runs), "tasks/s")
+
+        operations["s"] = summarise(*time_operation(
+            lambda: store.stats()["total_tasks"], runs), "tasks/s")
+
+        # Each append is committed on its own, so the sidecars built by the
+        # views above are updated with it
+        append_number = [0]
+        def append():
+            append_number[0] += 1
+            store.assign_task(user_entries[-1][0],
+                              f"Benchmark task {append_number[0]}",
+                              "Appended by the benchmark suite",
+                              "12 October 2030")
+            return 1
+        latencies = [time_operation(append, 0)[0] for _ in range(appends)]
+        operations["append"] = summarise(latencies[0], latencies[1:] or
+                                         latencies, 1, "tasks/s")
+    return operations
+
+#====Runtime Section====
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Benchmarks the task manager's tasks.txt readers.")
+    parser.add_argument("benchmark",
+                        choices = ("listing", "formats", "stats", "suite"),
+                        help = "listing compares the view menu readers, "
+                        "formats compares tasks.txt with the binary format, "
+                        "stats times parallel statistics recounts and suite "
+                        "reports the menu operations as JSON")
+    parser.add_argument("--tasks", type = int, default = None,
+                        help = "number of tasks in the sample file "
+                        "(200000 for listing and suite, 1000000 for "
+                        "formats and stats)")
+    parser.add_argument("--users", type = int, default = 1000,
+                        help = "number of users the tasks are spread over")
+    parser.add_argument("--workers", type = int, default = os.cpu_count(),
+                        help = "most worker processes tried by stats")
+    parser.add_argument("--skew", type = float, default = 1.0,
+                        help = "Zipf exponent of tasks per user in the "
+                        "suite's generated files")
+    parser.add_argument("--runs", type = int, default = 20,
+                        help = "warm runs of each suite operation")
+    parser.add_argument("--appends", type = int, default = 200,
+                        help = "tasks appended by the suite")
+    parser.add_argument("--data", default = None,
+                        help = "directory of existing files for the suite "
+                        "to run against instead of generating them; on the "
+                        "text backend the appended benchmark tasks are left "
+                        "in its tasks.txt")
+    parser.add_argument("--backend", choices = tuple(TASK_STORE_BACKENDS),
+                        default = "text",
+                        help = "task store backend the suite runs on")
+    parser.add_argument("--output", default = None,
+                        help = "file the suite's JSON report is written to "
+                        "(default: standard output)")
+    arguments = parser.parse_args()
+
+    task_count = arguments.tasks
+    if task_count is None:
+        task_count = 200000 if arguments.benchmark in ("listing", "suite") \
+            else 1000000
+
+    if arguments.benchmark == "suite":
+        with tempfile.TemporaryDirectory() as sample_directory:
+            report = {"tasks": None, "users": None, "skew": arguments.skew}
+            if arguments.data is None:
+                start = time.perf_counter()
+                generate_sample_data(sample_directory, task_count,
+                                     arguments.users, arguments.skew)
+                report.update(tasks = task_count, users = arguments.users,
+                              generate_seconds = round(
+                                  time.perf_counter() - start, 3))
+                data_directory = sample_directory
+            else:
+                data_directory = arguments.data
+                report["skew"] = None
+            report["file_mib"] = round(os.path.getsize(os.path.join(
+                data_directory, TASKS_FILE)) / (1024 * 1024), 2)
+            report.update(run_suite(data_directory, arguments.runs,
+                                    arguments.appends, arguments.backend))
+
+        report_json = json.dumps(report, indent = 2)
+        if arguments.output is None:
+            print(report_json)
+        else:
+            with open(arguments.output, "w", encoding = "utf-8") as output:
+                output.write(report_json + "\n")
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as sample_directory:
+        sample_path = os.path.join(sample_directory, "tasks.txt")
+        write_sample_tasks(sample_path, task_count, arguments.users)
+        size = os.path.getsize(sample_path) / (1024 * 1024)
+        print(f"Sample file: {task_count} tasks, {size:.1f} MiB")
+
+        if arguments.benchmark == "listing":
+            compare_listings(sample_path)
+            compare_listings(sample_path, "user0")
+        elif arguments.benchmark == "stats":
+            compare_stats_workers(sample_path, arguments.workers)
+        else:
+            compare_formats(sample_path,
+                            os.path.join(sample_directory, "tasks.bin"))
@@ -0,0 +1,79 @@
+import argparse
+import os
+from task_manager_functions import TASKS_FILE, SHARDS_DIRECTORY, \
+convert_tasks_to_binary, convert_binary_to_tasks, migrate_status_field, \
+migrate_to_shards, merge_shards, import_text_files, hash_user_file, \
+hash_database_passwords, DATABASE_FILE, USERS_FILE, PASSWORD_METHODS
+
+#====Runtime Section====
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Converts task files between storage formats.")
+    parser.add_argument("conversion",
+                        choices = ("to-binary", "to-text", "fix-status",
+                                   "to-shards", "from-shards", "to-sqlite",
+                                   "hash-passwords"),
+                        help = "to-binary writes the binary task format from "
+                        "tasks.txt, to-text writes tasks.txt back out, "
+                        "fix-status pads tasks.txt statuses to a fixed "
+                        "width, to-shards splits tasks.txt into one file per "
+                        "user, from-shards joins them back together and "
+                        "to-sqlite imports user.txt and the tasks into the "
+                        "SQLite database and hash-passwords hashes the "
+                        "plaintext passwords in user.txt and the database")
+    parser.add_argument("--tasks", default = TASKS_FILE,
+                        help = "path of the tasks.txt file")
+    parser.add_argument("--binary", default = "tasks.bin",
+                        help = "path of the binary task file")
+    parser.add_argument("--shards", default = SHARDS_DIRECTORY,
+                        help = "directory of the per-user task files")
+    parser.add_argument("--database", default = DATABASE_FILE,
+                        help = "path of the SQLite database")
+    parser.add_argument("--users", default = USERS_FILE,
+                        help = "path of the user.txt file")
+    parser.add_argument("--hash", choices = tuple(PASSWORD_METHODS),
+                        default = None,
+                        help = "password hash used by hash-passwords "
+                        "(default: scrypt)")
+    parser.add_argument("--cost", type = int, default = None,
+                        help = "scrypt n or PBKDF2 iterations used by "
+                        "hash-passwords")
+    arguments = parser.parse_args()
+
+    if arguments.conversion == "to-binary":
+        convert_tasks_to_binary(arguments.tasks, arguments.binary)
+        print(f"Converted {arguments.tasks} to {arguments.binary}.")
+    elif arguments.conversion == "to-text":
+        convert_binary_to_tasks(arguments.binary, arguments.tasks)
+        print(f"Converted {arguments.binary} to {arguments.tasks}.")
+    elif arguments.conversion == "fix-status":
+        migrated = migrate_status_field(arguments.tasks)
+        print(f"Migrated {migrated} task statuses in {arguments.tasks}.")
+    elif arguments.conversion == "to-shards":
+        migrated = migrate_to_shards(arguments.tasks, arguments.shards)
+        print(f"Moved {migrated} tasks from {arguments.tasks} into "
+              f"{arguments.shards}.")
+    elif arguments.conversion == "to-sqlite":
+        directory = os.path.dirname(arguments.tasks) or "."
+        try:
+            imported = import_text_files(directory, arguments.database)
+        except ValueError as error:
+            parser.error(f"cannot import {directory}: {error}")
+        print(f"Imported {imported[0]} users and {imported[1]} tasks from "
+              f"{directory} into {arguments.database}.")
+    elif arguments.conversion == "hash-passwords":
+        hashed = hash_user_file(arguments.users, arguments.hash,
+                                arguments.cost)
+        print(f"Hashed {hashed} passwords in {arguments.users}.")
+        if os.path.exists(arguments.database):
+            hashed = hash_database_passwords(arguments.database,
+                                             arguments.hash, arguments.cost)
+            print(f"Hashed {hashed} passwords in {arguments.database}.")
+    else:
+        try:
+            merged = merge_shards(arguments.shards, arguments.tasks)
+        except ValueError as error:
+            parser.error(f"cannot merge {arguments.shards}: {error}")
+        print(f"Merged {merged} tasks from {arguments.shards} into "
+              f"{arguments.tasks}.")
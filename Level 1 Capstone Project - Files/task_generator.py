@@ -0,0 +1,117 @@
+import argparse
+import os
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+from task_manager_functions import TASKS_FILE, USERS_FILE, DATE_FORMAT, \
+STATUS_WIDTH
+
+# Words the generated titles and descriptions are made from
+TITLE_VERBS = ("Review", "Update", "Write", "Test", "Plan", "Fix", "Prepare",
+               "Check", "Send", "Organise")
+TITLE_NOUNS = ("report", "budget", "release notes", "client email",
+               "invoice", "meeting agenda", "test plan", "backlog",
+               "onboarding guide", "team rota")
+DESCRIPTION_ENDINGS = ("before the next team meeting",
+                       "and share it with the team",
+                       "using the latest figures",
+                       "and note any problems found",
+                       "so it is ready for sign off")
+
+# Number of generated lines gathered before each write
+WRITE_CHUNK_LINES = 10000
+
+def user_weights(user_count, skew):
+    """Handles returning cumulative Zipf weights for user_count users, so
+    user n gets a share of tasks proportional to 1 / n ** skew. A skew of 0
+    spreads tasks evenly.
+    """
+    return list(accumulate(1 / rank ** skew
+                           for rank in range(1, user_count + 1)))
+
+def generate_sample_data(directory, task_count, user_count = 100,
+                         skew = 1.0, complete_share = 0.4, seed = 0,
+                         today = None):
+    """Handles writing a user.txt and tasks.txt with task_count tasks spread
+    over user_count users, including admin.
+
+    Tasks are assigned over the year before today and fall due up to 90 days
+    after they were assigned, so a realistic share of them is overdue.
+    complete_share of the tasks are marked complete. The same seed always
+    produces the same files.
+    """
+    generator = random.Random(seed)
+    if today is None:
+        today = date.today()
+    usernames = ["admin"] + [f"user{user_number}"
+                             for user_number in range(1, user_count)]
+
+    with open(os.path.join(directory, USERS_FILE), "w",
+              encoding = "utf-8") as user_info:
+        user_info.write("\n".join(f"{username}, password{user_number}"
+                                  for user_number, username
+                                  in enumerate(usernames)))
+
+    # Formats every date that can be used once instead of once per task
+    dates = [(today - timedelta(days = days)).strftime(DATE_FORMAT)
+             for days in range(-90, 366)]
+    statuses = ("No".ljust(STATUS_WIDTH), "Yes")
+    cum_weights = user_weights(user_count, skew)
+
+    with open(os.path.join(directory, TASKS_FILE), "w",
+              encoding = "utf-8") as task_info:
+        for chunk_start in range(0, task_count, WRITE_CHUNK_LINES):
+            line_count = min(WRITE_CHUNK_LINES, task_count - chunk_start)
+
+            # Picks the users of a whole chunk of tasks in one call
+            chunk_users = generator.choices(usernames,
+                                            cum_weights = cum_weights,
+                                            k = line_count)
+            chunk = []
+            for username in chunk_users:
+                assigned_days = generator.randrange(366)
+                due_days = assigned_days - generator.randrange(1, 91)
+                title = f"{generator.choice(TITLE_VERBS)} " \
+                    f"{generator.choice(TITLE_NOUNS)}"
+                description = f"{title} " \
+                    f"{generator.choice(DESCRIPTION_ENDINGS)}"
+                status = statuses[generator.random() < complete_share]
+                chunk.append(f"{username}, {title}, {description}, "
+                             f"{dates[due_days + 90]}, "
+                             f"{dates[assigned_days + 90]}, {status}")
+
+            # Writes the chunk, leaving no line break after the last task
+            if chunk_start:
+                task_info.write("\n")
+            task_info.write("\n".join(chunk))
+
+    return usernames
+
+#====Runtime Section====
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Writes a user.txt and tasks.txt filled with generated "
+        "tasks for testing the task manager at scale.")
+    parser.add_argument("tasks", type = int,
+                        help = "number of tasks to generate")
+    parser.add_argument("--users", type = int, default = 100,
+                        help = "number of users, including admin")
+    parser.add_argument("--skew", type = float, default = 1.0,
+                        help = "Zipf exponent of tasks per user, where 0 "
+                        "spreads tasks evenly")
+    parser.add_argument("--complete", type = float, default = 0.4,
+                        help = "share of tasks marked complete")
+    parser.add_argument("--seed", type = int, default = 0,
+                        help = "random seed")
+    parser.add_argument("--directory", default = ".",
+                        help = "directory the files are written to")
+    arguments = parser.parse_args()
+
+    os.makedirs(arguments.directory, exist_ok = True)
+    generate_sample_data(arguments.directory, arguments.tasks,
+                         arguments.users, arguments.skew,
+                         arguments.complete, arguments.seed)
+    size = os.path.getsize(os.path.join(arguments.directory, TASKS_FILE))
+    print(f"Wrote {arguments.tasks} tasks for {arguments.users} users "
+          f"({size / (1024 * 1024):.1f} MiB) to {arguments.directory}.")
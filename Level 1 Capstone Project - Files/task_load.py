@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from task_manager_functions import login_dict_function, USERS_FILE
+from task_server import SERVER_HOST, SERVER_PORT, TaskServerError, \
+open_client, send_request
+from task_benchmark import percentile
+
+# Words the generated search requests look for
+SEARCH_WORDS = ("report", "budget", "invoice", "backlog", "team", "plan")
+
+def next_request(generator, username, write_share, request_number):
+    """Handles choosing the command and fields of one generated request,
+    which reads or adds to the tasks of the user logged in.
+    """
+    if generator.random() < write_share:
+        return "assign", (username, f"Load test task {request_number}",
+                          "Assigned by the load generator", "12 October 2030")
+
+    # Names the user even for admin, who would otherwise read every task
+    read_requests = [("view", (username,)), ("overdue", (username,)),
+                     ("due-week", (username,)),
+                     ("search", (generator.choice(SEARCH_WORDS),))]
+
+    # Only admin can see the statistics
+    if username == "admin":
+        read_requests.append(("stats", ()))
+    return generator.choice(read_requests)
+
+async def run_client(host, port, username, password, request_count,
+                     write_share, seed, latencies):
+    """Handles logging one client in and sending its requests one after
+    another, adding each latency to latencies under its command.
+    """
+    generator = random.Random(seed)
+    reader, writer = await open_client(host, port)
+    try:
+        await send_request(reader, writer, "login", username, password)
+        for request_number in range(request_count):
+            command, fields = next_request(generator, username, write_share,
+                                           f"{seed}-{request_number}")
+            start = time.perf_counter()
+            await send_request(reader, writer, command, *fields)
+            latencies.setdefault(command, []).append(
+                time.perf_counter() - start)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def run_load(host, port, login_dict, clients, request_count,
+                   write_share):
+    """Handles running clients at once against a task server, each logged
+    in as the next user in login_dict, returning the report dictionary.
+    """
+    users = list(login_dict.items())
+    latencies = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port,
+                                      *users[client_number % len(users)],
+                                      request_count, write_share,
+                                      client_number, latencies)
+                           for client_number in range(clients)))
+    seconds = time.perf_counter() - start
+
+    total = sum(len(command_latencies)
+                for command_latencies in latencies.values())
+    return {"clients": clients,
+            "requests": total,
+            "seconds": round(seconds, 3),
+            "requests_per_second": round(total / seconds, 1),
+            "commands": {command: {
+                "requests": len(command_latencies),
+                "p50_ms": round(percentile(command_latencies, 0.5) * 1000, 3),
+                "p99_ms": round(percentile(command_latencies, 0.99) * 1000, 3)}
+                         for command, command_latencies
+                         in sorted(latencies.items())}}
+
+#====Runtime Section====
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Sends generated requests from many clients at once to "
+        "a running task_server.py and reports the throughput as JSON.")
+    parser.add_argument("--host", default = SERVER_HOST,
+                        help = "address of the task server")
+    parser.add_argument("--port", type = int, default = SERVER_PORT,
+                        help = "port of the task server")
+    parser.add_argument("--directory", default = ".",
+                        help = "directory of the user.txt the clients take "
+                        "their usernames and passwords from, which must "
+                        "still hold plaintext passwords, as task_generator.py "
+                        "writes them")
+    parser.add_argument("--clients", type = int, default = 50,
+                        help = "number of clients connected at once")
+    parser.add_argument("--requests", type = int, default = 200,
+                        help = "requests sent by each client")
+    parser.add_argument("--writes", type = float, default = 0.1,
+                        help = "share of requests that assign a task")
+    arguments = parser.parse_args()
+
+    login_dict = login_dict_function(os.path.join(arguments.directory,
+                                                  USERS_FILE))
+    try:
+        report = asyncio.run(run_load(arguments.host, arguments.port,
+                                      login_dict, arguments.clients,
+                                      arguments.requests, arguments.writes))
+    except (ConnectionError, TaskServerError) as error:
+        print(f"Load test failed: {error}")
+    else:
+        print(json.dumps(report, indent = 2))
@@ -1,17 +1,36 @@
-from datetime import datetime
-from task_manager_functions import user_auth, login_dict_function, new_user, \
-new_pass, add_task_function, user_exit
+from task_manager_functions import user_auth, new_user, new_pass, \
+add_task_function, user_exit, render_tasks, parse_task_date, \
+open_task_store, write_reports, start_operation, finish_operation, \
+TASK_PAGE_SIZE, TASK_REPORT_FILE, USER_REPORT_FILE
+
+def include_archived():
+    """Handles asking whether archived tasks should be shown as well, only
+    when there are any.
+    """
+    if not store.archived_task_count():
+        return False
+    return input("Include archived tasks? (y/n): ").lower() == "y"
 
 #====Login Section====
 
+# Opens the task store for the session, on the backend chosen by the
+# TASK_MANAGER_BACKEND environment variable, or SQLite if tasks.db exists
+store = open_task_store()
+
 # Handles log in with limited attempts
-login_dict = login_dict_function()
-login_user = user_auth(login_dict)
+login_user = user_auth(store.login_dict)
 
 #====Menu Section====
 
+# Measures each chosen option from when it is chosen until the menu is
+# shown again, when the TASK_MANAGER_INSTRUMENT environment variable is set
+operation = None
+
 while True:
 
+    # Records what the last chosen option took, read and wrote
+    finish_operation(operation)
+
     # Initializes list for later use
     add_task_list = []
 
@@ -24,7 +43,13 @@ while True:
         a - add task
         va - view all tasks
         vm - view my tasks
+        mc - mark my task complete
         vu - view user's tasks
+        od - view overdue tasks
+        dw - view tasks due this week
+        ou - view overdue tasks per user
+        st - search tasks
+        ar - archive completed tasks
         s - statistics             
         cu - change user
         e - exit
@@ -38,10 +63,16 @@ while True:
         a - add task
         va - view all tasks
         vm - view my tasks
+        mc - mark my task complete
+        od - view my overdue tasks
+        dw - view my tasks due this week
+        st - search tasks
         cu - change user
         e - exit
         : """).lower()
 
+    operation = start_operation(f"menu {menu}")
+
     # Handles registering a new user
     if menu == "r":
 
@@ -50,28 +81,19 @@ while True:
 
             try:
 
-                # Opens tasks.txt as "append+"
-                with open("user.txt", "a+", encoding = "utf-8") as user_info:
-
-                    # Collects inputs, ensures inputs match and checks if
-                    # the user is already present to prevent duplicates
-                    add_user = new_user()
-                    add_pass = new_pass()
-                    if add_user not in login_dict:
-
-                        # Writes a new user to user.txt
-                        user_info.write("\n"+add_user+", "+add_pass)
+                # Collects inputs, ensures inputs match and checks if
+                # the user is already present to prevent duplicates
+                add_user = new_user()
+                add_pass = new_pass()
 
-                        # Flushes memory to immediately update the text file
-                        user_info.flush()
-                        print("Registered New User\n")
+                # Writes a new user to user.txt and adds them to the
+                # login dictionary
+                if store.register_user(add_user, add_pass):
+                    print("Registered New User\n")
 
-                        # Updates login_dict with the new user
-                        login_dict[add_user.lower()] = add_pass
-
-                    # Executes if the user is already registered
-                    else:
-                        print("User Already Registered\n")
+                # Executes if the user is already registered
+                else:
+                    print("User Already Registered\n")
 
             # Handles ending the program if the file cannot be found
             except FileNotFoundError as error:
@@ -92,43 +114,31 @@ while True:
     elif menu == "a":
 
         try:
+            while True:
+
+                # Collects input and checks if the user is valid
+                add_task_check = input("\nUsername: ").lower()
+
+                # Handles prematurely ending the program
+                if add_task_check == "e":
+                    user_exit()
 
-            # Opens tasks.txt as "append+"
-            with open("tasks.txt", "a+", encoding = "utf-8") as task_info:
-                while True:
-
-                    # Collects input and checks if the user is valid
-                    add_task_check = input("\nUsername: ").lower()
-
-                    # Handles prematurely ending the program
-                    if add_task_check == "e":
-                        user_exit()
-
-                    # Checks if the intended user is stored in login_dict
-                    if add_task_check in login_dict:
-
-                        # Collects inputs and writes a new task to tasks.txt
-                        # in the correct format
-                        add_task_list = add_task_function()
-                        task_info.write("\n"
-                                + add_task_check + ", "
-                                + add_task_list[0] + ", "
-                                + add_task_list[1] + ", "
-                                + add_task_list[2] + ", "
-                                # Writes the current date
-                                + datetime.today().strftime("%d %B %Y")
-                                + ", " + "No")
-                                # This thread helped me understand this
-                                # https://shorturl.at/hfdEl
-
-                        # Flushes memory to immediately update the text file
-                        task_info.flush()
-                        print("\nNew Task Assigned.\n")
-                        break
-
-                    # Executes when the input username is invalid
-                    print(f"Invalid Username: \"{add_task_check}\". \
-                        Please Try again.\n")
+                # Checks if the intended user is stored in login_dict
+                if add_task_check in store.login_dict:
+
+                    # Collects inputs and writes a new task to tasks.txt
+                    # in the correct format, with the current date and
+                    # completion status added
+                    # This thread helped me understand this
+                    # https://shorturl.at/hfdEl
+                    add_task_list = add_task_function()
+                    store.assign_task(add_task_check, *add_task_list)
+                    print("\nNew Task Assigned.\n")
+                    break
+
+                # Executes when the input username is invalid
+                print(f"Invalid Username: \"{add_task_check}\". \
+                    Please Try again.\n")
 
         # Handles ending the program if the file cannot be found
         except FileNotFoundError as error:
@@ -145,22 +155,10 @@ while True:
 
         try:
 
-            # Opens task.txt as "read"
-            with open("tasks.txt", "r", encoding = "utf-8") as task_info:
-
-                # Sets the file's pointer to the start
-                task_info.seek(0)
-
-                # Removes extra whitespaces and splits each line into a list
-                # and prints it's components in the correct format
-                for i in task_info:
-                    task_entry = i.strip().split(", ")
-                    print(f"\nTask:               {task_entry[1]} \
-                            \nAssigned To:        {task_entry[0]} \
-                            \nDate Assigned:      {task_entry[4]} \
-                            \nDue Date:           {task_entry[3]} \
-                            \nTask Complete?:     {task_entry[5]} \
-                            \nTask Description: \n\n{task_entry[2]}\n ")
+            # Streams tasks.txt through a memory map and prints the tasks
+            # in the correct format a page at a time, after decompressing
+            # the archived tasks if they were asked for
+            render_tasks(store.tasks(include_archived()), TASK_PAGE_SIZE)
 
         # Handles ending the program if the file cannot be found
         except FileNotFoundError as error:
@@ -175,37 +173,49 @@ while True:
     # Handles viewing the logged in user's tasks
     elif menu == "vm":
         try:
-            # Opens task.txt as "read"
-            with open("tasks.txt", "r", encoding = "utf-8") as task_info:
-
-                # Updates to True if any tasks are assigned to the user
-                found_tasks = False
-
-                # Removes extra whitespaces and splits each line into a list
-                # and prints it's components in the correct format
-                for i in task_info:
-                    task_entry = i.strip().split(", ")
+            # Seeks straight to the user's tasks using the task index
+            # and prints them in the correct format a page at a time
+            found_tasks = render_tasks(store.user_tasks(login_user),
+                                       TASK_PAGE_SIZE)
 
-                    # Repeats the code for "va" with a check to only print
-                    # tasks assigned to the currently logged in user
-                    if login_user == task_entry[0]:
+            # Executes if no tasks are assigned to the user
+            if not found_tasks:
+                print("\nNo tasks assigned to user.\n")
 
-                        print(f"\nTask:               {task_entry[1]} \
-                                \nAssigned To:        {task_entry[0]} \
-                                \nDate Assigned:      {task_entry[4]} \
-                                \nDue Date:           {task_entry[3]} \
-                                \nTask Complete?:     {task_entry[5]} \
-                                \nTask Description: \n\n{task_entry[2]}\n ")
-
-                        # Flags that this user has assigned tasks
-                        found_tasks = True
+        # Handles ending the program if the file cannot be found
+        except FileNotFoundError as error:
+            print("File cannot be found.")
+            user_exit()
 
-                        # Flushes memory to immediately update the text file
-                        task_info.flush()
+        # Handles ending the program if a generic exception is detected
+        except Exception as error:
+            print("An unexpected error has occured.")
+            user_exit()
 
-                # Executes if found_tasks is still False
-                if not found_tasks:
-                    print("\nNo tasks assigned to user.\n")
+    # Handles marking one of the logged in user's tasks as complete
+    elif menu == "mc":
+        try:
+            # Lists the user's tasks with the numbers used to select them
+            user_tasks = list(store.user_tasks(login_user))
+            if not user_tasks:
+                print("\nNo tasks assigned to user.\n")
+                continue
+
+            print("")
+            for task_number, task_entry in enumerate(user_tasks, 1):
+                print(f"{task_number} - {task_entry[1]} "
+                      f"(Due: {task_entry[3]}, Complete: {task_entry[5]})")
+
+            # Collects the task number and rewrites only its status
+            task_number = int(input("\nTask Number: "))
+            if store.complete_task(login_user, task_number):
+                print("\nTask Marked Complete.\n")
+            else:
+                print("\nTask Already Complete.\n")
+
+        # Handles task numbers that are not in the user's list
+        except (ValueError, IndexError):
+            print("\nInvalid Task Number.\n")
 
         # Handles ending the program if the file cannot be found
         except FileNotFoundError as error:
@@ -223,51 +233,115 @@ while True:
         if login_user == "admin":
 
             try:
-                # Opens task.txt as "read"
-                with open("tasks.txt", "r", encoding = "utf-8") as task_info:
+                # Collects input to check a particular user's tasks
+                view_user_tasks = input("\nUsername: ")
 
-                    # Updates to True if any tasks are assigned to the user
-                    found_tasks = False
+                # Handles prematurely ending the program
+                if view_user_tasks == "e":
+                    user_exit()
 
-                    # Collects input to check a particular user's tasks
-                    view_user_tasks = input("\nUsername: ")
+                # Repeats the code for "vm" for the user stored in
+                # view_user_tasks, including their archived tasks if asked
+                found_tasks = render_tasks(
+                    store.user_tasks(view_user_tasks, include_archived()),
+                    TASK_PAGE_SIZE)
 
-                    # Handles prematurely ending the program
-                    if view_user_tasks == "e":
-                        user_exit()
+                # Executes if no tasks are assigned to the user
+                if not found_tasks:
+                    print("\nNo tasks assigned to user.\n")
 
-                    for i in task_info:
-                        task_entry = i.strip().split(", ")
+        # Handles ending the program if the file cannot be found
+            except FileNotFoundError as error:
+                print("File cannot be found.")
+                user_exit()
 
-                    # Repeats the code for "va" and "vm" with a check to
-                    # only print tasks assigned to the user stored in
-                    # view_user_task
-                        if view_user_tasks == task_entry[0]:
+        # Handles ending the program if a generic exception is detected
+            except Exception as error:
+                print("An unexpected error has occured.")
+                user_exit()
 
-                            print(f"\nTask:               {task_entry[1]} \
-                                    \nAssigned To:        {task_entry[0]} \
-                                    \nDate Assigned:      {task_entry[4]} \
-                                    \nDue Date:           {task_entry[3]} \
-                                    \nTask Complete?:     {task_entry[5]} \
-                                    \nTask Description: \n\n{task_entry[2]} \
-                                    \n ")
+        # Executes if anyone other than "admin" is stored in login_user
+        else:
+            print("Access Denied.\n" \
+            "Admin Login Required.\n")    
 
-                            # Flags that this user has assigned tasks
-                            found_tasks = True
+    # Handles viewing overdue tasks and tasks due this week, which admin
+    # sees for every user and other users see for themselves
+    elif menu in ("od", "dw"):
+        try:
+            # Bisects the due date index for the dates wanted and prints
+            # only the incomplete tasks inside them
+            due_user = None if login_user == "admin" else login_user
+            if menu == "od":
+                found_tasks = render_tasks(store.overdue_tasks(due_user),
+                                           TASK_PAGE_SIZE)
+            else:
+                found_tasks = render_tasks(
+                    store.tasks_due_this_week(due_user), TASK_PAGE_SIZE)
+
+            # Executes if no tasks are due in that range
+            if not found_tasks:
+                print("\nNo tasks found.\n")
 
-                            # Flushes memory to immediately update the text file
-                            task_info.flush()
+        # Handles ending the program if the file cannot be found
+        except FileNotFoundError as error:
+            print("File cannot be found.")
+            user_exit()
 
-                    # Executes if found_tasks is still False
-                    if not found_tasks:
-                        print("\nNo tasks assigned to user.\n")
+        # Handles ending the program if a generic exception is detected
+        except Exception as error:
+            print("An unexpected error has occured.")
+            user_exit()
+
+    # Handles searching every task's title and description for keywords
+    elif menu == "st":
+        try:
+            # Collects the keywords, all of which a task must contain
+            keywords = input("\nKeywords: ")
+
+            # Looks each keyword up in the search index and prints the
+            # tasks that contain all of them
+            found_tasks = render_tasks(store.search_tasks(keywords),
+                                       TASK_PAGE_SIZE)
+
+            # Executes if no task contains every keyword
+            if not found_tasks:
+                print("\nNo tasks found.\n")
 
         # Handles ending the program if the file cannot be found
+        except FileNotFoundError as error:
+            print("File cannot be found.")
+            user_exit()
+
+        # Handles ending the program if a generic exception is detected
+        except Exception as error:
+            print("An unexpected error has occured.")
+            user_exit()
+
+    elif menu == "ou":
+
+        # Only executes if "admin" is logged in
+        if login_user == "admin":
+
+            try:
+                # Counts the overdue tasks of each user from the due date
+                # index
+                user_counts = store.overdue_per_user()
+                if not user_counts:
+                    print("\nNo overdue tasks.\n")
+                    continue
+
+                print("")
+                for username, overdue in user_counts.items():
+                    print(f"{username}: {overdue}")
+                print("")
+
+            # Handles ending the program if the file cannot be found
             except FileNotFoundError as error:
                 print("File cannot be found.")
                 user_exit()
 
-        # Handles ending the program if a generic exception is detected
+            # Handles ending the program if a generic exception is detected
             except Exception as error:
                 print("An unexpected error has occured.")
                 user_exit()
@@ -275,7 +349,44 @@ while True:
         # Executes if anyone other than "admin" is stored in login_user
         else:
             print("Access Denied.\n" \
-            "Admin Login Required.\n")    
+            "Admin Login Required.\n")
+
+    elif menu == "ar":
+
+        # Only executes if "admin" is logged in
+        if login_user == "admin":
+
+            try:
+                # Collects an optional date before which incomplete tasks
+                # are archived as well as completed ones
+                cutoff_date = input("\nAlso archive tasks assigned before "
+                                    "(Eg. 12 October 2022, blank for none): ")
+                cutoff = None
+                if cutoff_date.strip():
+                    cutoff = parse_task_date(cutoff_date)
+                    if cutoff is None:
+                        print("\nInvalid Date.\n")
+                        continue
+
+                # Moves the tasks into a compressed archive segment and
+                # rewrites tasks.txt with the tasks left
+                archived = store.archive_tasks(cutoff)
+                print(f"\nArchived {archived} Tasks.\n")
+
+            # Handles ending the program if the file cannot be found
+            except FileNotFoundError as error:
+                print("File cannot be found.")
+                user_exit()
+
+            # Handles ending the program if a generic exception is detected
+            except Exception as error:
+                print("An unexpected error has occured.")
+                user_exit()
+
+        # Executes if anyone other than "admin" is stored in login_user
+        else:
+            print("Access Denied.\n" \
+            "Admin Login Required.\n")
 
     elif menu == "s":
 
@@ -284,20 +395,26 @@ while True:
 
             try:
 
-                # Opens both task.txt and user.txt as "read"
-                with open("tasks.txt", "r", encoding = "utf-8") as task_info,\
-                    open("user.txt", "r", encoding = "utf-8") as user_info:
+                # Loads the saved statistics, which are only recounted
+                # when tasks.txt or user.txt changed outside the menu
+                task_stats = store.stats()
 
-                    # Sets the file's pointer to the start
-                    task_info.seek(0)
+                print(f"\nTotal Users: {task_stats['total_users']}")
+                print(f"Total Tasks: {task_stats['total_tasks']}")
+                print(f"Completed Tasks: {task_stats['completed']}")
+                print(f"Incomplete Tasks: {task_stats['incomplete']}")
+                print(f"Overdue Tasks: {task_stats['overdue']}\n")
 
-                    # Sums each line in each file and prints them in the
-                    # correct format
-                    total_users = sum(1 for _ in user_info)
-                    total_tasks = sum(1 for _ in task_info)
+                # Writes the per-user breakdown from the same statistics
+                write_reports(task_stats, store.login_dict)
+                print(f"Reports written to {TASK_REPORT_FILE} and "
+                      f"{USER_REPORT_FILE}.\n")
 
-                    print(f"\nTotal Users: {total_users}")
-                    print(f"Total Tasks: {total_tasks}\n")
+                # Shows how long this session has waited on other sessions
+                lock_waits = store.lock_wait_stats()
+                print(f"File Lock Waits: {lock_waits['waits']} "
+                      f"({lock_waits['seconds'] * 1000:.1f} ms total, "
+                      f"{lock_waits['max'] * 1000:.1f} ms longest)\n")
 
             # Handles ending the program if the file cannot be found
             except FileNotFoundError as error:
@@ -314,11 +431,11 @@ while True:
             print("Access Denied.\n" \
             "Admin Login Required.\n")
 
-    # Allows the user to change user mid-session using the same login logic
+    # Allows the user to change user mid-session using the same login logic,
+    # which only re-reads user.txt if another session has changed it
     elif menu == "cu":
         print("")
-        login_dict = login_dict_function()
-        login_user = user_auth(login_dict)
+        login_user = user_auth(store.login_dict)
 
     # Handles ending the program
     elif menu == "e":
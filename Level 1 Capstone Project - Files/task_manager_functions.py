@@ -1,16 +1,256 @@
+import atexit
+import gzip
+import hashlib
+import hmac
+import json
+import lzma
+import marshal
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import struct
 import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, ExitStack
+from datetime import datetime, date, timedelta
+from functools import lru_cache, partial, wraps
+from itertools import chain
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl is not available on Windows, where files are left unlocked
+    fcntl = None
+
+# Default locations of the flat files used by task_manager.py
+TASKS_FILE = "tasks.txt"
+USERS_FILE = "user.txt"
+
+# Line break written ahead of each appended record, matching text mode
+LINE_BREAK = os.linesep.encode("utf-8")
+
+# Date format written by the add task menu
+DATE_FORMAT = "%d %B %Y"
+
+# Width of the completion status field. "No " is padded to the width of
+# "Yes" so a task can be marked complete without moving any other bytes.
+STATUS_WIDTH = 3
+
+#====Instrumentation Section====
+
+# Environment variable that turns on instrumentation for any program using
+# these functions: "stderr" prints a summary table when the program exits,
+# "jsonl:<path>" appends one line of JSON per operation to a file and
+# "memory" only adds up the counters, for instrument_counters()
+INSTRUMENT_VARIABLE = "TASK_MANAGER_INSTRUMENT"
+
+# Counters added up for each operation. Wall time includes any time spent
+# waiting for the user to answer a prompt, which CPU time leaves out.
+OPERATION_COUNTERS = ("calls", "seconds", "cpu_seconds", "records",
+                      "bytes_read", "bytes_written")
+
+class CounterSink:
+    """Handles adding up the measurements of each operation into counters,
+    a dictionary keyed by operation name, for reading in the same process.
+    """
+
+    def __init__(self):
+        self.counters = {}
+
+    def record(self, measurement):
+        """Handles adding one measurement to its operation's counters.
+        """
+        counters = self.counters.setdefault(
+            measurement["operation"], dict.fromkeys(OPERATION_COUNTERS, 0))
+        counters["calls"] += 1
+        for counter in OPERATION_COUNTERS[1:]:
+            counters[counter] += measurement[counter]
+
+    def close(self):
+        """Handles finishing with the sink, which holds nothing open.
+        """
+
+class StderrSink(CounterSink):
+    """Handles adding up measurements like CounterSink and printing them on
+    standard error as a table, slowest operation first, when closed.
+    """
+
+    def close(self):
+        """Handles printing the summary table once.
+        """
+        if not self.counters:
+            return
+        print(f"\n{'Operation':<32}{'Calls':>8}{'Seconds':>10}{'CPU s':>10}"
+              f"{'Records':>11}{'Read':>13}{'Written':>13}",
+              file = sys.stderr)
+        for operation, counters in sorted(
+            self.counters.items(), key = lambda item: -item[1]["seconds"]):
+            print(f"{operation:<32}{counters['calls']:>8}"
+                  f"{counters['seconds']:>10.4f}"
+                  f"{counters['cpu_seconds']:>10.4f}"
+                  f"{counters['records']:>11}{counters['bytes_read']:>13}"
+                  f"{counters['bytes_written']:>13}", file = sys.stderr)
+        self.counters = {}
+
+class JsonlSink:
+    """Handles appending each measurement to a file as one line of JSON,
+    flushed straight away so the lines survive the program crashing.
+    """
+
+    def __init__(self, path):
+        self.handle = open(path, "a", encoding = "utf-8")
+
+    def record(self, measurement):
+        """Handles writing one measurement.
+        """
+        self.handle.write(json.dumps(measurement) + "\n")
+        self.handle.flush()
+
+    def close(self):
+        """Handles closing the file.
+        """
+        self.handle.close()
+
+# Sink classes by the name enable_instrumentation() is given
+INSTRUMENT_SINKS = {"stderr": StderrSink, "memory": CounterSink}
+
+# Sink measurements are recorded to, which is None while instrumentation is
+# off, and the operations running, outermost first, each as its measurement
+# with the wall and CPU time it started at
+_instrument_sink = None
+_operations = []
+
+def enable_instrumentation(sink):
+    """Handles turning instrumentation on, closing any sink used before.
+
+    sink is an object with record() and close() methods, or the name of
+    one: "stderr", "memory" or "jsonl:<path>". Returns the sink. Raises
+    ValueError for an unknown name.
+    """
+    global _instrument_sink
+    if isinstance(sink, str):
+        if sink.startswith("jsonl:"):
+            sink = JsonlSink(sink[len("jsonl:"):])
+        elif sink in INSTRUMENT_SINKS:
+            sink = INSTRUMENT_SINKS[sink]()
+        else:
+            raise ValueError(f"Unknown instrumentation sink: {sink}")
+    disable_instrumentation()
+    _instrument_sink = sink
+    return sink
+
+def disable_instrumentation():
+    """Handles recording the operations still running, such as the menu
+    option that ended the program, then closing the sink.
+    """
+    global _instrument_sink
+    if _operations:
+        finish_operation(_operations[0][0])
+    if _instrument_sink is not None:
+        _instrument_sink.close()
+    _instrument_sink = None
+
+def instrument_counters():
+    """Handles returning the counters of each operation added up by the
+    sink, or an empty dictionary if it does not add them up.
+    """
+    return getattr(_instrument_sink, "counters", {})
+
+def start_operation(name):
+    """Handles starting to measure an operation, returning its measurement
+    for finish_operation(), or None while instrumentation is off.
+    """
+    if _instrument_sink is None:
+        return None
+    measurement = {"operation": name, "started": time.time(), "seconds": 0.0,
+                   "cpu_seconds": 0.0, "records": 0, "bytes_read": 0,
+                   "bytes_written": 0}
+    _operations.append((measurement, time.perf_counter(),
+                        time.process_time()))
+    return measurement
+
+def finish_operation(measurement):
+    """Handles recording an operation started by start_operation(), along
+    with any operation started inside it that has not finished, such as a
+    generator that was not read to the end.
+    """
+    if measurement is None or not any(operation[0] is measurement
+                                      for operation in _operations):
+        return
+    while True:
+        operation, wall_start, cpu_start = _operations.pop()
+        operation["seconds"] = time.perf_counter() - wall_start
+        operation["cpu_seconds"] = time.process_time() - cpu_start
+        _instrument_sink.record(operation)
+        if operation is measurement:
+            return
+
+@contextmanager
+def instrumented(name):
+    """Handles measuring the code inside the with statement as an operation.
+    """
+    measurement = start_operation(name)
+    try:
+        yield measurement
+    finally:
+        finish_operation(measurement)
+
+def instrument(function):
+    """Handles measuring every call of a function as an operation named
+    after it. While instrumentation is off this costs one check per call.
+    Generator functions would only be measured until their first yield, so
+    they call count_io() instead.
+    """
+    @wraps(function)
+    def instrumented_function(*args, **kwargs):
+        if _instrument_sink is None:
+            return function(*args, **kwargs)
+        with instrumented(function.__qualname__):
+            return function(*args, **kwargs)
+    return instrumented_function
+
+def count_io(records = 0, bytes_read = 0, bytes_written = 0):
+    """Handles adding records scanned and bytes read and written to every
+    operation running, so a menu option includes what its helpers did.
+    """
+    for measurement, *starts in _operations:
+        measurement["records"] += records
+        measurement["bytes_read"] += bytes_read
+        measurement["bytes_written"] += bytes_written
+
+# Turns instrumentation on when the environment variable names a sink
+if os.environ.get(INSTRUMENT_VARIABLE):
+    enable_instrumentation(os.environ[INSTRUMENT_VARIABLE])
+
+# Records whatever is still running when the program ends. Registered
+# before close_writers(), so it runs after the last records are committed.
+atexit.register(disable_instrumentation)
+
+#====Menu Helper Section====
 
 def user_exit():
     """Handles prematurely exiting the program
     """
+    # Commits any tasks or users still waiting in an append writer
+    close_writers()
     print("\nGoodbye!")
     return sys.exit()
 
-def login_dict_function():
+@instrument
+def login_dict_function(users_path = USERS_FILE):
     """Handles populating the login dictionary
     """
     try:
-        with open("user.txt", "r", encoding = "utf-8") as user_info:
+        with open(users_path, "r", encoding = "utf-8") as user_info:
 
             login_dict = {}
 
@@ -18,6 +258,7 @@ def login_dict_function():
             for line in user_info:
                 username, password = map(str.strip, line.split(", "))
                 login_dict[username.lower()] = password
+            count_io(len(login_dict), os.fstat(user_info.fileno()).st_size)
             # Returns the populated login dict
             return login_dict
 
@@ -44,7 +285,7 @@ def user_auth(login_dict):
         login_pass = input("Please enter your password: ")
 
         if login_user in login_dict and \
-            login_pass == login_dict[login_user]:
+            verify_password(login_pass, login_dict[login_user]):
             print("Access Granted!\n")
             return login_user
 
@@ -115,3 +356,3274 @@ def add_task_function():
     add_task_list = [add_task_title, add_description, add_due]
 
     return add_task_list
+
+def create_task_entry(username, add_task_list):
+    """Handles building the task entry for a new task, assigned today and
+    not yet complete.
+    """
+    return [username] + add_task_list \
+        + [datetime.today().strftime(DATE_FORMAT), "No".ljust(STATUS_WIDTH)]
+
+def split_task_line(line):
+    """Handles splitting a line of tasks.txt into its task fields.
+    """
+    task_entry = line.strip().split(", ")
+
+    # Rejoins descriptions containing ", " so the dates and completion
+    # status keep their positions
+    if len(task_entry) > 6:
+        task_entry[2:-3] = [", ".join(task_entry[2:-3])]
+    return task_entry
+
+def format_task(task_entry):
+    """Handles formatting a task entry as the block printed by the view menus.
+    """
+    return (f"\nTask:               {task_entry[1]}"
+            f"\nAssigned To:        {task_entry[0]}"
+            f"\nDate Assigned:      {task_entry[4]}"
+            f"\nDue Date:           {task_entry[3]}"
+            f"\nTask Complete?:     {task_entry[5]}"
+            f"\nTask Description: \n\n{task_entry[2]}\n ")
+
+# Number of characters of formatted tasks gathered before each write
+RENDER_BUFFER_SIZE = 64 * 1024
+
+# Number of tasks shown per page when the view menus print to a terminal
+TASK_PAGE_SIZE = 20
+
+def render_tasks(task_entries, page_size = None, output = None):
+    """Handles printing task entries in the view menu layout, returning the
+    number of tasks printed.
+
+    Formatted tasks are gathered and written in large chunks instead of
+    one print() per task, and nothing is held beyond the current chunk. If
+    page_size is given and the output is a terminal, the user is asked
+    before each further page is shown; piped output is streamed straight
+    through.
+    """
+    if output is None:
+        output = sys.stdout
+    if page_size is not None and not output.isatty():
+        page_size = None
+
+    chunk = []
+    chunk_size = 0
+    task_count = 0
+    for task_entry in task_entries:
+
+        # Asks for the next page once a full page has been printed
+        if page_size and task_count and task_count % page_size == 0:
+            output.write("".join(chunk))
+            output.flush()
+            chunk = []
+            chunk_size = 0
+            if input("Enter - next page, q - quit: ").lower() == "q":
+                return task_count
+
+        block = format_task(task_entry) + "\n"
+        chunk.append(block)
+        chunk_size += len(block)
+        task_count += 1
+
+        # Writes the gathered tasks once the chunk is large enough
+        if chunk_size >= RENDER_BUFFER_SIZE:
+            output.write("".join(chunk))
+            chunk = []
+            chunk_size = 0
+
+    output.write("".join(chunk))
+    output.flush()
+    return task_count
+
+def file_stamp(path):
+    """Handles returning the size, modification time and inode used to
+    validate the sidecar files kept next to tasks.txt.
+    """
+    stat_result = os.stat(path)
+    return [stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino]
+
+def lock_file(handle):
+    """Handles taking an exclusive advisory lock on an open file, returning
+    the seconds spent waiting for it.
+    """
+    if fcntl is None:
+        return 0.0
+    start = time.perf_counter()
+    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+    return time.perf_counter() - start
+
+def unlock_file(handle):
+    """Handles releasing a lock taken with lock_file().
+    """
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+def is_replaced(handle, path):
+    """Handles checking whether path now names a different file than the
+    open handle, such as after a migration replaced it.
+    """
+    return os.fstat(handle.fileno()).st_ino != os.stat(path).st_ino
+
+@contextmanager
+def locked_open(path, mode):
+    """Handles opening a file and holding an exclusive lock on it until the
+    block ends, opening it again if it was replaced while waiting.
+    """
+    while True:
+        handle = open(path, mode)
+        lock_file(handle)
+        if not is_replaced(handle, path):
+            break
+        handle.close()
+    try:
+        yield handle
+    finally:
+        # Closing the handle also releases its lock
+        handle.close()
+
+def save_sidecar(path, data):
+    """Handles writing a sidecar file atomically so readers never see a
+    partially written file.
+    """
+    temp_path = path + ".tmp"
+
+    # Encodes in one call, which uses json's C encoder where json.dump()
+    # would encode piece by piece in Python
+    text = json.dumps(data)
+    with open(temp_path, "w", encoding = "utf-8") as sidecar:
+        sidecar.write(text)
+    os.replace(temp_path, path)
+    count_io(bytes_written = len(text))
+
+def load_sidecar(path):
+    """Handles reading a sidecar file, returning None if it is missing or
+    cannot be parsed.
+    """
+    try:
+        with open(path, "r", encoding = "utf-8") as sidecar:
+            count_io(bytes_read = os.fstat(sidecar.fileno()).st_size)
+            return json.load(sidecar)
+    except (OSError, ValueError):
+        return None
+
+@instrument
+def build_task_index(tasks_path = TASKS_FILE):
+    """Handles scanning tasks.txt once and saving the byte offset of every
+    task against the username it is assigned to.
+    """
+    user_offsets = {}
+    with open(tasks_path, "rb") as task_info:
+        stamp = file_stamp(tasks_path)
+        offset = 0
+
+        # Records where each non-empty line starts, keyed by its username
+        for line in task_info:
+            if line.strip():
+                username = line.split(b", ", 1)[0].decode("utf-8").strip()
+                user_offsets.setdefault(username, []).append(offset)
+            offset += len(line)
+    count_io(bytes_read = offset)
+
+    task_index = {"stamp": stamp, "users": user_offsets}
+    save_sidecar(tasks_path + ".idx", task_index)
+    return task_index
+
+def load_task_index(tasks_path = TASKS_FILE):
+    """Handles loading the task index, rebuilding it when its recorded size
+    or modification time no longer match tasks.txt.
+    """
+    task_index = load_sidecar(tasks_path + ".idx")
+    if task_index is None or task_index.get("stamp") != \
+        file_stamp(tasks_path):
+        task_index = build_task_index(tasks_path)
+    return task_index
+
+def index_tasks_append(appended, previous_stamp, tasks_path = TASKS_FILE):
+    """Handles adding newly appended tasks to the task index.
+
+    appended is a list of (task_entry, offset) pairs and previous_stamp is
+    the file_stamp() of tasks.txt taken before they were written. If the
+    index did not match that stamp it is left alone and rebuilt the next
+    time it is loaded.
+    """
+    task_index = load_sidecar(tasks_path + ".idx")
+    if task_index is None or task_index.get("stamp") != previous_stamp:
+        return
+
+    for task_entry, offset in appended:
+        task_index["users"].setdefault(task_entry[0], []).append(offset)
+    task_index["stamp"] = file_stamp(tasks_path)
+    save_sidecar(tasks_path + ".idx", task_index)
+
+def read_user_tasks(username, tasks_path = TASKS_FILE, task_index = None):
+    """Handles yielding the tasks assigned to a user by jumping straight to
+    the offsets stored in the task index of the mapped tasks.txt.
+
+    task_index defaults to the one saved next to tasks.txt.
+    """
+    if task_index is None:
+        task_index = load_task_index(tasks_path)
+    offsets = task_index["users"].get(username, [])
+    if not offsets:
+        return
+
+    records = 0
+    bytes_read = 0
+    try:
+        with open(tasks_path, "rb") as task_info, \
+            mmap.mmap(task_info.fileno(), 0,
+                      access = mmap.ACCESS_READ) as buffer:
+            for offset in offsets:
+                line = buffer[offset:_line_end(buffer, offset)]
+                records += 1
+                bytes_read += len(line)
+                yield TaskRecord(line)
+    finally:
+        count_io(records, bytes_read)
+
+class TaskRecord:
+    """Handles one raw task line read from the memory-mapped tasks.txt.
+
+    The line is only decoded and split when a field is first read, so
+    records that are skipped or only compared are never decoded.
+    """
+    __slots__ = ("line", "fields")
+
+    def __init__(self, line):
+        self.line = line
+        self.fields = None
+
+    def __getitem__(self, position):
+        if self.fields is None:
+            self.fields = split_task_line(self.line.decode("utf-8"))
+        return self.fields[position]
+
+    def __len__(self):
+        if self.fields is None:
+            self.fields = split_task_line(self.line.decode("utf-8"))
+        return len(self.fields)
+
+    def username_is(self, username):
+        """Handles comparing the assigned username against the raw bytes
+        without decoding the line.
+        """
+        return self.line.startswith(username.encode("utf-8") + b", ")
+
+    def entry(self):
+        """Handles decoding every field into a task entry list.
+        """
+        return list(self.fields) if len(self) else []
+
+def _line_end(buffer, start):
+    """Handles finding the end of the line starting at start.
+    """
+    end = buffer.find(b"\n", start)
+    if end == -1:
+        end = len(buffer)
+    return end
+
+# Size of the slices of tasks.txt that are split into lines at once
+READ_CHUNK_SIZE = 256 * 1024
+
+def iter_task_records(tasks_path = TASKS_FILE, username = None,
+                      range_start = 0, range_end = None):
+    """Handles yielding a TaskRecord for every task in tasks.txt from a
+    memory map of the file.
+
+    The map is split into lines a chunk at a time, so memory use stays flat
+    however large the file is. range_start and range_end limit the scan to
+    the lines between two byte offsets, where range_start must be the start
+    of a line. When username is given the whole map is searched for that
+    user's lines directly, so other users' tasks are never visited.
+    """
+    with open(tasks_path, "rb") as task_info:
+
+        # Empty files cannot be mapped and contain no tasks
+        size = os.fstat(task_info.fileno()).st_size
+        if size == 0:
+            return
+
+        with mmap.mmap(task_info.fileno(), 0,
+                       access = mmap.ACCESS_READ) as buffer:
+            if username is None:
+                start = range_start
+                if range_end is not None:
+                    size = min(size, range_end)
+                while start < size:
+
+                    # Ends each chunk on a line break so no line is cut
+                    end = size
+                    if start + READ_CHUNK_SIZE < size:
+                        end = buffer.rfind(b"\n", start,
+                                           start + READ_CHUNK_SIZE)
+                        if end == -1:
+                            end = _line_end(buffer, start + READ_CHUNK_SIZE)
+
+                    # Skips blank lines such as the one left by an empty file
+                    lines = buffer[start:end].split(b"\n")
+                    count_io(len(lines), end - start)
+                    for line in lines:
+                        if line and line != b"\r":
+                            yield TaskRecord(line)
+                    start = end + 1
+            else:
+                prefix = username.encode("utf-8") + b", "
+
+                records = 0
+                bytes_read = 0
+                try:
+                    # Checks the first line, which has no break before it
+                    if buffer.find(prefix, 0, len(prefix)) == 0:
+                        records += 1
+                        bytes_read += _line_end(buffer, 0)
+                        yield TaskRecord(buffer[0:_line_end(buffer, 0)])
+
+                    # Jumps from one of the user's lines to the next
+                    start = buffer.find(b"\n" + prefix)
+                    while start != -1:
+                        end = _line_end(buffer, start + 1)
+                        records += 1
+                        bytes_read += end - start - 1
+                        yield TaskRecord(buffer[start + 1:end])
+                        start = buffer.find(b"\n" + prefix, end)
+                finally:
+                    count_io(records, bytes_read)
+
+# Dates repeat across many tasks, so parsed dates are cached
+@lru_cache(maxsize = 4096)
+def parse_task_date(text):
+    """Handles converting a date written in tasks.txt, such as
+    "12 October 2022" or "10 Oct 2019", into an ordinal day number.
+
+    Returns None for dates that cannot be parsed.
+    """
+    for date_format in ("%d %B %Y", "%d %b %Y"):
+        try:
+            return datetime.strptime(text.strip(), date_format).toordinal()
+        except ValueError:
+            pass
+    return None
+
+def count_lines(path):
+    """Handles counting the non-empty lines of a text file.
+    """
+    with open(path, "rb") as text_info:
+        return sum(1 for line in text_info if line.strip())
+
+def new_task_stats():
+    """Handles returning an empty statistics dictionary.
+
+    "due" and the per-user "due" hold the number of incomplete tasks for
+    each due date ordinal, so overdue counts can be worked out for any day
+    without re-reading tasks.txt.
+    """
+    return {"stamps": {}, "total_users": 0, "total_tasks": 0,
+            "completed": 0, "incomplete": 0, "due": {}, "users": {}}
+
+def count_task(task_stats, task_entry):
+    """Handles adding one task entry to a statistics dictionary.
+    """
+    user_stats = task_stats["users"].setdefault(
+        task_entry[0], {"tasks": 0, "completed": 0, "due": {}})
+    task_stats["total_tasks"] += 1
+    user_stats["tasks"] += 1
+
+    if task_entry[5] == "Yes":
+        task_stats["completed"] += 1
+        user_stats["completed"] += 1
+        return
+
+    task_stats["incomplete"] += 1
+
+    # Keys are strings so the dictionary survives a round trip through JSON
+    due_ordinal = parse_task_date(task_entry[3])
+    if due_ordinal is not None:
+        due_key = str(due_ordinal)
+        task_stats["due"][due_key] = task_stats["due"].get(due_key, 0) + 1
+        user_stats["due"][due_key] = user_stats["due"].get(due_key, 0) + 1
+
+def count_task_range(tasks_path, range_start, range_end):
+    """Handles counting the tasks between two byte offsets of tasks.txt into
+    a new statistics dictionary. This runs in the statistics worker
+    processes.
+    """
+    task_stats = new_task_stats()
+    for task_entry in iter_task_records(tasks_path, None, range_start,
+                                        range_end):
+        count_task(task_stats, task_entry)
+    return task_stats
+
+def merge_due_counts(due_counts, part_counts):
+    """Handles adding one "due" dictionary of the statistics to another.
+    """
+    for due_key, count in part_counts.items():
+        due_counts[due_key] = due_counts.get(due_key, 0) + count
+
+def merge_task_stats(task_stats, part_stats):
+    """Handles adding the task counts of one statistics dictionary to
+    another.
+    """
+    for key in ("total_tasks", "completed", "incomplete"):
+        task_stats[key] += part_stats[key]
+    merge_due_counts(task_stats["due"], part_stats["due"])
+
+    for username, part_user in part_stats["users"].items():
+        user_stats = task_stats["users"].setdefault(
+            username, {"tasks": 0, "completed": 0, "due": {}})
+        user_stats["tasks"] += part_user["tasks"]
+        user_stats["completed"] += part_user["completed"]
+        merge_due_counts(user_stats["due"], part_user["due"])
+
+def split_task_ranges(tasks_path, size, parts):
+    """Handles splitting the first size bytes of tasks.txt into up to parts
+    byte ranges that each start at the beginning of a line.
+    """
+    boundaries = [0]
+    with open(tasks_path, "rb") as task_info, \
+        mmap.mmap(task_info.fileno(), 0, access = mmap.ACCESS_READ) as buffer:
+        for part in range(1, parts):
+            line_break = buffer.find(b"\n", size * part // parts, size)
+            boundary = size if line_break == -1 else line_break + 1
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+# Files smaller than this are counted in one process, since starting the
+# worker processes would take longer than counting
+PARALLEL_STATS_MIN_SIZE = 16 * 1024 * 1024
+
+def stats_worker_count(tasks_path, workers = None):
+    """Handles choosing how many processes count the statistics.
+
+    workers of None uses one process per CPU for files of at least
+    PARALLEL_STATS_MIN_SIZE. Worker processes are only used where they can
+    be forked, since task_manager.py runs its menu when it is imported and
+    would do so again in every spawned worker.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return 1
+    if workers is None:
+        if os.path.getsize(tasks_path) < PARALLEL_STATS_MIN_SIZE:
+            return 1
+        workers = os.cpu_count() or 1
+    return max(1, workers)
+
+def map_task_ranges(range_function, tasks_path, task_ranges):
+    """Handles calling range_function(tasks_path, range_start, range_end)
+    for each byte range in its own forked worker process, yielding the
+    results in file order.
+    """
+    with ProcessPoolExecutor(
+        len(task_ranges),
+        mp_context = multiprocessing.get_context("fork")) as executor:
+        yield from executor.map(
+            range_function, *zip(*[(tasks_path, range_start, range_end)
+                                   for range_start, range_end
+                                   in task_ranges]))
+
+@instrument
+def recount_task_stats(tasks_path = TASKS_FILE, workers = None):
+    """Handles rebuilding the statistics from tasks.txt and saving them next
+    to it, stamped against tasks.txt alone. total_users is left at 0 for
+    the caller to count, so registering a user never makes them stale.
+
+    With more than one worker, tasks.txt is split into byte ranges aligned
+    to line breaks that are counted in parallel by map_task_ranges() and
+    merged at the end.
+    """
+    task_stats = new_task_stats()
+    task_stats["stamps"] = {"tasks": file_stamp(tasks_path)}
+    size = task_stats["stamps"]["tasks"][0]
+
+    workers = stats_worker_count(tasks_path, workers)
+    if workers > 1 and size:
+        for part_stats in map_task_ranges(
+            count_task_range, tasks_path,
+            split_task_ranges(tasks_path, size, workers)):
+            merge_task_stats(task_stats, part_stats)
+    else:
+        merge_task_stats(task_stats, count_task_range(tasks_path, 0, size))
+
+    save_sidecar(tasks_path + ".stats", task_stats)
+    return task_stats
+
+def stats_are_current(task_stats, tasks_path):
+    """Handles checking the recorded stamp against tasks.txt.
+    """
+    return task_stats is not None and task_stats.get("stamps") == \
+        {"tasks": file_stamp(tasks_path)}
+
+def load_task_stats(tasks_path = TASKS_FILE, workers = None):
+    """Handles loading the saved statistics, recounting them when tasks.txt
+    has changed since they were saved.
+    """
+    task_stats = load_sidecar(tasks_path + ".stats")
+    if not stats_are_current(task_stats, tasks_path):
+        task_stats = recount_task_stats(tasks_path, workers)
+    return task_stats
+
+def stats_tasks_append(appended, previous_stamp, tasks_path = TASKS_FILE):
+    """Handles adding newly appended tasks to the saved statistics.
+
+    appended is a list of (task_entry, offset) pairs and previous_stamp is
+    the file_stamp() of tasks.txt taken before they were written.
+    Statistics that were already out of date are left to be recounted the
+    next time they are loaded.
+    """
+    task_stats = load_sidecar(tasks_path + ".stats")
+    if task_stats is None or task_stats["stamps"] != \
+        {"tasks": previous_stamp}:
+        return
+
+    for task_entry, offset in appended:
+        count_task(task_stats, task_entry)
+    task_stats["stamps"]["tasks"] = file_stamp(tasks_path)
+    save_sidecar(tasks_path + ".stats", task_stats)
+
+def overdue_count(due_counts, today = None):
+    """Handles summing the incomplete tasks due before today from a "due"
+    dictionary of the statistics.
+    """
+    if today is None:
+        today = date.today().toordinal()
+    return sum(count for due_key, count in due_counts.items()
+               if int(due_key) < today)
+
+#====Credential Section====
+
+# Password hashing methods and their default costs, the scrypt CPU/memory
+# cost n and the number of PBKDF2-HMAC-SHA256 iterations. Both can be
+# changed with the TASK_MANAGER_PASSWORD_HASH and TASK_MANAGER_PASSWORD_COST
+# environment variables, and each stored hash records its own cost.
+PASSWORD_METHODS = {"scrypt": 2 ** 14, "pbkdf2_sha256": 600000}
+PASSWORD_METHOD = "scrypt"
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 1
+PASSWORD_SALT_BYTES = 16
+PASSWORD_HASH_BYTES = 32
+
+# Key of this process's verifier cache, so the cached values are useless
+# outside it
+VERIFIER_KEY = os.urandom(32)
+
+# Keyed digests of passwords that have already matched their stored hash
+_verified_passwords = {}
+
+def is_password_hash(stored):
+    """Handles checking whether a stored password is a hash, rather than a
+    plaintext password from before passwords were hashed.
+    """
+    return stored.split("$", 1)[0] in PASSWORD_METHODS
+
+def derive_password(password, method, cost, salt):
+    """Handles deriving the hash of a password with a method, cost and
+    salt.
+    """
+    if method == "scrypt":
+        return hashlib.scrypt(password.encode("utf-8"), salt = salt, n = cost,
+                              r = SCRYPT_BLOCK_SIZE, p = SCRYPT_PARALLELISM,
+                              maxmem = 256 * SCRYPT_BLOCK_SIZE * cost,
+                              dklen = PASSWORD_HASH_BYTES)
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt,
+                               cost, PASSWORD_HASH_BYTES)
+
+def hash_password(password, method = None, cost = None):
+    """Handles hashing a password with a new random salt, returning the
+    string stored in place of it in the form "method$cost$salt$hash".
+    """
+    if method is None:
+        method = os.environ.get("TASK_MANAGER_PASSWORD_HASH",
+                                PASSWORD_METHOD)
+    if method not in PASSWORD_METHODS:
+        raise ValueError(f"Unknown password hash \"{method}\".")
+    if cost is None:
+        cost = int(os.environ.get("TASK_MANAGER_PASSWORD_COST",
+                                  PASSWORD_METHODS[method]))
+    salt = os.urandom(PASSWORD_SALT_BYTES)
+    password_hash = derive_password(password, method, cost, salt)
+    return f"{method}${cost}${salt.hex()}${password_hash.hex()}"
+
+def verify_password(password, stored):
+    """Handles checking a password against its stored hash, or against a
+    plaintext password that has not been hashed yet.
+
+    A password that has matched is remembered as a keyed SHA-256 digest,
+    so logging in as the same user again costs one fast hash instead of
+    another scrypt or PBKDF2 derivation.
+    """
+    if not is_password_hash(stored):
+        return hmac.compare_digest(password.encode("utf-8"),
+                                   stored.encode("utf-8"))
+
+    verifier = hmac.digest(VERIFIER_KEY, password.encode("utf-8"), "sha256")
+    if stored in _verified_passwords:
+        return hmac.compare_digest(_verified_passwords[stored], verifier)
+
+    method, cost, salt, password_hash = stored.split("$")
+    if not hmac.compare_digest(derive_password(password, method, int(cost),
+                                               bytes.fromhex(salt)),
+                               bytes.fromhex(password_hash)):
+        return False
+    _verified_passwords[stored] = verifier
+    return True
+
+def hash_user_file(users_path = USERS_FILE, method = None, cost = None):
+    """Handles rewriting user.txt once so every plaintext password is
+    replaced by its hash. Returns the number of passwords hashed.
+
+    The lock is held until the new file has replaced the old one, so no
+    session registers a user in the old file while it is being copied.
+    """
+    hashed = 0
+    temp_path = users_path + ".tmp"
+    with locked_open(users_path, "rb") as user_info:
+        with open(temp_path, "wb") as hashed_info:
+            for line in user_info:
+                content = line.rstrip(b"\r\n")
+                if content.strip():
+                    username, password = map(
+                        str.strip, content.decode("utf-8").split(", "))
+                    if not is_password_hash(password):
+                        content = f"{username}, " \
+                            f"{hash_password(password, method, cost)}" \
+                            .encode("utf-8")
+                        hashed += 1
+                hashed_info.write(content + line[len(line.rstrip(b"\r\n")):])
+        os.replace(temp_path, users_path)
+    return hashed
+
+#====Due Date Index Section====
+
+@instrument
+def build_due_index(tasks_path = TASKS_FILE):
+    """Handles scanning tasks.txt once and saving the due date of every task
+    as an ordinal day number, sorted, alongside the byte offset of its line.
+
+    Tasks whose due date cannot be parsed are left out of the index.
+    """
+    due_entries = []
+    with open(tasks_path, "rb") as task_info:
+        stamp = file_stamp(tasks_path)
+        offset = 0
+
+        # Records the due date and start of each non-empty line
+        for line in task_info:
+            if line.strip():
+                task_entry = split_task_line(line.decode("utf-8"))
+                due_ordinal = parse_task_date(task_entry[3]) \
+                    if len(task_entry) > 3 else None
+                if due_ordinal is not None:
+                    due_entries.append((due_ordinal, offset))
+            offset += len(line)
+    count_io(bytes_read = offset)
+
+    # Sorting is stable, so tasks due on the same day keep file order
+    due_entries.sort(key = lambda due_entry: due_entry[0])
+    due_index = {"stamp": stamp,
+                 "ordinals": [due_entry[0] for due_entry in due_entries],
+                 "offsets": [due_entry[1] for due_entry in due_entries]}
+    save_sidecar(tasks_path + ".due", due_index)
+    return due_index
+
+def load_due_index(tasks_path = TASKS_FILE):
+    """Handles loading the due date index, rebuilding it when its stamp no
+    longer matches tasks.txt.
+    """
+    due_index = load_sidecar(tasks_path + ".due")
+    if due_index is None or due_index.get("stamp") != file_stamp(tasks_path):
+        due_index = build_due_index(tasks_path)
+    return due_index
+
+def due_index_append(appended, previous_stamp, tasks_path = TASKS_FILE):
+    """Handles inserting newly appended tasks into the due date index in
+    due date order.
+
+    appended is a list of (task_entry, offset) pairs and previous_stamp is
+    the file_stamp() of tasks.txt taken before they were written.
+    """
+    due_index = load_sidecar(tasks_path + ".due")
+    if due_index is None or due_index.get("stamp") != previous_stamp:
+        return
+
+    ordinals = due_index["ordinals"]
+    offsets = due_index["offsets"]
+    for task_entry, offset in appended:
+        due_ordinal = parse_task_date(task_entry[3])
+        if due_ordinal is not None:
+
+            # Goes after tasks due the same day, which were appended earlier
+            position = bisect_right(ordinals, due_ordinal)
+            ordinals.insert(position, due_ordinal)
+            offsets.insert(position, offset)
+    due_index["stamp"] = file_stamp(tasks_path)
+    save_sidecar(tasks_path + ".due", due_index)
+
+def read_due_tasks(first_ordinal, last_ordinal, tasks_path = TASKS_FILE,
+                   username = None, due_index = None, task_index = None):
+    """Handles yielding the incomplete tasks due between two ordinal day
+    numbers, inclusive, in due date order.
+
+    The range is found by bisecting the due date index, so only the tasks
+    inside it are read from the mapped tasks.txt. When username is given
+    only that user's tasks are yielded, and if task_index is given as well
+    and the user has fewer tasks than the range, their own tasks are read
+    instead. due_index defaults to the one saved next to tasks.txt.
+    """
+    if due_index is None:
+        due_index = load_due_index(tasks_path)
+    ordinals = due_index["ordinals"]
+    start = bisect_left(ordinals, first_ordinal)
+    end = bisect_right(ordinals, last_ordinal)
+    if start == end:
+        return
+
+    if username is not None and task_index is not None:
+        user_offsets = task_index["users"].get(username, [])
+        if len(user_offsets) < end - start:
+            yield from read_user_due_tasks(first_ordinal, last_ordinal,
+                                           tasks_path, user_offsets)
+            return
+
+    records = 0
+    bytes_read = 0
+    try:
+        with open(tasks_path, "rb") as task_info, \
+            mmap.mmap(task_info.fileno(), 0,
+                      access = mmap.ACCESS_READ) as buffer:
+            for offset in due_index["offsets"][start:end]:
+                task_record = TaskRecord(
+                    buffer[offset:_line_end(buffer, offset)])
+                records += 1
+                bytes_read += len(task_record.line)
+                if task_record.line.rstrip(b"\r").endswith(b"Yes"):
+                    continue
+                if username is None or task_record.username_is(username):
+                    yield task_record
+    finally:
+        count_io(records, bytes_read)
+
+def read_user_due_tasks(first_ordinal, last_ordinal, tasks_path,
+                        user_offsets):
+    """Handles yielding the incomplete tasks at a user's offsets that are
+    due between two ordinal day numbers, in the order read_due_tasks()
+    yields them.
+    """
+    due_tasks = []
+    with open(tasks_path, "rb") as task_info, \
+        mmap.mmap(task_info.fileno(), 0, access = mmap.ACCESS_READ) as buffer:
+        bytes_read = 0
+        for offset in user_offsets:
+            task_record = TaskRecord(buffer[offset:_line_end(buffer, offset)])
+            bytes_read += len(task_record.line)
+            if task_record.line.rstrip(b"\r").endswith(b"Yes"):
+                continue
+            due_ordinal = parse_task_date(task_record[3])
+            if due_ordinal is not None and \
+                first_ordinal <= due_ordinal <= last_ordinal:
+                due_tasks.append((due_ordinal, offset, task_record))
+    count_io(len(user_offsets), bytes_read)
+
+    # Ties keep file order, as they do in the due date index
+    due_tasks.sort(key = lambda due_task: due_task[:2])
+    for due_task in due_tasks:
+        yield due_task[2]
+
+def read_overdue_tasks(tasks_path = TASKS_FILE, username = None,
+                       today = None, due_index = None, task_index = None):
+    """Handles yielding the incomplete tasks due before today.
+    """
+    if today is None:
+        today = date.today()
+    return read_due_tasks(0, today.toordinal() - 1, tasks_path, username,
+                          due_index, task_index)
+
+def read_tasks_due_this_week(tasks_path = TASKS_FILE, username = None,
+                             today = None, due_index = None,
+                             task_index = None):
+    """Handles yielding the incomplete tasks due from today up to the end
+    of the week on Sunday.
+    """
+    if today is None:
+        today = date.today()
+    week_end = today + timedelta(days = 6 - today.weekday())
+    return read_due_tasks(today.toordinal(), week_end.toordinal(),
+                          tasks_path, username, due_index, task_index)
+
+def overdue_per_user(tasks_path = TASKS_FILE, today = None,
+                     due_index = None):
+    """Handles counting the overdue tasks of each user, returning a
+    dictionary sorted by username.
+    """
+    user_counts = {}
+    for task_record in read_overdue_tasks(tasks_path, today = today,
+                                          due_index = due_index):
+        username = task_record.line.split(b", ", 1)[0].decode("utf-8")
+        user_counts[username] = user_counts.get(username, 0) + 1
+    return dict(sorted(user_counts.items()))
+
+#====Keyword Search Section====
+
+# Identifies the postings file of the keyword search index
+SEARCH_MAGIC = b"TASKSRC1"
+
+# Length of the JSON token directory that follows the magic bytes
+SEARCH_HEADER = struct.Struct("<Q")
+
+# Postings kept in the JSON file of recent appends before they are merged
+# into the postings file
+SEARCH_MERGE_POSTINGS = 50000
+
+# Words are runs of letters and digits in any language
+SEARCH_TOKEN = re.compile(r"[^\W_]+")
+
+def search_tokens(text):
+    """Handles splitting text into the set of lowercase words it is searched
+    by.
+    """
+    return set(SEARCH_TOKEN.findall(text.lower()))
+
+def write_search_postings(tasks_path, postings, stamp):
+    """Handles writing the postings file of the search index, holding every
+    token's task offsets as one little-endian array after a JSON directory
+    of where each array starts.
+    """
+    directory = {}
+    position = 0
+    for token, offsets in postings.items():
+        directory[token] = [position, len(offsets)]
+        position += len(offsets) * offsets.itemsize
+    header = json.dumps({"stamp": stamp, "tokens": directory}).encode("utf-8")
+
+    with open(tasks_path + ".search.bin.tmp", "wb") as search_info:
+        search_info.write(SEARCH_MAGIC)
+        search_info.write(SEARCH_HEADER.pack(len(header)))
+        search_info.write(header)
+        for offsets in postings.values():
+            search_info.write(_little_endian(offsets).tobytes())
+    os.replace(tasks_path + ".search.bin.tmp", tasks_path + ".search.bin")
+
+def load_search_directory(tasks_path):
+    """Handles reading the stamp and token directory of the postings file,
+    returning None if it is missing or not a postings file.
+    """
+    try:
+        with open(tasks_path + ".search.bin", "rb") as search_info:
+            if search_info.read(len(SEARCH_MAGIC)) != SEARCH_MAGIC:
+                return None
+            header_size = SEARCH_HEADER.unpack(
+                search_info.read(SEARCH_HEADER.size))[0]
+            directory = json.loads(search_info.read(header_size))
+    except (OSError, ValueError, struct.error):
+        return None
+    directory["start"] = len(SEARCH_MAGIC) + SEARCH_HEADER.size + header_size
+    return directory
+
+def read_search_postings(search_info, directory, token):
+    """Handles reading one token's offsets from the open postings file.
+    """
+    offsets = array("Q")
+    if token not in directory["tokens"]:
+        return offsets
+    position, count = directory["tokens"][token]
+    search_info.seek(directory["start"] + position)
+    offsets.frombytes(search_info.read(count * offsets.itemsize))
+    return _little_endian(offsets)
+
+@instrument
+def build_search_index(tasks_path = TASKS_FILE):
+    """Handles scanning tasks.txt once and saving the offsets of the tasks
+    each word of a title or description appears in.
+
+    The offsets are saved in tasks.txt.search.bin, and tasks.txt.search
+    holds the offsets of tasks appended since, which are merged in once
+    there are SEARCH_MERGE_POSTINGS of them.
+    """
+    postings = {}
+    with open(tasks_path, "rb") as task_info:
+        stamp = file_stamp(tasks_path)
+        offset = 0
+
+        # Records the offset of each line against every word in it
+        for line in task_info:
+            if line.strip():
+                task_entry = split_task_line(line.decode("utf-8"))
+                if len(task_entry) > 2:
+                    for token in search_tokens(f"{task_entry[1]} "
+                                               f"{task_entry[2]}"):
+                        postings.setdefault(token, array("Q")).append(offset)
+            offset += len(line)
+    count_io(bytes_read = offset)
+
+    write_search_postings(tasks_path, postings, stamp)
+    recent = {"stamp": stamp, "postings_stamp": stamp, "count": 0,
+              "tokens": {}}
+    save_sidecar(tasks_path + ".search", recent)
+    return recent, load_search_directory(tasks_path)
+
+def load_search_index(tasks_path = TASKS_FILE):
+    """Handles loading the recent appends and the postings file directory
+    of the search index, rebuilding both when they no longer match
+    tasks.txt or each other.
+    """
+    recent = load_sidecar(tasks_path + ".search")
+    if recent is None or recent.get("stamp") != file_stamp(tasks_path):
+        return build_search_index(tasks_path)
+    directory = load_search_directory(tasks_path)
+    if directory is None or directory["stamp"] != recent["postings_stamp"]:
+        return build_search_index(tasks_path)
+    return recent, directory
+
+def search_index_append(appended, previous_stamp, tasks_path = TASKS_FILE):
+    """Handles adding the words of newly appended tasks to the search index.
+
+    appended is a list of (task_entry, offset) pairs and previous_stamp is
+    the file_stamp() of tasks.txt taken before they were written.
+    """
+    recent = load_sidecar(tasks_path + ".search")
+    if recent is None or recent.get("stamp") != previous_stamp:
+        return
+
+    for task_entry, offset in appended:
+        for token in search_tokens(f"{task_entry[1]} {task_entry[2]}"):
+            recent["tokens"].setdefault(token, []).append(offset)
+            recent["count"] += 1
+    recent["stamp"] = file_stamp(tasks_path)
+
+    # Merges the recent appends into the postings file once they are many
+    # enough to make loading the JSON file slow
+    directory = load_search_directory(tasks_path)
+    if recent["count"] >= SEARCH_MERGE_POSTINGS and directory is not None \
+        and directory["stamp"] == recent["postings_stamp"]:
+        postings = {}
+        with open(tasks_path + ".search.bin", "rb") as search_info:
+            for token in directory["tokens"].keys() | recent["tokens"].keys():
+                offsets = read_search_postings(search_info, directory, token)
+                offsets.extend(recent["tokens"].get(token, []))
+                postings[token] = offsets
+        write_search_postings(tasks_path, postings, recent["stamp"])
+        recent.update(postings_stamp = recent["stamp"], count = 0,
+                      tokens = {})
+    save_sidecar(tasks_path + ".search", recent)
+
+def search_tasks(keywords, tasks_path = TASKS_FILE, username = None,
+                 task_index = None):
+    """Handles yielding the tasks whose title or description contains every
+    word in keywords, in the order they appear in tasks.txt.
+
+    Each word's offsets are read from the search index and intersected
+    starting from the rarest word, so only matching tasks are read from
+    the mapped tasks.txt. When username and task_index are both given, the
+    user's offsets are intersected as well.
+    """
+    tokens = search_tokens(keywords)
+    if not tokens:
+        return
+    recent, directory = load_search_index(tasks_path)
+
+    # Orders the words by how many tasks contain them
+    token_postings = []
+    with open(tasks_path + ".search.bin", "rb") as search_info:
+        for token in tokens:
+            offsets = read_search_postings(search_info, directory, token)
+            offsets.extend(recent["tokens"].get(token, []))
+            if not offsets:
+                return
+            token_postings.append(offsets)
+    if username is not None and task_index is not None:
+        token_postings.append(task_index["users"].get(username, []))
+    token_postings.sort(key = len)
+
+    matches = set(token_postings[0])
+    for offsets in token_postings[1:]:
+        matches.intersection_update(offsets)
+        if not matches:
+            return
+
+    with open(tasks_path, "rb") as task_info, \
+        mmap.mmap(task_info.fileno(), 0, access = mmap.ACCESS_READ) as buffer:
+        for offset in sorted(matches):
+            task_record = TaskRecord(buffer[offset:_line_end(buffer, offset)])
+            count_io(1, len(task_record.line))
+            if username is None or task_record.username_is(username):
+                yield task_record
+
+# Append writers that still need committing when the program exits
+_open_writers = []
+
+def start_commit_timer(batch_seconds, commit_function):
+    """Handles starting a timer thread that calls commit_function once
+    batch_seconds have passed, so records written just before a session
+    goes idle are not left waiting for its next write. Returns the timer,
+    or None when batch_seconds is None.
+    """
+    if batch_seconds is None:
+        return None
+    timer = threading.Timer(batch_seconds, commit_function)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+class AppendWriter:
+    """Handles appending ", " separated records to tasks.txt or user.txt
+    through one handle kept open for the whole session.
+
+    Records are committed in groups: once batch_size records are waiting,
+    or once the oldest waiting record has waited batch_seconds, which a
+    timer thread checks even if nothing else is written. Each commit holds
+    commit_lock, so the timer never commits while a record is being
+    queued. Each commit is a single write and flush, followed by
+    os.fsync() when fsync is True. on_commit functions are then called with
+    the list of (fields, offset) pairs written and the file_stamp() taken
+    before the write, which is how the task index and statistics are kept
+    up to date.
+
+    Each commit holds an exclusive lock on the file, so several sessions can
+    append to the same file without interleaving partial lines. The time
+    spent waiting for the lock is recorded in lock_waits, lock_wait_seconds
+    and lock_wait_max.
+    """
+
+    def __init__(self, path, batch_size = 1, batch_seconds = None,
+                 fsync = False, on_commit = ()):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.fsync = fsync
+        self.on_commit = list(on_commit)
+        self.pending = []
+        self.pending_since = None
+        self.commit_lock = threading.RLock()
+        self.commit_timer = None
+        self.lock_waits = 0
+        self.lock_wait_seconds = 0.0
+        self.lock_wait_max = 0.0
+        self.handle = open(path, "ab")
+        _open_writers.append(self)
+
+    def lock(self):
+        """Handles locking the file, reopening it first if it was replaced,
+        such as by a migration, since the handle would otherwise write to
+        the old copy.
+        """
+        while True:
+            waited = lock_file(self.handle)
+            self.lock_waits += 1
+            self.lock_wait_seconds += waited
+            self.lock_wait_max = max(self.lock_wait_max, waited)
+            if not is_replaced(self.handle, self.path):
+                return
+            self.handle.close()
+            self.handle = open(self.path, "ab")
+
+    def write(self, fields):
+        """Handles queueing one record, committing the group when it is
+        full or has been waiting longer than batch_seconds.
+        """
+        with self.commit_lock:
+            if not self.pending:
+                self.pending_since = time.monotonic()
+                self.commit_timer = start_commit_timer(self.batch_seconds,
+                                                       self.commit)
+            self.pending.append(fields)
+
+            if len(self.pending) >= self.batch_size or \
+                (self.batch_seconds is not None and
+                 time.monotonic() - self.pending_since >= self.batch_seconds):
+                self.commit()
+
+    def commit(self):
+        """Handles writing every waiting record in one write and flush.
+        """
+        with self.commit_lock:
+            if self.commit_timer is not None:
+                self.commit_timer.cancel()
+                self.commit_timer = None
+            if not self.pending:
+                return
+
+            # Holds the lock until the sidecar files are updated as well, so
+            # the offsets worked out below cannot be moved by another session
+            self.lock()
+            try:
+                previous_stamp = file_stamp(self.path)
+                position = previous_stamp[0]
+                appended = []
+                chunks = []
+
+                # Works out where each record will start; the first record in
+                # an empty file is written without a line break ahead of it
+                for fields in self.pending:
+                    line_break = LINE_BREAK if position else b""
+                    record = line_break + ", ".join(fields).encode("utf-8")
+                    appended.append((fields, position + len(line_break)))
+                    chunks.append(record)
+                    position += len(record)
+
+                records = b"".join(chunks)
+                self.handle.write(records)
+                self.handle.flush()
+                count_io(bytes_written = len(records))
+                if self.fsync:
+                    os.fsync(self.handle.fileno())
+                self.pending = []
+
+                for commit_function in self.on_commit:
+                    commit_function(appended, previous_stamp)
+            finally:
+                unlock_file(self.handle)
+
+    def close(self):
+        """Handles committing waiting records and closing the handle.
+        """
+        with self.commit_lock:
+            if self.handle.closed:
+                return
+            self.commit()
+            self.handle.close()
+        if self in _open_writers:
+            _open_writers.remove(self)
+
+# Task stores whose snapshots still need saving when the program exits
+_open_stores = []
+
+def close_writers():
+    """Handles closing every open task store, which saves its snapshot,
+    then committing and closing any other open append writer.
+    """
+    for store in list(_open_stores):
+        store.close()
+    for writer in list(_open_writers):
+        writer.close()
+
+# Commits anything left waiting if the program ends without user_exit()
+atexit.register(close_writers)
+
+#====Binary Task Format====
+
+# Identifies a binary task file and its format version. Version 1 files
+# only stored whether each task was complete.
+BINARY_MAGIC = b"TASKBIN2"
+BINARY_MAGIC_V1 = b"TASKBIN1"
+
+# Number of tasks and number of distinct usernames
+BINARY_HEADER = struct.Struct("<II")
+
+# Offset of the status column, which has one byte per task
+BINARY_STATUS_OFFSET = len(BINARY_MAGIC) + BINARY_HEADER.size
+
+# Bits of a task's status byte: whether it is complete, whether "No" was
+# padded to STATUS_WIDTH, and whether its line ends with "\r" and "\n"
+STATUS_COMPLETE = 1
+STATUS_PADDED = 2
+STATUS_CR = 4
+STATUS_LF = 8
+
+class Task:
+    """Handles one task with its dates held as ordinals.
+
+    Date text is only kept when it differs from how the ordinal would be
+    written with DATE_FORMAT, such as "10 Oct 2019" or a due date that
+    could not be parsed. Together with the padding of the status and the
+    line ending, this means converting back to tasks.txt gives back exactly
+    what was there.
+    """
+    __slots__ = ("username", "title", "description", "due_ordinal",
+                 "assigned_ordinal", "due_text", "assigned_text",
+                 "completed", "padded", "line_end")
+
+    def __init__(self, username, title, description, due_ordinal,
+                 assigned_ordinal, due_text = "", assigned_text = "",
+                 completed = False, padded = True, line_end = os.linesep):
+        self.username = username
+        self.title = title
+        self.description = description
+        self.due_ordinal = due_ordinal
+        self.assigned_ordinal = assigned_ordinal
+        self.due_text = due_text
+        self.assigned_text = assigned_text
+        self.completed = completed
+        self.padded = padded
+        self.line_end = line_end
+
+    @classmethod
+    def from_entry(cls, task_entry):
+        """Handles creating a Task from a tasks.txt task entry.
+        """
+        due_ordinal, due_text = _encode_date(task_entry[3])
+        assigned_ordinal, assigned_text = _encode_date(task_entry[4])
+        return cls(task_entry[0], task_entry[1], task_entry[2], due_ordinal,
+                   assigned_ordinal, due_text, assigned_text,
+                   task_entry[5] == "Yes")
+
+    @classmethod
+    def from_record(cls, task_record, line_break = True):
+        """Handles creating a Task from a TaskRecord, keeping whether its
+        status was padded and how its line ends. line_break is False for a
+        last line with no line break after it.
+        """
+        task = cls.from_entry(task_record)
+        line = task_record.line
+        carriage_return = line.endswith(b"\r")
+        if carriage_return:
+            line = line[:-1]
+        task.padded = line.endswith(b", " + "No".ljust(STATUS_WIDTH).encode())
+        task.line_end = ("\r" if carriage_return else "") \
+            + ("\n" if line_break else "")
+        return task
+
+    @property
+    def due_date(self):
+        return _decode_date(self.due_ordinal, self.due_text)
+
+    @property
+    def assigned_date(self):
+        return _decode_date(self.assigned_ordinal, self.assigned_text)
+
+    @property
+    def status(self):
+        if self.completed:
+            return "Yes"
+        return "No".ljust(STATUS_WIDTH) if self.padded else "No"
+
+    @property
+    def status_byte(self):
+        """Handles packing the completion, status padding and line ending of
+        the task into its byte in the status column.
+        """
+        return (STATUS_COMPLETE * self.completed
+                | STATUS_PADDED * (self.padded and not self.completed)
+                | STATUS_CR * ("\r" in self.line_end)
+                | STATUS_LF * ("\n" in self.line_end))
+
+    def entry(self):
+        """Handles returning the task as a tasks.txt task entry.
+        """
+        return [getattr(self, field) for field in TASK_ENTRY_FIELDS]
+
+    def __getitem__(self, position):
+        return getattr(self, TASK_ENTRY_FIELDS[position])
+
+# Task attributes in the order of the fields of a tasks.txt task entry
+TASK_ENTRY_FIELDS = ("username", "title", "description", "due_date",
+                     "assigned_date", "status")
+
+def _encode_date(text):
+    """Handles splitting date text into an ordinal and the text that has to
+    be kept alongside it, which is empty when the ordinal is enough.
+    """
+    ordinal = parse_task_date(text)
+    if ordinal is None:
+        return 0, text
+    if date.fromordinal(ordinal).strftime(DATE_FORMAT) == text:
+        return ordinal, ""
+    return ordinal, text
+
+def _decode_date(ordinal, text):
+    """Handles turning a stored ordinal and text back into date text.
+    """
+    if text or not ordinal:
+        return text
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+def _little_endian(column):
+    """Handles converting an array column to and from the little-endian
+    byte order used on disk.
+    """
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+class TaskColumns:
+    """Handles the tasks of a binary task file held as columns.
+
+    The status, username, due date and assigned date of every task are held
+    in arrays, and all text is held in one UTF-8 blob with the end offset of
+    each string stored in the file. Loading is a handful of array copies and
+    text is only decoded when a task is read.
+    """
+    __slots__ = ("status", "user_ids", "due_ordinals", "assigned_ordinals",
+                 "text_ends", "text", "usernames")
+
+    def __init__(self, status, user_ids, due_ordinals, assigned_ordinals,
+                 text_ends, text, usernames):
+        self.status = status
+        self.user_ids = user_ids
+        self.due_ordinals = due_ordinals
+        self.assigned_ordinals = assigned_ordinals
+        self.text_ends = text_ends
+        self.text = text
+        self.usernames = usernames
+
+    def __len__(self):
+        return len(self.status)
+
+    def text_field(self, position):
+        """Handles decoding one string from the text blob.
+        """
+        start = self.text_ends[position - 1] if position else 0
+        return self.text[start:self.text_ends[position]].decode("utf-8")
+
+    def __getitem__(self, task_number):
+        if task_number < 0:
+            task_number += len(self)
+        text_position = len(self.usernames) + 4 * task_number
+        status = self.status[task_number]
+        return Task(self.usernames[self.user_ids[task_number]],
+                    self.text_field(text_position),
+                    self.text_field(text_position + 1),
+                    self.due_ordinals[task_number],
+                    self.assigned_ordinals[task_number],
+                    self.text_field(text_position + 2),
+                    self.text_field(text_position + 3),
+                    bool(status & STATUS_COMPLETE),
+                    bool(status & STATUS_PADDED),
+                    ("\r" if status & STATUS_CR else "")
+                    + ("\n" if status & STATUS_LF else ""))
+
+    def __iter__(self):
+        for task_number in range(len(self)):
+            yield self[task_number]
+
+def write_binary_tasks(tasks, binary_path):
+    """Handles writing Task objects to a binary task file.
+    """
+    status = bytearray()
+    user_ids = array("I")
+    due_ordinals = array("i")
+    assigned_ordinals = array("i")
+    user_numbers = {}
+    task_text = []
+
+    # Splits each task into its fixed-width columns and its strings
+    for task in tasks:
+        status.append(task.status_byte)
+        user_ids.append(user_numbers.setdefault(task.username,
+                                                len(user_numbers)))
+        due_ordinals.append(task.due_ordinal)
+        assigned_ordinals.append(task.assigned_ordinal)
+        task_text.extend((task.title, task.description, task.due_text,
+                          task.assigned_text))
+
+    # Stores usernames ahead of the task strings, then records where each
+    # string ends in the blob
+    text_ends = array("I")
+    text = bytearray()
+    for string in list(user_numbers) + task_text:
+        text += string.encode("utf-8")
+        text_ends.append(len(text))
+
+    with open(binary_path, "wb") as binary_info:
+        binary_info.write(BINARY_MAGIC)
+        binary_info.write(BINARY_HEADER.pack(len(status), len(user_numbers)))
+        binary_info.write(status)
+        for column in (user_ids, due_ordinals, assigned_ordinals, text_ends):
+            binary_info.write(_little_endian(column).tobytes())
+        binary_info.write(text)
+
+def load_binary_tasks(binary_path):
+    """Handles loading a binary task file into TaskColumns.
+    """
+    with open(binary_path, "rb") as binary_info:
+        data = binary_info.read()
+
+    if not data.startswith((BINARY_MAGIC, BINARY_MAGIC_V1)):
+        raise ValueError(f"{binary_path} is not a binary task file.")
+
+    task_count, user_count = BINARY_HEADER.unpack_from(data,
+                                                       len(BINARY_MAGIC))
+    offset = BINARY_STATUS_OFFSET
+    status = bytearray(data[offset:offset + task_count])
+    offset += task_count
+
+    # Version 1 files wrote LINE_BREAK between tasks and an unpadded "No"
+    if data.startswith(BINARY_MAGIC_V1):
+        line_break = STATUS_LF | STATUS_CR * (LINE_BREAK == b"\r\n")
+        for task_number in range(task_count - 1):
+            status[task_number] |= line_break
+
+    # Copies each fixed-width column straight into an array
+    columns = []
+    for typecode, length in (("I", task_count), ("i", task_count),
+                             ("i", task_count),
+                             ("I", user_count + 4 * task_count)):
+        column = array(typecode)
+        column.frombytes(data[offset:offset + length * column.itemsize])
+        columns.append(_little_endian(column))
+        offset += length * column.itemsize
+    user_ids, due_ordinals, assigned_ordinals, text_ends = columns
+
+    text = data[offset:]
+    task_columns = TaskColumns(status, user_ids, due_ordinals,
+                               assigned_ordinals, text_ends, text, [])
+    task_columns.usernames = [task_columns.text_field(position)
+                              for position in range(user_count)]
+    return task_columns
+
+def _tasks_from_records(tasks_path):
+    """Handles yielding a Task for every task in tasks.txt, where only the
+    last line may have no line break after it.
+    """
+    with open(tasks_path, "rb") as task_info:
+        task_info.seek(0, os.SEEK_END)
+        ends_with_break = task_info.tell() == 0
+        if not ends_with_break:
+            task_info.seek(-1, os.SEEK_END)
+            ends_with_break = task_info.read(1) == b"\n"
+
+    previous_record = None
+    for task_record in iter_task_records(tasks_path):
+        if previous_record is not None:
+            yield Task.from_record(previous_record)
+        previous_record = task_record
+    if previous_record is not None:
+        yield Task.from_record(previous_record, ends_with_break)
+
+def convert_tasks_to_binary(tasks_path = TASKS_FILE,
+                            binary_path = "tasks.bin"):
+    """Handles converting tasks.txt into the binary task format.
+    """
+    write_binary_tasks(_tasks_from_records(tasks_path), binary_path)
+
+def convert_binary_to_tasks(binary_path = "tasks.bin",
+                            tasks_path = TASKS_FILE):
+    """Handles converting a binary task file back into the tasks.txt layout,
+    with each task's status padding and line ending as they were.
+    """
+    with open(tasks_path, "wb") as task_info:
+        for task in load_binary_tasks(binary_path):
+            task_info.write((", ".join(task.entry())
+                             + task.line_end).encode("utf-8"))
+
+#====Task Completion Section====
+
+def migrate_status_field(tasks_path = TASKS_FILE):
+    """Handles rewriting tasks.txt once so every "No" status is padded to
+    STATUS_WIDTH. Returns the number of tasks that were migrated.
+
+    The rest of every line is copied unchanged. The task index and
+    statistics no longer match the file afterwards and rebuild themselves.
+    """
+    migrated = 0
+    temp_path = tasks_path + ".tmp"
+
+    # Holds the lock until the new file has replaced the old one, so no
+    # session appends to the old file while it is being copied
+    with locked_open(tasks_path, "rb") as task_info:
+        with open(temp_path, "wb") as migrated_info:
+            for line in task_info:
+                content = line.rstrip(b"\r\n")
+                if content.endswith(b", No"):
+                    content += b" " * (STATUS_WIDTH - 2)
+                    migrated += 1
+                migrated_info.write(content
+                                    + line[len(line.rstrip(b"\r\n")):])
+        os.replace(temp_path, tasks_path)
+    return migrated
+
+def mark_task_complete(offset, inode, tasks_path):
+    """Handles marking the task starting at offset as complete by
+    overwriting only its status bytes.
+
+    inode is the inode of tasks.txt the offset was read from. Returns None
+    if tasks.txt has been replaced since then, so the offset has to be
+    looked up again, and False if the task was already complete. Raises
+    ValueError if the task's status has not been migrated to STATUS_WIDTH.
+    """
+    with locked_open(tasks_path, "r+b") as task_info:
+        previous_stamp = file_stamp(tasks_path)
+        if previous_stamp[2] != inode:
+            return None
+
+        task_info.seek(offset)
+        content = task_info.readline().rstrip(b"\r\n")
+        status = content[-STATUS_WIDTH:]
+        if status == b"Yes":
+            return False
+        if status != b"No".ljust(STATUS_WIDTH) or \
+            content[-STATUS_WIDTH - 2:-STATUS_WIDTH] != b", ":
+            raise ValueError("Task status is not fixed width.")
+
+        task_info.seek(offset + len(content) - STATUS_WIDTH)
+        task_info.write(b"Yes")
+        task_info.flush()
+        count_io(1, len(content), STATUS_WIDTH)
+
+        # Keeps the task index, statistics and snapshots in step with the
+        # edit
+        task_entry = split_task_line(content.decode("utf-8"))
+        journal_completion(offset, inode, tasks_path)
+        index_restamp(previous_stamp, tasks_path)
+        stats_task_completed(task_entry, previous_stamp, tasks_path)
+    return True
+
+def complete_user_task(username, task_number, tasks_path,
+                       load_index = load_task_index):
+    """Handles marking a user's task complete by its number in their task
+    list, migrating tasks.txt first if its status field is not fixed width.
+    load_index is called with tasks_path to look up the task's offset.
+
+    Returns False if the task was already complete. Raises IndexError for
+    a task number the user does not have.
+    """
+    migrated = False
+    while True:
+        task_index = load_index(tasks_path)
+        offsets = task_index["users"].get(username, [])
+        if not 1 <= task_number <= len(offsets):
+            raise IndexError(f"{username} has no task {task_number}.")
+        try:
+            completed = mark_task_complete(offsets[task_number - 1],
+                                           task_index["stamp"][2], tasks_path)
+        except ValueError:
+            if migrated:
+                raise
+            migrate_status_field(tasks_path)
+            migrated = True
+            continue
+
+        # Looks the offset up again if tasks.txt was replaced meanwhile
+        if completed is not None:
+            return completed
+
+def index_restamp(previous_stamp, tasks_path = TASKS_FILE):
+    """Handles updating the task index, due date index and search index
+    stamps after an edit that did not move any task.
+    """
+    for suffix in (".idx", ".due", ".search"):
+        task_index = load_sidecar(tasks_path + suffix)
+        if task_index is not None and \
+            task_index.get("stamp") == previous_stamp:
+            task_index["stamp"] = file_stamp(tasks_path)
+            save_sidecar(tasks_path + suffix, task_index)
+
+def stats_task_completed(task_entry, previous_stamp, tasks_path):
+    """Handles moving a task that was just marked complete from the
+    incomplete to the completed counts of the saved statistics.
+    """
+    task_stats = load_sidecar(tasks_path + ".stats")
+    if task_stats is None or task_stats["stamps"] != \
+        {"tasks": previous_stamp}:
+        return
+
+    user_stats = task_stats["users"][task_entry[0]]
+    task_stats["completed"] += 1
+    task_stats["incomplete"] -= 1
+    user_stats["completed"] += 1
+
+    # Removes the task from the incomplete tasks grouped by due date
+    due_ordinal = parse_task_date(task_entry[3])
+    if due_ordinal is not None:
+        for due_counts in (task_stats["due"], user_stats["due"]):
+            due_counts[str(due_ordinal)] -= 1
+            if not due_counts[str(due_ordinal)]:
+                del due_counts[str(due_ordinal)]
+
+    task_stats["stamps"]["tasks"] = file_stamp(tasks_path)
+    save_sidecar(tasks_path + ".stats", task_stats)
+
+#====Sharded Layout Section====
+
+# Directory holding one tasks file per user in the sharded layout
+SHARDS_DIRECTORY = "tasks"
+
+# Most shard append writers a TaskStore keeps open at once
+SHARD_WRITERS_OPEN = 64
+
+# Sidecar files kept next to a tasks file
+SIDECAR_SUFFIXES = (".idx", ".stats", ".due", ".search",
+                    ".search.bin", ".done")
+
+def shard_path(username, shards_path = SHARDS_DIRECTORY):
+    """Handles returning the path of the file holding a user's tasks,
+    quoting any characters that cannot be used in a file name.
+    """
+    return os.path.join(shards_path, quote(username, safe = "") + ".txt")
+
+def shard_paths(shards_path = SHARDS_DIRECTORY):
+    """Handles returning the path of every shard, sorted by file name.
+    """
+    return sorted(os.path.join(shards_path, name)
+                  for name in os.listdir(shards_path) if name.endswith(".txt"))
+
+def remove_sidecars(tasks_path):
+    """Handles deleting the sidecar files of a tasks file.
+    """
+    for suffix in SIDECAR_SUFFIXES:
+        if os.path.exists(tasks_path + suffix):
+            os.remove(tasks_path + suffix)
+
+def read_sharded_tasks(read_function, shards_path = SHARDS_DIRECTORY,
+                       username = None):
+    """Handles chaining a reader such as iter_task_records() or
+    read_overdue_tasks() over one user's shard, or over every shard one
+    after another when username is None.
+
+    Only one shard is open at a time, so tasks are grouped by user rather
+    than kept in the order they were assigned.
+    """
+    if username is None:
+        paths = shard_paths(shards_path)
+    else:
+        paths = [shard_path(username, shards_path)]
+    for path in paths:
+        if os.path.exists(path):
+            yield from read_function(path)
+
+def group_user_lines(lines):
+    """Handles grouping task lines by username, keeping their order and
+    dropping blank lines and line breaks.
+    """
+    user_lines = {}
+    for line in lines:
+        if line.strip():
+            username = line.split(b", ", 1)[0].decode("utf-8").strip()
+            user_lines.setdefault(username, []).append(line.rstrip(b"\r\n"))
+    return user_lines
+
+def shard_archives(tasks_path = TASKS_FILE, shards_path = SHARDS_DIRECTORY):
+    """Handles copying each archive segment of tasks.txt into the archive of
+    every user's shard with tasks in it, keeping its compression and the
+    date it was archived. Returns the number of archived tasks copied.
+
+    A user whose tasks are all archived is given an empty shard, as the
+    task store only looks for archives next to shards.
+    """
+    archived = 0
+    for segment in load_archive_manifest(tasks_path)["segments"]:
+        with ARCHIVE_OPENERS[segment["compression"]](
+            os.path.join(archive_path(tasks_path), segment["file"]),
+            "rb") as segment_info:
+            user_lines = group_user_lines(segment_info)
+
+        for username, lines in user_lines.items():
+            user_path = shard_path(username, shards_path)
+            open(user_path, "ab").close()
+            segment_stats = new_task_stats()
+            for line in lines:
+                count_task(segment_stats, split_task_line(line.decode("utf-8")))
+            add_archive_segment(user_path, lines, segment_stats,
+                                segment["compression"], segment["archived"])
+            archived += len(lines)
+    return archived
+
+def migrate_to_shards(tasks_path = TASKS_FILE,
+                      shards_path = SHARDS_DIRECTORY):
+    """Handles splitting tasks.txt and its archive into one shard and one
+    archive per user, returning the number of tasks moved, archived ones
+    included.
+
+    Tasks are added after any already in a user's shard or archive.
+    tasks.txt and its archive are then renamed to tasks.txt.unsharded and
+    tasks.txt.archive.unsharded, so their tasks are not read twice, and the
+    sidecar files of tasks.txt are deleted.
+    """
+    with locked_open(tasks_path, "rb") as task_info:
+        user_lines = group_user_lines(task_info)
+
+        os.makedirs(shards_path, exist_ok = True)
+        for username, lines in user_lines.items():
+            with locked_open(shard_path(username, shards_path),
+                             "ab") as shard_info:
+                line_break = LINE_BREAK if shard_info.tell() else b""
+                shard_info.write(line_break + LINE_BREAK.join(lines))
+        archived = shard_archives(tasks_path, shards_path)
+
+        os.replace(tasks_path, tasks_path + ".unsharded")
+        if os.path.isdir(archive_path(tasks_path)):
+            unsharded_archive = archive_path(tasks_path) + ".unsharded"
+            if os.path.isdir(unsharded_archive):
+                shutil.rmtree(unsharded_archive)
+            os.replace(archive_path(tasks_path), unsharded_archive)
+    remove_sidecars(tasks_path)
+    return sum(len(lines) for lines in user_lines.values()) + archived
+
+def check_shard_files(shards_path = SHARDS_DIRECTORY):
+    """Handles raising ValueError if the shards directory holds anything
+    besides shards, their sidecar and temporary files, and their archives,
+    or if an archive holds files its manifest does not list. Merging would
+    otherwise delete them without writing them anywhere.
+    """
+    known_suffixes = (".txt", ".tmp") + tuple(".txt" + suffix for suffix
+                                              in SIDECAR_SUFFIXES)
+    for name in os.listdir(shards_path):
+        path = os.path.join(shards_path, name)
+        if os.path.isdir(path) and name.endswith(".txt.archive"):
+            manifest = load_archive_manifest(path.removesuffix(".archive"))
+            unknown = set(os.listdir(path)) - {"manifest.json"} \
+                - {segment["file"] for segment in manifest["segments"]}
+            if unknown:
+                raise ValueError(f"{path} holds files its manifest does not "
+                                 f"list: {', '.join(sorted(unknown))}")
+        elif not os.path.isfile(path) or not name.endswith(known_suffixes):
+            raise ValueError(f"{path} is not a shard, sidecar or archive.")
+
+def merge_archives(shards_path, merged_path):
+    """Handles copying the archive segments of every shard into a new
+    archive directory, oldest first, returning the number of archived tasks
+    they hold. Nothing is written if no shard has an archive.
+    """
+    segments = []
+    for name in sorted(os.listdir(shards_path)):
+        if name.endswith(".txt.archive"):
+            path = os.path.join(shards_path, name)
+            segments.extend((path, segment) for segment in
+                            load_archive_manifest(
+                                path.removesuffix(".archive"))["segments"])
+    if not segments:
+        return 0
+
+    # Keeps each shard's segments in order among those archived the same day
+    segments.sort(key = lambda item: parse_task_date(item[1]["archived"])
+                  or 0)
+    os.makedirs(merged_path)
+    manifest = {"segments": []}
+    for number, (path, segment) in enumerate(segments, 1):
+        segment_name = f"segment-{number:04d}.txt" \
+            f"{ARCHIVE_EXTENSIONS[segment['compression']]}"
+        shutil.copyfile(os.path.join(path, segment["file"]),
+                        os.path.join(merged_path, segment_name))
+        manifest["segments"].append(dict(segment, file = segment_name))
+    save_sidecar(os.path.join(merged_path, "manifest.json"), manifest)
+    return sum(segment["stats"]["total_tasks"]
+               for path, segment in segments)
+
+def merge_shards(shards_path = SHARDS_DIRECTORY, tasks_path = TASKS_FILE):
+    """Handles writing every shard back into a single tasks.txt, and every
+    shard's archive into the archive of tasks.txt, then deleting the shards
+    directory. Returns the number of tasks merged, archived ones included.
+
+    The new tasks.txt and archive are written in full before anything is
+    replaced or deleted, so a merge that fails leaves the shards as they
+    were. Raises ValueError before writing anything if tasks.txt already
+    has an archive, or the shards directory holds files it cannot merge,
+    and before replacing anything if a shard was added meanwhile.
+
+    Every shard stays locked until the shards directory is deleted, as
+    migrate_to_shards() locks them, so no other session can append a task
+    that the merge would not copy.
+    """
+    if os.path.exists(archive_path(tasks_path)):
+        raise ValueError(f"{archive_path(tasks_path)} already exists.")
+    check_shard_files(shards_path)
+
+    merged_archive = archive_path(tasks_path) + ".tmp"
+    task_count = 0
+    with ExitStack() as shard_locks:
+        paths = shard_paths(shards_path)
+        for path in paths:
+            shard_locks.enter_context(locked_open(path, "rb"))
+        try:
+            with open(tasks_path + ".tmp", "wb") as task_info:
+                for task_record in read_sharded_tasks(iter_task_records,
+                                                      shards_path):
+                    if task_count:
+                        task_info.write(LINE_BREAK)
+                    task_info.write(task_record.line.rstrip(b"\r"))
+                    task_count += 1
+            task_count += merge_archives(shards_path, merged_archive)
+            if shard_paths(shards_path) != paths:
+                raise ValueError(f"A shard was added to {shards_path} "
+                                 f"while merging.")
+        except Exception:
+            if os.path.exists(tasks_path + ".tmp"):
+                os.remove(tasks_path + ".tmp")
+            shutil.rmtree(merged_archive, ignore_errors = True)
+            raise
+
+        os.replace(tasks_path + ".tmp", tasks_path)
+        remove_sidecars(tasks_path)
+        if os.path.isdir(merged_archive):
+            os.replace(merged_archive, archive_path(tasks_path))
+        shutil.rmtree(shards_path)
+    return task_count
+
+def load_sharded_stats(shards_path = SHARDS_DIRECTORY,
+                       users_path = USERS_FILE, workers = None):
+    """Handles adding up the saved statistics of every shard, with the users
+    counted from user.txt.
+
+    Each shard's statistics are stamped against that shard alone, so only
+    the shards that changed are recounted, whatever happened to user.txt.
+    """
+    task_stats = new_task_stats()
+    for path in shard_paths(shards_path):
+        merge_task_stats(task_stats, load_task_stats(path, workers))
+    task_stats["total_users"] = count_lines(users_path)
+    return task_stats
+
+def sharded_overdue_per_user(shards_path = SHARDS_DIRECTORY, today = None):
+    """Handles counting the overdue tasks of each user across every shard.
+    """
+    user_counts = {}
+    for path in shard_paths(shards_path):
+        user_counts.update(overdue_per_user(path, today))
+    return dict(sorted(user_counts.items()))
+
+#====Archive Section====
+
+# Openers and file extensions of the compressions archive segments can use
+ARCHIVE_OPENERS = {"gzip": gzip.open, "lzma": lzma.open}
+ARCHIVE_EXTENSIONS = {"gzip": ".gz", "lzma": ".xz"}
+
+def archive_path(tasks_path = TASKS_FILE):
+    """Handles returning the directory archived tasks are kept in, next to
+    the tasks file they were moved from.
+    """
+    return tasks_path + ".archive"
+
+def load_archive_manifest(tasks_path = TASKS_FILE):
+    """Handles loading the list of archive segments of a tasks file.
+    """
+    manifest = load_sidecar(os.path.join(archive_path(tasks_path),
+                                         "manifest.json"))
+    if manifest is None:
+        manifest = {"segments": []}
+    return manifest
+
+def add_archive_segment(tasks_path, lines, segment_stats,
+                        compression = "gzip", archived = None):
+    """Handles writing task lines into a new compressed segment of a tasks
+    file's archive and listing it in the manifest with their statistics.
+    archived is the date text recorded for the segment, today by default.
+    """
+    os.makedirs(archive_path(tasks_path), exist_ok = True)
+    manifest = load_archive_manifest(tasks_path)
+    segment_name = f"segment-{len(manifest['segments']) + 1:04d}.txt" \
+        f"{ARCHIVE_EXTENSIONS[compression]}"
+    segment_file = os.path.join(archive_path(tasks_path), segment_name)
+    with ARCHIVE_OPENERS[compression](segment_file, "wb") as segment_info:
+        segment_info.write(LINE_BREAK.join(lines))
+    count_io(bytes_written = os.path.getsize(segment_file))
+    segment_stats.pop("stamps", None)
+    if archived is None:
+        archived = date.today().strftime(DATE_FORMAT)
+    manifest["segments"].append(
+        {"file": segment_name, "compression": compression,
+         "archived": archived, "stats": segment_stats})
+    save_sidecar(os.path.join(archive_path(tasks_path), "manifest.json"),
+                 manifest)
+
+@instrument
+def archive_tasks(tasks_path = TASKS_FILE, cutoff = None,
+                  compression = "gzip"):
+    """Handles moving completed tasks, and tasks assigned before the cutoff
+    ordinal day number, out of tasks.txt into a new compressed archive
+    segment. Returns the number of tasks archived.
+
+    The manifest records each segment's statistics, so the statistics can
+    still count archived tasks without decompressing them.
+    """
+    if compression not in ARCHIVE_OPENERS:
+        raise ValueError(f"Unknown compression \"{compression}\".")
+
+    with locked_open(tasks_path, "rb") as task_info:
+        hot_lines = []
+        cold_lines = []
+        segment_stats = new_task_stats()
+
+        # Sorts each task into the lines kept and the lines archived
+        for line in task_info:
+            line = line.rstrip(b"\r\n")
+            if not line.strip():
+                continue
+            task_entry = split_task_line(line.decode("utf-8"))
+            assigned_ordinal = parse_task_date(task_entry[4])
+            if task_entry[5] == "Yes" or (cutoff is not None and
+                                          assigned_ordinal is not None and
+                                          assigned_ordinal < cutoff):
+                cold_lines.append(line)
+                count_task(segment_stats, task_entry)
+            else:
+                hot_lines.append(line)
+        count_io(len(hot_lines) + len(cold_lines), task_info.tell())
+        if not cold_lines:
+            return 0
+
+        # Writes the segment and lists it before the tasks leave tasks.txt
+        add_archive_segment(tasks_path, cold_lines, segment_stats,
+                            compression)
+
+        with open(tasks_path + ".tmp", "wb") as hot_info:
+            hot_info.write(LINE_BREAK.join(hot_lines))
+            count_io(bytes_written = hot_info.tell())
+        os.replace(tasks_path + ".tmp", tasks_path)
+    return len(cold_lines)
+
+def read_archived_tasks(tasks_path = TASKS_FILE, username = None):
+    """Handles yielding the archived tasks of a tasks file, oldest segment
+    first, decompressing each segment as it is read.
+
+    When username is given, segments the manifest shows have none of that
+    user's tasks are skipped without being opened.
+    """
+    for segment in load_archive_manifest(tasks_path)["segments"]:
+        if username is not None and \
+            username not in segment["stats"]["users"]:
+            continue
+        with ARCHIVE_OPENERS[segment["compression"]](
+            os.path.join(archive_path(tasks_path), segment["file"]),
+            "rb") as segment_info:
+            records = 0
+            try:
+                for line in segment_info:
+                    records += 1
+                    task_record = TaskRecord(line.rstrip(b"\r\n"))
+                    if username is None or task_record.username_is(username):
+                        yield task_record
+            finally:
+                count_io(records, segment_info.tell())
+
+def load_archive_stats(tasks_path = TASKS_FILE):
+    """Handles adding up the statistics the manifest records for every
+    archive segment of a tasks file.
+    """
+    task_stats = new_task_stats()
+    for segment in load_archive_manifest(tasks_path)["segments"]:
+        merge_task_stats(task_stats, segment["stats"])
+    return task_stats
+
+#====Snapshot Section====
+
+# File the parsed users, task index, due date index and statistics are
+# saved to, next to tasks.txt and user.txt
+SNAPSHOT_FILE = "task_manager.snapshot"
+
+# Changes whenever the layout of the snapshot changes
+SNAPSHOT_VERSION = 2
+
+# Bytes replayed since the snapshot was saved before it is saved again
+SNAPSHOT_SAVE_BYTES = 1024 * 1024
+
+# Bytes before the end of the covered part of a file kept to check that
+# the covered part has not been rewritten
+SNAPSHOT_CHECK_BYTES = 64
+
+# Status of a task marked complete in place, which the check bytes read as
+# "No " so that completing one of the last tasks is not taken for a rewrite
+COMPLETED_STATUS = re.compile(rb", Yes(?=\r?\n|\r?\Z)")
+
+# Most due dates added to the snapshot one at a time by bisect; more than
+# this are added by sorting the whole due date index again
+SNAPSHOT_INSERT_LIMIT = 1024
+
+# Inode and offset of each task marked complete in place, appended to the
+# completion journal next to tasks.txt
+JOURNAL_ENTRY = struct.Struct("<QQ")
+
+def journal_completion(offset, inode, tasks_path = TASKS_FILE):
+    """Handles recording a task marked complete in place in the completion
+    journal, so snapshots taken before it can replay it.
+    """
+    with open(tasks_path + ".done", "ab") as journal_info:
+        journal_info.write(JOURNAL_ENTRY.pack(inode, offset))
+
+def read_tail(handle, start, end):
+    """Handles reading the lines of an open file between two byte offsets,
+    returning (offset, line) pairs for the non-empty lines.
+    """
+    handle.seek(start)
+    position = start
+    tail_lines = []
+    for piece in handle.read(end - start).split(b"\n"):
+        line = piece.rstrip(b"\r")
+        if line.strip():
+            tail_lines.append((position, line))
+        position += len(piece) + 1
+    count_io(len(tail_lines), end - start)
+    return tail_lines
+
+def snapshot_task_range(tasks_path, range_start, range_end):
+    """Handles reading the tasks between two byte offsets of tasks.txt into
+    the task index, due dates and statistics a TaskSnapshot keeps. Due
+    dates come back as arrays of ordinals and offsets in file order, which
+    cross between processes far faster than a list of pairs. This runs in
+    the statistics worker processes.
+    """
+    part = TaskSnapshot(None, None, tasks_path)
+    part.state = {"index": {}, "stats": new_task_stats()}
+    due_entries = []
+    with open(tasks_path, "rb") as task_info:
+        for offset, line in read_tail(task_info, range_start, range_end):
+            part.add_task(split_task_line(line.decode("utf-8")), offset,
+                          due_entries)
+    return (part.state["index"],
+            array("i", [due_entry[0] for due_entry in due_entries]),
+            array("Q", [due_entry[1] for due_entry in due_entries]),
+            part.state["stats"])
+
+def array_bytes(column):
+    """Handles returning the little-endian bytes of an array without
+    changing the array itself.
+    """
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+class TaskSnapshot:
+    """Handles the parsed users, task index, due date index and statistics
+    of tasks.txt and user.txt, saved with marshal.
+
+    The snapshot records how many bytes of each file it covers, along with
+    the inode and the last bytes of the covered part. Loading it only
+    replays the lines appended since, and the completion journal entries
+    written since, so startup does not depend on how many tasks there are.
+    A file that was replaced or rewritten causes a full rebuild instead,
+    which reads tasks.txt in parallel with up to workers processes, as
+    recount_task_stats() does. Without a tasks_path only the users are
+    kept, as in the sharded layout.
+    """
+
+    def __init__(self, snapshot_path, users_path, tasks_path = None,
+                 workers = None):
+        self.snapshot_path = snapshot_path
+        self.users_path = users_path
+        self.tasks_path = tasks_path
+        self.workers = workers
+        self.state = None
+        self.unsaved_bytes = 0
+
+    def cover(self, handle, length):
+        """Handles returning what identifies the first length bytes of an
+        open file: its length, inode and last SNAPSHOT_CHECK_BYTES bytes.
+
+        Completed statuses in the last bytes are read as "No ", since
+        completions are replayed from the journal. The few bytes before
+        them are read too, so a status cut off at the start still matches.
+        """
+        check_start = max(0, length - SNAPSHOT_CHECK_BYTES)
+        read_start = max(0, check_start - len(b", Yes"))
+        handle.seek(read_start)
+        check_bytes = COMPLETED_STATUS.sub(
+            b", " + "No".ljust(STATUS_WIDTH).encode(),
+            handle.read(length - read_start))
+        return [length, os.fstat(handle.fileno()).st_ino,
+                check_bytes[check_start - read_start:]]
+
+    def is_covered(self, handle, cover):
+        """Handles checking that an open file still starts with the part a
+        snapshot covers.
+        """
+        size = os.fstat(handle.fileno()).st_size
+        return size >= cover[0] and self.cover(handle, cover[0]) == cover
+
+    @instrument
+    def load(self):
+        """Handles loading the saved snapshot and replaying what was
+        appended since, building it from scratch if it cannot be used.
+        """
+        # Reads the whole file first, as marshal.load() reads a Python file
+        # object a few bytes at a time
+        try:
+            with open(self.snapshot_path, "rb") as snapshot_info:
+                saved = snapshot_info.read()
+            count_io(bytes_read = len(saved))
+            state = marshal.loads(saved)
+            if state.get("version") != SNAPSHOT_VERSION or \
+                ("tasks" in state) != (self.tasks_path is not None):
+                state = None
+            elif "tasks" in state:
+                state["index"] = {username: _little_endian(
+                                      array("Q", offsets))
+                                  for username, offsets
+                                  in state["index"].items()}
+                state["due_ordinals"] = _little_endian(
+                    array("i", state["due_ordinals"]))
+                state["due_offsets"] = _little_endian(
+                    array("Q", state["due_offsets"]))
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            state = None
+
+        self.state = state if state is not None else \
+            {"version": SNAPSHOT_VERSION}
+        self.unsaved_bytes = 0
+        self.catch_up()
+        return self
+
+    def catch_up(self):
+        """Handles replaying the lines appended to user.txt and tasks.txt
+        since the snapshot, rebuilding whichever part no longer matches.
+        """
+        self.catch_up_users()
+        self.catch_up_tasks()
+
+    def catch_up_users(self):
+        """Handles replaying the users appended to user.txt, holding its lock
+        so a registration another session is writing is never read half
+        written.
+        """
+        with locked_open(self.users_path, "rb") as user_info:
+            if "users" not in self.state or \
+                not self.is_covered(user_info, self.state["users_cover"]):
+                self.state.update(users = {}, user_count = 0,
+                                  users_cover = self.cover(user_info, 0))
+            start = self.state["users_cover"][0]
+            end = os.fstat(user_info.fileno()).st_size
+            if end > start:
+
+                # Adds each appended user the way login_dict_function()
+                # reads them
+                for offset, line in read_tail(user_info, start, end):
+                    username, password = map(
+                        str.strip, line.decode("utf-8").split(", "))
+                    self.state["users"][username.lower()] = password
+                    self.state["user_count"] += 1
+                self.state["users_cover"] = self.cover(user_info, end)
+                self.saved_later(end - start)
+
+    def saved_later(self, replayed):
+        """Handles counting replayed bytes, saving the snapshot once
+        SNAPSHOT_SAVE_BYTES have been replayed since it was last saved.
+        """
+        self.unsaved_bytes += replayed
+        if self.unsaved_bytes >= SNAPSHOT_SAVE_BYTES:
+            self.save()
+
+    def catch_up_tasks(self):
+        """Handles replaying appended tasks and journalled completions,
+        holding the tasks.txt lock so neither can change meanwhile.
+        """
+        if self.tasks_path is None:
+            return
+
+        replayed = 0
+        with locked_open(self.tasks_path, "rb") as task_info:
+            journal_path = self.tasks_path + ".done"
+            if "tasks" not in self.state or \
+                not self.is_covered(task_info, self.state["tasks"]):
+
+                # Starts again from an empty file, and from the end of the
+                # journal, since the rebuild reads every current status
+                stats = new_task_stats()
+                del stats["stamps"]
+                journal_size = os.path.getsize(journal_path) \
+                    if os.path.exists(journal_path) else 0
+                self.state.update(tasks = self.cover(task_info, 0),
+                                  index = {}, due_ordinals = array("i"),
+                                  due_offsets = array("Q"), stats = stats,
+                                  journal = journal_size)
+
+            covered = self.state["tasks"][0]
+            end = os.fstat(task_info.fileno()).st_size
+            if end > covered:
+
+                # Reads the whole file in parallel, as recount_task_stats()
+                # does, when rebuilding from a large enough tasks.txt
+                workers = 1
+                if covered == 0:
+                    workers = stats_worker_count(self.tasks_path,
+                                                 self.workers)
+                if workers > 1:
+                    self.add_task_ranges(split_task_ranges(
+                        self.tasks_path, end, workers))
+                else:
+                    due_entries = []
+                    for offset, line in read_tail(task_info, covered, end):
+                        self.add_task(split_task_line(line.decode("utf-8")),
+                                      offset, due_entries)
+                    self.add_due_entries(due_entries)
+                self.state["tasks"] = self.cover(task_info, end)
+                replayed += end - covered
+
+            # Replays completions of tasks the snapshot read before they
+            # were completed; later tasks were read with their new status
+            if os.path.exists(journal_path):
+                with open(journal_path, "rb") as journal_info:
+
+                    # Reads a journal that was deleted and started again
+                    # from its beginning
+                    if os.fstat(journal_info.fileno()).st_size < \
+                        self.state["journal"]:
+                        self.state["journal"] = 0
+                    journal_info.seek(self.state["journal"])
+                    entries = journal_info.read()
+                inode = self.state["tasks"][1]
+                for entry_start in range(0, len(entries) -
+                                         JOURNAL_ENTRY.size + 1,
+                                         JOURNAL_ENTRY.size):
+                    entry_inode, offset = JOURNAL_ENTRY.unpack_from(
+                        entries, entry_start)
+                    if entry_inode == inode and offset < covered:
+                        task_info.seek(offset)
+                        self.complete_task(split_task_line(
+                            task_info.readline().decode("utf-8")))
+                self.state["journal"] += len(entries) - \
+                    len(entries) % JOURNAL_ENTRY.size
+                replayed += len(entries)
+
+        # Saves only once the tasks and the journal are both caught up, as
+        # a snapshot between them would replay some completions twice
+        self.saved_later(replayed)
+
+    def add_task(self, task_entry, offset, due_entries):
+        """Handles adding one task to the index and statistics, and its due
+        date to due_entries for add_due_entries().
+        """
+        self.state["index"].setdefault(task_entry[0],
+                                       array("Q")).append(offset)
+        due_ordinal = parse_task_date(task_entry[3])
+        if due_ordinal is not None:
+            due_entries.append((due_ordinal, offset))
+        count_task(self.state["stats"], task_entry)
+
+    def add_task_ranges(self, task_ranges):
+        """Handles reading byte ranges of tasks.txt into an empty snapshot
+        in worker processes, adding their tasks in file order so the index
+        and due date index come out as a single scan would leave them.
+        """
+        ordinals = array("i")
+        offsets = array("Q")
+        for part_index, part_ordinals, part_offsets, part_stats in \
+            map_task_ranges(snapshot_task_range, self.tasks_path,
+                            task_ranges):
+            for username, user_offsets in part_index.items():
+                self.state["index"].setdefault(
+                    username, array("Q")).extend(user_offsets)
+            ordinals.extend(part_ordinals)
+            offsets.extend(part_offsets)
+            merge_task_stats(self.state["stats"], part_stats)
+
+        # Sorting is stable, so tasks due the same day stay in file order
+        order = sorted(range(len(ordinals)), key = ordinals.__getitem__)
+        self.state["due_ordinals"] = array(
+            "i", [ordinals[position] for position in order])
+        self.state["due_offsets"] = array(
+            "Q", [offsets[position] for position in order])
+
+    def add_due_entries(self, due_entries):
+        """Handles adding (due ordinal, offset) pairs to the due date index,
+        inserting a few by bisect and sorting everything again for many.
+        """
+        ordinals = self.state["due_ordinals"]
+        offsets = self.state["due_offsets"]
+        if len(due_entries) < SNAPSHOT_INSERT_LIMIT:
+            for due_ordinal, offset in due_entries:
+                position = bisect_right(ordinals, due_ordinal)
+                ordinals.insert(position, due_ordinal)
+                offsets.insert(position, offset)
+            return
+
+        # Sorting is stable, so tasks due the same day stay in file order
+        due_entries = list(zip(ordinals, offsets)) + due_entries
+        due_entries.sort(key = lambda due_entry: due_entry[0])
+        self.state["due_ordinals"] = array(
+            "i", [due_entry[0] for due_entry in due_entries])
+        self.state["due_offsets"] = array(
+            "Q", [due_entry[1] for due_entry in due_entries])
+
+    def complete_task(self, task_entry):
+        """Handles moving a task that was marked complete from the
+        incomplete to the completed statistics.
+        """
+        task_stats = self.state["stats"]
+        user_stats = task_stats["users"][task_entry[0]]
+        task_stats["completed"] += 1
+        task_stats["incomplete"] -= 1
+        user_stats["completed"] += 1
+
+        due_ordinal = parse_task_date(task_entry[3])
+        if due_ordinal is not None:
+            for due_counts in (task_stats["due"], user_stats["due"]):
+                due_counts[str(due_ordinal)] -= 1
+                if not due_counts[str(due_ordinal)]:
+                    del due_counts[str(due_ordinal)]
+
+    @instrument
+    def save(self):
+        """Handles writing the snapshot atomically.
+
+        Offsets and due dates are saved as the bytes of their arrays, which
+        load far faster than lists of integers. Each save writes its own
+        temporary file, so sessions saving at once never replace each
+        other's half written file. A save that fails is left for the next
+        one, as the snapshot is only a cache.
+        """
+        saved_state = dict(self.state)
+        if "tasks" in saved_state:
+            saved_state["index"] = {username: array_bytes(offsets)
+                                    for username, offsets
+                                    in saved_state["index"].items()}
+            saved_state["due_ordinals"] = array_bytes(
+                saved_state["due_ordinals"])
+            saved_state["due_offsets"] = array_bytes(
+                saved_state["due_offsets"])
+        temp_handle, temp_path = tempfile.mkstemp(
+            ".tmp", os.path.basename(self.snapshot_path) + ".",
+            os.path.dirname(self.snapshot_path) or ".")
+        try:
+            with open(temp_handle, "wb") as snapshot_info:
+                marshal.dump(saved_state, snapshot_info)
+                count_io(bytes_written = snapshot_info.tell())
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.unsaved_bytes = 0
+
+    @property
+    def users(self):
+        """Handles returning the login dictionary.
+        """
+        return self.state["users"]
+
+    def task_index(self):
+        """Handles returning the task index in the form load_task_index()
+        returns, with the inode in the position of the stamp it uses.
+        """
+        return {"stamp": [self.state["tasks"][0], None,
+                          self.state["tasks"][1]],
+                "users": self.state["index"]}
+
+    def due_index(self):
+        """Handles returning the due date index in the form
+        load_due_index() returns.
+        """
+        return {"ordinals": self.state["due_ordinals"],
+                "offsets": self.state["due_offsets"]}
+
+    def stats(self):
+        """Handles returning a copy of the statistics with the user count.
+        """
+        task_stats = marshal.loads(marshal.dumps(self.state["stats"]))
+        task_stats["total_users"] = self.state["user_count"]
+        return task_stats
+
+#====Report Section====
+
+# Files the overview reports are written to
+TASK_REPORT_FILE = "task_overview.txt"
+USER_REPORT_FILE = "user_overview.txt"
+
+def percentage(count, total):
+    """Handles formatting count as a percentage of total, which is 0% when
+    total is 0.
+    """
+    return f"{count / total * 100 if total else 0:.2f}%"
+
+@instrument
+def write_reports(task_stats, usernames, task_report_path = TASK_REPORT_FILE,
+                  user_report_path = USER_REPORT_FILE, today = None):
+    """Handles writing the task overview and user overview reports from a
+    statistics dictionary.
+
+    The statistics already hold every user's task, completed and due date
+    counts from one pass over the tasks, kept current on every append, so
+    the reports take one pass over the users and never read the tasks.
+    Every registered user is listed, including users with no tasks.
+    """
+    if today is None:
+        today = date.today().toordinal()
+    total_tasks = task_stats["total_tasks"]
+    overdue = overdue_count(task_stats["due"], today)
+
+    task_report = [f"Total Tasks: {total_tasks}",
+                   f"Completed Tasks: {task_stats['completed']}",
+                   f"Incomplete Tasks: {task_stats['incomplete']}",
+                   f"Overdue Tasks: {overdue}",
+                   "Percentage Incomplete: "
+                   f"{percentage(task_stats['incomplete'], total_tasks)}",
+                   f"Percentage Overdue: {percentage(overdue, total_tasks)}"]
+
+    user_report = [f"Total Users: {len(usernames)}",
+                   f"Total Tasks: {total_tasks}"]
+    no_tasks = {"tasks": 0, "completed": 0, "due": {}}
+    for username in usernames:
+        user_stats = task_stats["users"].get(username, no_tasks)
+        tasks = user_stats["tasks"]
+        completed = user_stats["completed"]
+        user_overdue = overdue_count(user_stats["due"], today)
+        user_report += ["",
+                        f"User: {username}",
+                        f"Tasks Assigned: {tasks}",
+                        f"Completed Tasks: {completed}",
+                        f"Incomplete Tasks: {tasks - completed}",
+                        f"Overdue Tasks: {user_overdue}",
+                        "Percentage of Total Tasks: "
+                        f"{percentage(tasks, total_tasks)}",
+                        f"Percentage Completed: {percentage(completed, tasks)}",
+                        "Percentage Incomplete: "
+                        f"{percentage(tasks - completed, tasks)}",
+                        "Percentage Overdue: "
+                        f"{percentage(user_overdue, tasks)}"]
+
+    for report_path, report in ((task_report_path, task_report),
+                                (user_report_path, user_report)):
+        with open(report_path, "w", encoding = "utf-8") as report_file:
+            report_file.write("\n".join(report) + "\n")
+            count_io(len(report), bytes_written = report_file.tell())
+
+#====Task Store Section====
+
+class TaskStore:
+    """Handles every task manager operation without the interactive menu.
+
+    The store keeps the login dictionary in memory and appends through
+    AppendWriter, so bulk registration and assignment cost one write per
+    group of records instead of one open and flush per record. Reads and
+    statistics commit any waiting records first so they always see them.
+
+    The users, task index, due date index and statistics are loaded from a
+    TaskSnapshot, which only replays what other sessions appended since it
+    was saved. It is caught up with one os.stat() per use and saved again
+    when the store is closed.
+
+    If the directory has a tasks/ folder, made by migrate_to_shards(), each
+    user's tasks are kept in their own shard. Reads for one user then only
+    open that user's shard, and appends for different users take different
+    locks.
+    """
+
+    def __init__(self, directory = ".", batch_size = 1, batch_seconds = None,
+                 fsync = False, stats_workers = None):
+        self.stats_workers = stats_workers
+        self.batch_options = (batch_size, batch_seconds, fsync)
+        self.tasks_path = os.path.join(directory, TASKS_FILE)
+        self.users_path = os.path.join(directory, USERS_FILE)
+        self.shards_path = os.path.join(directory, SHARDS_DIRECTORY)
+        self.sharded = os.path.isdir(self.shards_path)
+
+        # Creates empty files so a new directory can be loaded from scratch
+        for path in (self.users_path,) if self.sharded else \
+            (self.tasks_path, self.users_path):
+            if not os.path.exists(path):
+                open(path, "ab").close()
+
+        self.snapshot = TaskSnapshot(
+            os.path.join(directory, SNAPSHOT_FILE), self.users_path,
+            None if self.sharded else self.tasks_path,
+            stats_workers).load()
+
+        # Task writers are opened on first use, keyed by the file they
+        # append to and kept in order of use
+        self.task_writers = {}
+        self.retired_lock_waits = {"waits": 0, "seconds": 0.0, "max": 0.0}
+
+        self.user_writer = AppendWriter(self.users_path, *self.batch_options)
+        _open_stores.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def authenticate(self, username, password):
+        """Handles checking a username and password, returning the
+        lowercase username if they match or None if they do not.
+        """
+        username = username.lower()
+        if username in self.login_dict and \
+            verify_password(password, self.login_dict[username]):
+            return username
+        return None
+
+    @property
+    def login_dict(self):
+        """Handles returning the login dictionary, first adding any users
+        another session has appended to user.txt.
+        """
+        self.snapshot.catch_up_users()
+        return self.snapshot.users
+
+    @instrument
+    def reload_users(self):
+        """Handles re-reading the whole of user.txt into the login
+        dictionary.
+        """
+        self.user_writer.commit()
+        self.snapshot.state.pop("users", None)
+        return self.login_dict
+
+    def current_task_index(self, tasks_path = None):
+        """Handles returning the snapshot's task index after catching it up.
+        """
+        self.snapshot.catch_up_tasks()
+        return self.snapshot.task_index()
+
+    def current_due_index(self):
+        """Handles returning the snapshot's due date index after catching it
+        up.
+        """
+        self.snapshot.catch_up_tasks()
+        return self.snapshot.due_index()
+
+    def change_stamp(self):
+        """Handles returning a value that changes whenever this or another
+        session changes the users or tasks, for caching results.
+        """
+        self.commit()
+        return [file_stamp(path)
+                for path in [self.users_path, *self.task_files()]]
+
+    def operation_counters(self):
+        """Handles returning the counters instrumentation has added up for
+        each operation, when enable_instrumentation() was given "memory"
+        or "stderr".
+        """
+        return instrument_counters()
+
+    def lock_wait_stats(self):
+        """Handles returning the number of locks taken by this store's
+        writers and the total and longest time spent waiting for them.
+        """
+        writers = [self.user_writer, *self.task_writers.values()]
+        retired = self.retired_lock_waits
+        return {"waits": retired["waits"] + sum(writer.lock_waits
+                                                for writer in writers),
+                "seconds": retired["seconds"] + sum(writer.lock_wait_seconds
+                                                    for writer in writers),
+                "max": max([retired["max"]] + [writer.lock_wait_max
+                                               for writer in writers])}
+
+    def task_path(self, username):
+        """Handles returning the file a user's tasks are kept in.
+        """
+        if self.sharded:
+            return shard_path(username, self.shards_path)
+        return self.tasks_path
+
+    def task_writer(self, username):
+        """Handles returning the append writer for a user's tasks, closing
+        the least recently used writer once SHARD_WRITERS_OPEN are open.
+        """
+        path = self.task_path(username)
+        writer = self.task_writers.pop(path, None)
+        if writer is None:
+            if len(self.task_writers) >= SHARD_WRITERS_OPEN:
+                self.retire_writer(next(iter(self.task_writers)))
+            # The snapshot covers tasks.txt itself, so only shards keep
+            # their index, due date and statistics sidecars up to date
+            on_commit = [partial(search_index_append, tasks_path = path)]
+            if self.sharded:
+                on_commit += [partial(index_tasks_append, tasks_path = path),
+                              partial(due_index_append, tasks_path = path),
+                              partial(stats_tasks_append, tasks_path = path)]
+            writer = AppendWriter(path, *self.batch_options,
+                                  on_commit = on_commit)
+
+        # Moves the writer to the end, after the ones used less recently
+        self.task_writers[path] = writer
+        return writer
+
+    def retire_writer(self, path):
+        """Handles closing a task writer, keeping its lock wait counts.
+        """
+        writer = self.task_writers.pop(path)
+        writer.close()
+        self.retired_lock_waits["waits"] += writer.lock_waits
+        self.retired_lock_waits["seconds"] += writer.lock_wait_seconds
+        self.retired_lock_waits["max"] = max(self.retired_lock_waits["max"],
+                                             writer.lock_wait_max)
+
+    @instrument
+    def register_user(self, username, password):
+        """Handles registering a new user with a hash of their password,
+        returning False if the username is already registered.
+        """
+        username = username.lower()
+        if username in self.login_dict:
+            return False
+        password = hash_password(password)
+        self.user_writer.write([username, password])
+        self.snapshot.users[username] = password
+        return True
+
+    @instrument
+    def assign_task(self, username, title, description, due_date):
+        """Handles assigning a new task to a registered user, returning its
+        task entry. Raises KeyError for an unregistered username.
+        """
+        username = username.lower()
+        if username not in self.login_dict:
+            raise KeyError(username)
+        task_entry = create_task_entry(username,
+                                       [title, description, due_date])
+        self.task_writer(username).write(task_entry)
+        return task_entry
+
+    def commit(self):
+        """Handles committing every waiting user and task.
+        """
+        self.user_writer.commit()
+        for writer in self.task_writers.values():
+            writer.commit()
+
+    def task_files(self):
+        """Handles returning every tasks file, which is each shard in the
+        sharded layout.
+        """
+        if self.sharded:
+            return shard_paths(self.shards_path)
+        return [self.tasks_path]
+
+    def tasks(self, include_archived = False):
+        """Handles yielding every task, after the archived tasks if
+        include_archived is True.
+        """
+        self.commit()
+        if self.sharded:
+            hot_tasks = read_sharded_tasks(iter_task_records,
+                                           self.shards_path)
+            archived_tasks = read_sharded_tasks(read_archived_tasks,
+                                                self.shards_path)
+        else:
+            hot_tasks = iter_task_records(self.tasks_path)
+            archived_tasks = read_archived_tasks(self.tasks_path)
+        if include_archived:
+            return chain(archived_tasks, hot_tasks)
+        return hot_tasks
+
+    def user_tasks(self, username, include_archived = False):
+        """Handles yielding the tasks assigned to a user, after their
+        archived tasks if include_archived is True.
+        """
+        self.commit()
+        if self.sharded:
+            hot_tasks = read_sharded_tasks(iter_task_records,
+                                           self.shards_path, username)
+            archived_tasks = read_sharded_tasks(
+                partial(read_archived_tasks, username = username),
+                self.shards_path, username)
+        else:
+            hot_tasks = read_user_tasks(username, self.tasks_path,
+                                        self.current_task_index())
+            archived_tasks = read_archived_tasks(self.tasks_path, username)
+        if include_archived:
+            return chain(archived_tasks, hot_tasks)
+        return hot_tasks
+
+    def archived_task_count(self):
+        """Handles returning the number of archived tasks from the archive
+        manifests.
+        """
+        return sum(load_archive_stats(path)["total_tasks"]
+                   for path in self.task_files())
+
+    @instrument
+    def archive_tasks(self, cutoff = None, compression = "gzip"):
+        """Handles archiving completed tasks, and tasks assigned before the
+        cutoff ordinal day number, returning the number archived.
+        """
+        self.commit()
+        return sum(archive_tasks(path, cutoff, compression)
+                   for path in self.task_files())
+
+    def overdue_tasks(self, username = None):
+        """Handles yielding the incomplete tasks due before today, for one
+        user or for everyone.
+        """
+        self.commit()
+        if self.sharded:
+            return read_sharded_tasks(read_overdue_tasks, self.shards_path,
+                                      username)
+        return read_overdue_tasks(self.tasks_path, username,
+                                  due_index = self.current_due_index(),
+                                  task_index = self.current_task_index())
+
+    def tasks_due_this_week(self, username = None):
+        """Handles yielding the incomplete tasks due between today and
+        Sunday, for one user or for everyone.
+        """
+        self.commit()
+        if self.sharded:
+            return read_sharded_tasks(read_tasks_due_this_week,
+                                      self.shards_path, username)
+        return read_tasks_due_this_week(
+            self.tasks_path, username, due_index = self.current_due_index(),
+            task_index = self.current_task_index())
+
+    @instrument
+    def overdue_per_user(self):
+        """Handles returning the number of overdue tasks of each user.
+        """
+        self.commit()
+        if self.sharded:
+            return sharded_overdue_per_user(self.shards_path)
+        return overdue_per_user(self.tasks_path,
+                                due_index = self.current_due_index())
+
+    def search_tasks(self, keywords, username = None):
+        """Handles yielding the tasks whose title or description contains
+        every word in keywords.
+        """
+        self.commit()
+        if self.sharded:
+            return read_sharded_tasks(partial(search_tasks, keywords),
+                                      self.shards_path, username)
+        return search_tasks(keywords, self.tasks_path, username,
+                            self.current_task_index())
+
+    @instrument
+    def complete_task(self, username, task_number):
+        """Handles marking a user's task complete by its number in their
+        task list. Returns False if it was already complete.
+        """
+        self.commit()
+        path = self.task_path(username)
+        if not os.path.exists(path):
+            raise IndexError(f"{username} has no task {task_number}.")
+        if self.sharded:
+            return complete_user_task(username, task_number, path)
+        return complete_user_task(username, task_number, path,
+                                  self.current_task_index)
+
+    @instrument
+    def stats(self):
+        """Handles returning the saved statistics with the archived tasks and
+        the overdue count for today added.
+        """
+        self.commit()
+        if self.sharded:
+            task_stats = load_sharded_stats(self.shards_path, self.users_path,
+                                            self.stats_workers)
+        else:
+            self.snapshot.catch_up()
+            task_stats = self.snapshot.stats()
+        for path in self.task_files():
+            merge_task_stats(task_stats, load_archive_stats(path))
+        task_stats["overdue"] = overdue_count(task_stats["due"])
+        return task_stats
+
+    def close(self):
+        """Handles committing and closing every writer, then saving the
+        snapshot if anything was replayed since it was loaded.
+        """
+        self.user_writer.close()
+        for path in list(self.task_writers):
+            self.retire_writer(path)
+        self.snapshot.catch_up()
+        if self.snapshot.unsaved_bytes:
+            self.snapshot.save()
+        if self in _open_stores:
+            _open_stores.remove(self)
+
+#====SQLite Backend Section====
+
+# Default name of the task manager's SQLite database
+DATABASE_FILE = "tasks.db"
+
+# Tables and indexes of the SQLite backend. Tasks keep the dates as
+# written for display and as ordinal day numbers for date queries, and
+# archived holds the number of the archive run that archived the task, or
+# 0 while it is not archived.
+DATABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    due_ordinal INTEGER,
+    assigned_date TEXT NOT NULL,
+    assigned_ordinal INTEGER,
+    completed INTEGER NOT NULL DEFAULT 0,
+    archived INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tasks_username ON tasks (username, archived, id);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks (due_ordinal);
+CREATE INDEX IF NOT EXISTS tasks_stats ON tasks (username, completed,
+                                                 due_ordinal);
+"""
+
+# Keyword search table, kept in step with tasks by triggers. Diacritics
+# are kept so words match the same way search_tokens() splits them.
+DATABASE_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5 (
+    title, description, content = 'tasks', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 0'
+);
+CREATE TRIGGER IF NOT EXISTS task_search_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO task_search (rowid, title, description)
+    VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS task_search_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO task_search (task_search, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END;
+"""
+
+# Order of tasks including archived tasks, which TaskStore lists archive
+# run by archive run before the tasks that are not archived
+ARCHIVED_ORDER = "archived = 0, archived, id"
+
+# Columns read back as task entries, in tasks.txt field order
+TASK_COLUMNS = "username, title, description, due_date, assigned_date, " \
+    "CASE completed WHEN 1 THEN 'Yes' ELSE 'No' END"
+
+# Statement adding one task entry's row, with task_row_values()
+INSERT_TASK = "INSERT INTO tasks (username, title, description, due_date, " \
+    "due_ordinal, assigned_date, assigned_ordinal, completed, archived) " \
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+def task_row_values(task_entry, archived = 0):
+    """Handles converting a task entry into the values of a tasks row.
+    """
+    return (task_entry[0], task_entry[1], task_entry[2], task_entry[3],
+            parse_task_date(task_entry[3]), task_entry[4],
+            parse_task_date(task_entry[4]),
+            1 if task_entry[5].strip() == "Yes" else 0, archived)
+
+def connect_database(database_path = DATABASE_FILE, fsync = False):
+    """Handles opening the task manager database, creating its tables and
+    indexes if they do not exist.
+
+    Returns the connection and whether the keyword search table could be
+    created, which needs SQLite's FTS5 extension.
+    """
+    # Connections may be committed by the timer thread of SqliteTaskStore
+    connection = sqlite3.connect(database_path, timeout = 30,
+                                 check_same_thread = False)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = " +
+                       ("FULL" if fsync else "NORMAL"))
+    connection.executescript(DATABASE_SCHEMA)
+    try:
+        connection.executescript(DATABASE_SEARCH_SCHEMA)
+        searchable = True
+    except sqlite3.OperationalError:
+        searchable = False
+    connection.commit()
+    return connection, searchable
+
+def import_text_files(directory = ".", database_path = None):
+    """Handles copying user.txt, tasks.txt and any archived tasks into the
+    task manager database in one transaction, returning the number of
+    users and tasks imported.
+
+    In the sharded layout every shard is imported. Raises ValueError
+    without importing anything if the database already holds tasks, as
+    importing them again would add every task twice.
+    """
+    if database_path is None:
+        database_path = os.path.join(directory, DATABASE_FILE)
+    users = login_dict_function(os.path.join(directory, USERS_FILE))
+    shards_path = os.path.join(directory, SHARDS_DIRECTORY)
+    if os.path.isdir(shards_path):
+        task_files = shard_paths(shards_path)
+    else:
+        task_files = [os.path.join(directory, TASKS_FILE)]
+
+    connection = connect_database(database_path)[0]
+    task_count = 0
+    try:
+        with connection:
+
+            # Takes the write lock before checking, so two imports cannot
+            # both find the database empty
+            connection.execute("BEGIN IMMEDIATE")
+            if connection.execute("SELECT 1 FROM tasks LIMIT 1").fetchone():
+                raise ValueError(f"{database_path} already holds tasks.")
+            connection.executemany(
+                "INSERT OR REPLACE INTO users (username, password) "
+                "VALUES (?, ?)", users.items())
+
+            # Imports archived tasks first so tasks keep their original
+            # order
+            for task_path in task_files:
+                for archived, task_records in (
+                    (1, read_archived_tasks(task_path)),
+                    (0, iter_task_records(task_path) if
+                     os.path.exists(task_path) else ())):
+                    cursor = connection.executemany(
+                        INSERT_TASK, (task_row_values(task_record, archived)
+                                      for task_record in task_records))
+                    task_count += cursor.rowcount
+    finally:
+        connection.close()
+    return len(users), task_count
+
+def hash_database_passwords(database_path = DATABASE_FILE, method = None,
+                            cost = None):
+    """Handles replacing every plaintext password in the task manager
+    database with its hash, returning the number of passwords hashed.
+    """
+    connection = connect_database(database_path)[0]
+    with connection:
+        hashed = [(hash_password(password, method, cost), username)
+                  for username, password in connection.execute(
+                      "SELECT username, password FROM users").fetchall()
+                  if not is_password_hash(password)]
+        connection.executemany(
+            "UPDATE users SET password = ? WHERE username = ?", hashed)
+    connection.close()
+    return len(hashed)
+
+def counted_rows(cursor):
+    """Handles iterating over the rows of a query, counting each row as a
+    record while instrumentation is on. SQLite does its own reading, so
+    the bytes read are not counted.
+    """
+    if _instrument_sink is None:
+        return iter(cursor)
+    def count_rows():
+        for row in cursor:
+            count_io(1)
+            yield row
+    return count_rows()
+
+class SqliteTaskStore:
+    """Handles every task manager operation on the SQLite backend, with the
+    same methods and results as TaskStore.
+
+    Users and tasks are kept in an indexed database, so per-user views use
+    the assignee index, date queries use the due date index and completing
+    or archiving a task updates its row instead of rewriting a file.
+    Writes are committed in groups of batch_size, or once the oldest write
+    has waited batch_seconds, by a timer thread like AppendWriter's. An
+    idle session therefore never holds the database's write lock for
+    longer than batch_seconds.
+    """
+
+    def __init__(self, directory = ".", batch_size = 1, batch_seconds = None,
+                 fsync = False, stats_workers = None):
+        self.database_path = os.path.join(directory, DATABASE_FILE)
+        self.connection, self.searchable = connect_database(
+            self.database_path, fsync)
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.pending = 0
+        self.pending_since = None
+        self.commit_lock = threading.RLock()
+        self.commit_timer = None
+        self.users = None
+        self.saved_stats = None
+        self.stats_version = None
+        self.reload_users()
+        _open_stores.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def authenticate(self, username, password):
+        """Handles checking a username and password, returning the
+        lowercase username if they match or None if they do not.
+        """
+        username = username.lower()
+        if username in self.login_dict and \
+            verify_password(password, self.login_dict[username]):
+            return username
+        return None
+
+    @property
+    def login_dict(self):
+        """Handles returning the login dictionary, reading the users again
+        first if another connection has changed the database.
+        """
+        if self.connection.execute(
+            "PRAGMA data_version").fetchone()[0] != self.users_version:
+            self.reload_users()
+        return self.users
+
+    @instrument
+    def reload_users(self):
+        """Handles reading every user into the login dictionary.
+        """
+        self.users_version = self.connection.execute(
+            "PRAGMA data_version").fetchone()[0]
+        self.users = dict(self.connection.execute(
+            "SELECT username, password FROM users"))
+        return self.users
+
+    def change_stamp(self):
+        """Handles returning a value that changes whenever this or another
+        connection changes the database, for caching results.
+        """
+        self.commit()
+        return (self.connection.execute("PRAGMA data_version").fetchone()[0],
+                self.connection.total_changes)
+
+    def operation_counters(self):
+        """Handles returning the counters instrumentation has added up for
+        each operation, as TaskStore does.
+        """
+        return instrument_counters()
+
+    def lock_wait_stats(self):
+        """Handles returning lock wait counts in the form TaskStore does.
+        SQLite waits for its own locks internally, so none are recorded.
+        """
+        return {"waits": 0, "seconds": 0.0, "max": 0.0}
+
+    def written(self):
+        """Handles counting a write, committing the group when it is full
+        or has been waiting longer than batch_seconds.
+        """
+        with self.commit_lock:
+            if not self.pending:
+                self.pending_since = time.monotonic()
+                self.commit_timer = start_commit_timer(self.batch_seconds,
+                                                       self.commit_waiting)
+            self.pending += 1
+            if self.pending >= self.batch_size or \
+                (self.batch_seconds is not None and
+                 time.monotonic() - self.pending_since >= self.batch_seconds):
+                self.commit()
+
+    @instrument
+    def register_user(self, username, password):
+        """Handles registering a new user with a hash of their password,
+        returning False if the username is already registered.
+        """
+        username = username.lower()
+        if username in self.login_dict:
+            return False
+        password = hash_password(password)
+        self.connection.execute(
+            "INSERT INTO users (username, password) VALUES (?, ?)",
+            (username, password))
+        self.users[username] = password
+        self.written()
+        return True
+
+    @instrument
+    def assign_task(self, username, title, description, due_date):
+        """Handles assigning a new task to a registered user, returning its
+        task entry. Raises KeyError for an unregistered username.
+        """
+        username = username.lower()
+        if username not in self.login_dict:
+            raise KeyError(username)
+        task_entry = create_task_entry(username,
+                                       [title, description, due_date])
+        self.connection.execute(INSERT_TASK, task_row_values(task_entry))
+        self.written()
+        return task_entry
+
+    def commit(self):
+        """Handles committing every waiting user and task.
+        """
+        with self.commit_lock:
+            if self.commit_timer is not None:
+                self.commit_timer.cancel()
+                self.commit_timer = None
+            self.connection.commit()
+            self.pending = 0
+
+    def commit_waiting(self):
+        """Handles committing for the timer, unless the writes it was
+        started for were committed and the connection closed meanwhile.
+        """
+        with self.commit_lock:
+            if self.pending:
+                self.commit()
+
+    def select_tasks(self, where, parameters = (), order = "id"):
+        """Handles yielding task entries for the rows matching a WHERE
+        clause, in the order they were assigned unless order is given.
+        """
+        self.commit()
+        return counted_rows(self.connection.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE {where} "
+            f"ORDER BY {order}", parameters))
+
+    def tasks(self, include_archived = False):
+        """Handles yielding every task, after the archived tasks if
+        include_archived is True.
+        """
+        if include_archived:
+            return self.select_tasks("1", order = ARCHIVED_ORDER)
+        return self.select_tasks("archived = 0")
+
+    def user_tasks(self, username, include_archived = False):
+        """Handles yielding the tasks assigned to a user, after their
+        archived tasks if include_archived is True.
+        """
+        if include_archived:
+            return self.select_tasks("username = ?", (username,),
+                                     ARCHIVED_ORDER)
+        return self.select_tasks("username = ? AND archived = 0",
+                                 (username,))
+
+    def archived_task_count(self):
+        """Handles returning the number of archived tasks.
+        """
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM tasks WHERE archived > 0").fetchone()[0]
+
+    @instrument
+    def archive_tasks(self, cutoff = None, compression = "gzip"):
+        """Handles archiving completed tasks, and tasks assigned before the
+        cutoff ordinal day number, returning the number archived.
+
+        compression is accepted for TaskStore's signature; archived rows
+        stay in the database, numbered by archive run, and are left out of
+        the default views.
+        """
+        self.commit()
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE tasks SET archived = (SELECT MAX(archived) + 1 "
+                "FROM tasks) WHERE archived = 0 AND (completed = 1 OR "
+                "assigned_ordinal < ?)", (cutoff,))
+        return cursor.rowcount
+
+    def due_tasks(self, first_ordinal, last_ordinal, username = None):
+        """Handles yielding the incomplete tasks that are not archived and
+        are due between two ordinal day numbers, in due date order.
+        """
+        self.commit()
+        where = "due_ordinal BETWEEN ? AND ? AND completed = 0 " \
+            "AND archived = 0"
+        parameters = [first_ordinal, last_ordinal]
+        if username is not None:
+            where += " AND username = ?"
+            parameters.append(username)
+        return counted_rows(self.connection.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE {where} "
+            "ORDER BY due_ordinal, id", parameters))
+
+    def overdue_tasks(self, username = None):
+        """Handles yielding the incomplete tasks due before today, for one
+        user or for everyone.
+        """
+        return self.due_tasks(0, date.today().toordinal() - 1, username)
+
+    def tasks_due_this_week(self, username = None):
+        """Handles yielding the incomplete tasks due between today and
+        Sunday, for one user or for everyone.
+        """
+        today = date.today()
+        week_end = today + timedelta(days = 6 - today.weekday())
+        return self.due_tasks(today.toordinal(), week_end.toordinal(),
+                              username)
+
+    @instrument
+    def overdue_per_user(self):
+        """Handles returning the number of overdue tasks of each user.
+        """
+        self.commit()
+        return dict(self.connection.execute(
+            "SELECT username, COUNT(*) FROM tasks WHERE due_ordinal < ? "
+            "AND completed = 0 AND archived = 0 GROUP BY username "
+            "ORDER BY username", (date.today().toordinal(),)))
+
+    def search_tasks(self, keywords, username = None):
+        """Handles yielding the tasks that are not archived whose title or
+        description contains every word in keywords, using the FTS5 search
+        table when SQLite has it and checking every task otherwise.
+        """
+        tokens = search_tokens(keywords)
+        if not tokens:
+            return iter(())
+        if not self.searchable:
+            return (task_entry for task_entry in self.tasks()
+                    if (username is None or task_entry[0] == username) and
+                    tokens <= search_tokens(f"{task_entry[1]} "
+                                            f"{task_entry[2]}"))
+
+        # Quotes each word so it is matched as a word, not as syntax
+        query = " AND ".join('"' + token.replace('"', '""') + '"'
+                             for token in sorted(tokens))
+        where = "archived = 0 AND id IN (SELECT rowid FROM task_search " \
+            "WHERE task_search MATCH ?)"
+        parameters = [query]
+        if username is not None:
+            where += " AND username = ?"
+            parameters.append(username)
+        return self.select_tasks(where, parameters)
+
+    @instrument
+    def complete_task(self, username, task_number):
+        """Handles marking a user's task complete by its number in their
+        task list. Returns False if it was already complete and raises
+        IndexError for a task number the user does not have.
+        """
+        self.commit()
+        row = None
+        if task_number >= 1:
+            row = self.connection.execute(
+                "SELECT id, completed FROM tasks WHERE username = ? "
+                "AND archived = 0 ORDER BY id LIMIT 1 OFFSET ?",
+                (username, task_number - 1)).fetchone()
+        if row is None:
+            raise IndexError(f"{username} has no task {task_number}.")
+        if row[1]:
+            return False
+        with self.connection:
+            self.connection.execute(
+                "UPDATE tasks SET completed = 1 WHERE id = ?", (row[0],))
+        return True
+
+    @instrument
+    def stats(self):
+        """Handles returning the statistics in the form TaskStore.stats()
+        does, with the overdue count for today added.
+
+        The counts are read from the tasks_stats index, which covers every
+        column they need, and kept until this or another connection
+        changes the database.
+        """
+        stats_version = self.change_stamp()
+        if stats_version != self.stats_version:
+            self.saved_stats = self.count_stats()
+            self.stats_version = stats_version
+        task_stats = dict(self.saved_stats)
+        task_stats["overdue"] = overdue_count(task_stats["due"])
+        return task_stats
+
+    def count_stats(self):
+        """Handles counting the statistics from the database.
+        """
+        task_stats = new_task_stats()
+        del task_stats["stamps"]
+        task_stats["total_users"] = self.connection.execute(
+            "SELECT COUNT(*) FROM users").fetchone()[0]
+
+        for username, tasks, completed in self.connection.execute(
+            "SELECT username, COUNT(*), SUM(completed) FROM tasks "
+            "GROUP BY username"):
+            task_stats["users"][username] = {"tasks": tasks,
+                                             "completed": completed,
+                                             "due": {}}
+            task_stats["total_tasks"] += tasks
+            task_stats["completed"] += completed
+        task_stats["incomplete"] = task_stats["total_tasks"] - \
+            task_stats["completed"]
+
+        # Groups the incomplete tasks by due date the way count_task() does
+        for username, due_ordinal, count in self.connection.execute(
+            "SELECT username, due_ordinal, COUNT(*) FROM tasks "
+            "WHERE completed = 0 AND due_ordinal IS NOT NULL "
+            "GROUP BY username, due_ordinal"):
+            task_stats["users"][username]["due"][str(due_ordinal)] = count
+            task_stats["due"][str(due_ordinal)] = \
+                task_stats["due"].get(str(due_ordinal), 0) + count
+        return task_stats
+
+    def close(self):
+        """Handles committing and closing the database connection.
+        """
+        if self in _open_stores:
+            _open_stores.remove(self)
+            with self.commit_lock:
+                self.commit()
+                self.connection.close()
+
+# Task store classes by the backend name open_task_store() is given
+TASK_STORE_BACKENDS = {"text": TaskStore, "sqlite": SqliteTaskStore}
+
+def open_task_store(directory = ".", backend = None, **options):
+    """Handles opening the task store of the chosen backend, "text" or
+    "sqlite", passing any options on to it.
+
+    Without a backend, the TASK_MANAGER_BACKEND environment variable is
+    used, and otherwise SQLite if the directory has a tasks.db.
+    """
+    if backend is None:
+        backend = os.environ.get("TASK_MANAGER_BACKEND")
+    if backend is None:
+        backend = "sqlite" if os.path.exists(
+            os.path.join(directory, DATABASE_FILE)) else "text"
+    if backend not in TASK_STORE_BACKENDS:
+        raise ValueError(f"Unknown task store backend \"{backend}\".")
+    return TASK_STORE_BACKENDS[backend](directory, **options)
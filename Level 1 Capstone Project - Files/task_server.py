@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import json
+import signal
+from collections import OrderedDict
+from task_manager_functions import open_task_store, parse_task_date, \
+verify_password, enable_instrumentation, instrumented, TASK_STORE_BACKENDS, \
+INSTRUMENT_VARIABLE
+
+# Default address the server listens on
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+
+# Largest request or response line, which is one whole task listing
+STREAM_LIMIT = 1 << 30
+
+# Number of read responses kept until the users or tasks change
+SERVER_CACHE_ENTRIES = 256
+
+# Names of the task entry fields in responses, in tasks.txt order
+TASK_KEYS = ("username", "title", "description", "due_date", "assigned_date",
+             "completed")
+
+# Number of fields each command takes, and the commands only admin may use
+SERVER_COMMAND_FIELDS = {
+    "login": 2,
+    "register": 2,
+    "assign": 4,
+    "view": (0, 1),
+    "view-archived": (0, 1),
+    "stats": 0,
+    "complete": 1,
+    "overdue": (0, 1),
+    "due-week": (0, 1),
+    "overdue-users": 0,
+    "search": 1,
+    "archive": (0, 1),
+}
+ADMIN_COMMANDS = ("register", "stats", "overdue-users", "archive")
+
+# Commands that change the users or tasks, which go through the writer
+WRITE_COMMANDS = ("register", "assign", "complete", "archive")
+
+# Error sent back when a command fails for any other reason
+UNEXPECTED_ERROR = "An unexpected error has occured."
+
+class TaskServerError(Exception):
+    """Raised for a request the server refuses, with the message sent back
+    to the client.
+    """
+
+def task_response(task_entries):
+    """Handles converting task entries into the dictionaries sent to
+    clients.
+    """
+    task_dictionaries = []
+    for task_entry in task_entries:
+        fields = task_entry[:6]
+        task_dictionaries.append(dict(zip(TASK_KEYS, (
+            *fields[:5], fields[5].strip() == "Yes"))))
+    return task_dictionaries
+
+def read_key(username, command, fields):
+    """Handles returning the cache key of a read, which names the command,
+    the user whose tasks it reads, or None for every user, and any other
+    fields. Users other than admin may only read their own tasks.
+    """
+    task_user = None
+    if username != "admin":
+        task_user = username
+    elif fields and command != "search":
+        task_user = fields[0].lower()
+    if command == "search":
+        return command, task_user, fields[0]
+    return command, task_user, None
+
+def run_read(store, command, task_user, keywords):
+    """Handles running a command that only reads, returning its result.
+    """
+    if command in ("view", "view-archived"):
+        archived = command == "view-archived"
+        if task_user is None:
+            return task_response(store.tasks(archived))
+        return task_response(store.user_tasks(task_user, archived))
+
+    if command == "overdue":
+        return task_response(store.overdue_tasks(task_user))
+    if command == "due-week":
+        return task_response(store.tasks_due_this_week(task_user))
+    if command == "search":
+        return task_response(store.search_tasks(keywords, task_user))
+    if command == "overdue-users":
+        return store.overdue_per_user()
+
+    task_stats = store.stats()
+    return {key: task_stats[key] for key in ("total_users", "total_tasks",
+                                             "completed", "incomplete",
+                                             "overdue")}
+
+def run_write(store, username, command, fields):
+    """Handles running a command that changes the users or tasks, returning
+    its result. Raises TaskServerError for a request that cannot be done.
+    """
+    if command == "register":
+        if not store.register_user(*fields):
+            raise TaskServerError(f"User already registered: {fields[0]}")
+        return True
+
+    if command == "assign":
+        try:
+            return task_response([store.assign_task(*fields)])[0]
+        except KeyError:
+            raise TaskServerError(f"Unknown user: {fields[0]}")
+
+    if command == "complete":
+        try:
+            task_number = int(fields[0])
+            return store.complete_task(username, task_number)
+        except (ValueError, IndexError):
+            raise TaskServerError(f"No task number {fields[0]}.")
+
+    cutoff = None
+    if fields:
+        cutoff = parse_task_date(fields[0])
+        if cutoff is None:
+            raise TaskServerError(f"Invalid date: {fields[0]}")
+    return store.archive_tasks(cutoff)
+
+class TaskServer:
+    """Handles serving task manager commands to many clients from one task
+    store, whose login dictionary, indexes and snapshot stay in memory.
+
+    Each request is one line of JSON, {"command": ..., "fields": [...]},
+    answered by one line of JSON, {"ok": true, "result": ...} or
+    {"ok": false, "error": ...}. A connection logs in first, and every
+    command after that runs as the user who logged in.
+
+    Reads are answered straight away, from a cache of recent responses.
+    Writes are queued for a single writer coroutine, which runs every
+    waiting write and then commits them together before answering any of
+    them. A write only drops the cached reads of the user it changed and
+    of every user, and a change by another session drops them all.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.write_queue = asyncio.Queue()
+        self.responses = OrderedDict()
+        self.responses_stamp = None
+        self.request_count = 0
+
+    async def serve(self, host = SERVER_HOST, port = SERVER_PORT):
+        """Handles listening for clients until the server is interrupted or
+        sent SIGTERM.
+        """
+        stopped = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM,
+                                                          stopped.set)
+        except NotImplementedError:
+            # Signal handlers are not available on Windows
+            pass
+
+        writer_task = asyncio.create_task(self.run_writer())
+        server = await asyncio.start_server(self.handle_client, host, port,
+                                            limit = STREAM_LIMIT)
+        try:
+            async with server:
+                await stopped.wait()
+        finally:
+            writer_task.cancel()
+
+    async def run_writer(self):
+        """Handles running the queued writes in order, committing each group
+        of waiting writes once before answering them.
+
+        If the commit fails, every write in the group is answered with an
+        error, since none of them can be known to be saved, and the writer
+        carries on with the next group.
+        """
+        while True:
+            writes = [await self.write_queue.get()]
+            while not self.write_queue.empty():
+                writes.append(self.write_queue.get_nowait())
+
+            try:
+                results = self.run_writes(writes)
+            except Exception:
+                results = [{"ok": False, "error": UNEXPECTED_ERROR}] * \
+                    len(writes)
+                self.responses.clear()
+                self.responses_stamp = None
+
+            # Skips clients that were disconnected while they waited
+            for write, result in zip(writes, results):
+                if not write[3].done():
+                    write[3].set_result(result)
+
+    def run_writes(self, writes):
+        """Handles running a group of queued writes and committing them,
+        returning the response to each.
+        """
+        # Drops every cached read if another session changed the files
+        if self.store.change_stamp() != self.responses_stamp:
+            self.responses.clear()
+
+        results = []
+        changed_users = set()
+        for username, command, fields in (write[:3] for write in writes):
+            if command == "assign":
+                changed_users.add(fields[0].lower())
+            elif command == "complete":
+                changed_users.add(username)
+            elif command == "archive":
+                self.responses.clear()
+            try:
+                with instrumented(f"server {command}"):
+                    results.append({"ok": True, "result": run_write(
+                        self.store, username, command, fields)})
+            except TaskServerError as error:
+                results.append({"ok": False, "error": str(error)})
+            except Exception:
+                results.append({"ok": False, "error": UNEXPECTED_ERROR})
+        with instrumented("server commit"):
+            self.store.commit()
+        for key in [key for key in self.responses
+                    if key[1] is None or key[1] in changed_users]:
+            del self.responses[key]
+        self.responses_stamp = self.store.change_stamp()
+        return results
+
+    def cached_read(self, username, command, fields):
+        """Handles answering a read, from the response cache when the users
+        and tasks have not changed since it was saved.
+        """
+        change_stamp = self.store.change_stamp()
+        if change_stamp != self.responses_stamp:
+            self.responses.clear()
+            self.responses_stamp = change_stamp
+
+        key = read_key(username, command, fields)
+        if key in self.responses:
+            self.responses.move_to_end(key)
+            return self.responses[key]
+        with instrumented(f"server {command}"):
+            response = encode_message({"ok": True, "result": run_read(
+                self.store, *key)})
+        self.responses[key] = response
+        if len(self.responses) > SERVER_CACHE_ENTRIES:
+            self.responses.popitem(last = False)
+        return response
+
+    async def handle_request(self, username, request):
+        """Handles answering one request, returning the encoded response and
+        the username of the connection after it.
+        """
+        command = request.get("command")
+        fields = [str(field).strip() for field in request.get("fields", [])]
+        expected = SERVER_COMMAND_FIELDS.get(command)
+        if isinstance(expected, int):
+            expected = (expected,)
+
+        if expected is None:
+            raise TaskServerError(f"Unknown command: {command}")
+        if len(fields) not in expected:
+            expected = " or ".join(map(str, expected))
+            raise TaskServerError(f"{command} takes {expected} fields, "
+                                  f"not {len(fields)}")
+
+        if command == "login":
+            login_user = fields[0].lower()
+            stored = self.store.login_dict.get(login_user)
+
+            # Checks the password in a thread, as hashing it takes long
+            # enough to hold up every other client
+            if stored is None or not await asyncio.to_thread(
+                verify_password, fields[1], stored):
+                raise TaskServerError("Incorrect username or password.")
+            return encode_message({"ok": True, "result": login_user}), \
+                login_user
+        if username is None:
+            raise TaskServerError("Log in first.")
+        if command in ADMIN_COMMANDS and username != "admin":
+            raise TaskServerError(f"Only admin can use {command}.")
+
+        if command in WRITE_COMMANDS:
+            result = asyncio.get_running_loop().create_future()
+            await self.write_queue.put((username, command, fields, result))
+            return encode_message(await result), username
+        return self.cached_read(username, command, fields), username
+
+    async def handle_client(self, reader, writer):
+        """Handles every request from one client connection until it
+        closes.
+        """
+        username = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.request_count += 1
+
+                # Answers bad requests and carries on with the connection
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise TaskServerError("Requests must be objects.")
+                    response, username = await self.handle_request(
+                        username, request)
+                except json.JSONDecodeError:
+                    response = encode_message({"ok": False,
+                                               "error": "Invalid JSON."})
+                except TaskServerError as error:
+                    response = encode_message({"ok": False,
+                                               "error": str(error)})
+                except Exception:
+                    response = encode_message({"ok": False,
+                                               "error": UNEXPECTED_ERROR})
+
+                writer.write(response)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+def encode_message(message):
+    """Handles encoding a request or response as one line of JSON.
+    """
+    return json.dumps(message, separators = (",", ":")).encode() + b"\n"
+
+async def open_client(host = SERVER_HOST, port = SERVER_PORT):
+    """Handles connecting to a task server, returning the stream reader
+    and writer.
+    """
+    return await asyncio.open_connection(host, port, limit = STREAM_LIMIT)
+
+async def send_request(reader, writer, command, *fields):
+    """Handles sending one command to a task server and returning its
+    result. Raises TaskServerError if the server refuses it.
+    """
+    writer.write(encode_message({"command": command,
+                                 "fields": list(fields)}))
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    if not response["ok"]:
+        raise TaskServerError(response["error"])
+    return response["result"]
+
+#====Runtime Section====
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Serves task manager commands to local clients as "
+        "lines of JSON over TCP.")
+    parser.add_argument("--host", default = SERVER_HOST,
+                        help = "address to listen on")
+    parser.add_argument("--port", type = int, default = SERVER_PORT,
+                        help = "port to listen on")
+    parser.add_argument("--directory", default = ".",
+                        help = "directory holding the task manager files")
+    parser.add_argument("--backend", choices = tuple(TASK_STORE_BACKENDS),
+                        default = None,
+                        help = "storage backend (default: sqlite if "
+                        "tasks.db exists, otherwise text)")
+    parser.add_argument("--fsync", action = "store_true",
+                        help = "fsync every group of writes")
+    parser.add_argument("--instrument", default = None,
+                        help = "measure each uncached read, write and commit: "
+                        "stderr or jsonl:<path> (default: the "
+                        f"{INSTRUMENT_VARIABLE} environment variable)")
+    arguments = parser.parse_args()
+    if arguments.instrument:
+        try:
+            enable_instrumentation(arguments.instrument)
+        except (ValueError, OSError) as error:
+            parser.error(str(error))
+
+    # Writes are committed by the writer coroutine, not by batch size
+    with open_task_store(arguments.directory, arguments.backend,
+                         batch_size = 1 << 30,
+                         fsync = arguments.fsync) as store:
+        task_server = TaskServer(store)
+        print(f"Serving {arguments.directory} on "
+              f"{arguments.host}:{arguments.port}.")
+        try:
+            asyncio.run(task_server.serve(arguments.host, arguments.port))
+        except KeyboardInterrupt:
+            pass
+        print(f"Answered {task_server.request_count} requests.")
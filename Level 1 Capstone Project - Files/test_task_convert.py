@@ -0,0 +1,146 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from task_manager_functions import convert_tasks_to_binary, \
+convert_binary_to_tasks, load_binary_tasks, migrate_to_shards, \
+merge_shards, import_text_files, locked_open, shard_path, TaskStore, \
+SqliteTaskStore
+
+# Tasks with a padded and an unpadded "No", CRLF and LF line endings and
+# date text that does not match DATE_FORMAT
+MIXED_TASKS = (b"admin, Register Users, Use the r menu, 10 Oct 2019, "
+               b"20 Oct 2019, No \r\n"
+               b"admin, Assign Tasks, Use the a menu, Not set, "
+               b"12 October 2022, Yes\r\n"
+               b"bob, Read Reports, Use the s menu, 1 January 2030, "
+               b"2 January 2029, No\n"
+               b"bob, Tidy Up, Clear, archive, and check, 3 March 2030, "
+               b"1 March 2030, No ")
+
+class BinaryRoundTripTest(unittest.TestCase):
+    """Handles converting tasks.txt to the binary format and back, which
+    must give back the same bytes.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tasks_path = os.path.join(directory.name, "tasks.txt")
+        self.binary_path = os.path.join(directory.name, "tasks.bin")
+        self.restored_path = os.path.join(directory.name, "restored.txt")
+
+    def round_trip(self, tasks):
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(tasks)
+        convert_tasks_to_binary(self.tasks_path, self.binary_path)
+        convert_binary_to_tasks(self.binary_path, self.restored_path)
+        with open(self.restored_path, "rb") as task_info:
+            return task_info.read()
+
+    def test_mixed_tasks(self):
+        self.assertEqual(self.round_trip(MIXED_TASKS), MIXED_TASKS)
+        self.assertEqual([task.status for task
+                          in load_binary_tasks(self.binary_path)],
+                         ["No ", "Yes", "No", "No "])
+
+    def test_trailing_line_break(self):
+        tasks = MIXED_TASKS + b"\r\n"
+        self.assertEqual(self.round_trip(tasks), tasks)
+
+    def test_empty_file(self):
+        self.assertEqual(self.round_trip(b""), b"")
+
+class ShardMigrationTest(unittest.TestCase):
+    """Handles moving tasks and their archive into shards and back, which
+    must keep every task, archived or not.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.tasks_path = os.path.join(self.directory, "tasks.txt")
+        self.shards_path = os.path.join(self.directory, "tasks")
+        with open(os.path.join(self.directory, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n\nbob, password")
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(MIXED_TASKS.replace(b"\r\n", b"\n"))
+        with TaskStore(self.directory) as store:
+            self.assertEqual(store.archive_tasks(), 1)
+
+    def task_counts(self):
+        with TaskStore(self.directory) as store:
+            return (store.stats()["total_tasks"], store.archived_task_count(),
+                    sorted(task.line for task in store.tasks(True)))
+
+    def test_round_trip(self):
+        before = self.task_counts()
+        self.assertEqual(before[:2], (4, 1))
+        self.assertEqual(migrate_to_shards(self.tasks_path, self.shards_path),
+                         4)
+        self.assertEqual(self.task_counts(), before)
+        self.assertEqual(merge_shards(self.shards_path, self.tasks_path), 4)
+        self.assertFalse(os.path.exists(self.shards_path))
+        self.assertEqual(self.task_counts(), before)
+
+    def test_unknown_file_blocks_merge(self):
+        migrate_to_shards(self.tasks_path, self.shards_path)
+        before = self.task_counts()
+        open(os.path.join(self.shards_path, "notes.md"), "w").close()
+        with self.assertRaises(ValueError):
+            merge_shards(self.shards_path, self.tasks_path)
+        self.assertFalse(os.path.exists(self.tasks_path))
+        self.assertEqual(self.task_counts(), before)
+
+    def test_merge_waits_for_appends(self):
+        migrate_to_shards(self.tasks_path, self.shards_path)
+        merge = threading.Thread(target = merge_shards,
+                                 args = (self.shards_path, self.tasks_path))
+        with locked_open(shard_path("bob", self.shards_path),
+                         "ab") as shard_info:
+            merge.start()
+            time.sleep(0.2)
+            self.assertTrue(merge.is_alive())
+            shard_info.write(b"\nbob, Late Task, Appended while merging, "
+                             b"3 March 2030, 1 March 2030, No ")
+        merge.join(5)
+
+        self.assertFalse(os.path.exists(self.shards_path))
+        with open(self.tasks_path, "rb") as task_info:
+            self.assertIn(b"bob, Late Task", task_info.read())
+
+class SqliteImportTest(unittest.TestCase):
+    """Handles importing the text files into the SQLite database, which must
+    happen only once.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        with open(os.path.join(self.directory, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n\nbob, password")
+        with open(os.path.join(self.directory, "tasks.txt"),
+                  "wb") as task_info:
+            task_info.write(MIXED_TASKS)
+
+    def stored_tasks(self):
+        with SqliteTaskStore(self.directory) as store:
+            return [task[1] for task in store.tasks()]
+
+    def test_import(self):
+        self.assertEqual(import_text_files(self.directory), (2, 4))
+        self.assertEqual(self.stored_tasks(), ["Register Users",
+                                               "Assign Tasks", "Read Reports",
+                                               "Tidy Up"])
+
+    def test_import_again_is_refused(self):
+        import_text_files(self.directory)
+        with self.assertRaises(ValueError):
+            import_text_files(self.directory)
+        self.assertEqual(len(self.stored_tasks()), 4)
+
+if __name__ == "__main__":
+    unittest.main()
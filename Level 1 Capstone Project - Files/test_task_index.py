@@ -0,0 +1,200 @@
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from functools import partial
+from unittest import mock
+import task_manager_functions
+from task_manager_functions import AppendWriter, build_task_index, \
+load_task_index, index_tasks_append, read_user_tasks, iter_task_records, \
+split_task_ranges, split_task_line, file_stamp, load_sidecar, \
+build_due_index, due_index_append, read_overdue_tasks, \
+read_tasks_due_this_week, overdue_per_user, parse_task_date
+from task_generator import generate_sample_data
+
+# Size of the generated files the indexes are checked against
+SAMPLE_TASKS = 3000
+SAMPLE_USERS = 20
+
+def text_tasks(tasks_path):
+    """Handles reading every task entry with a plain scan of tasks.txt, which
+    the indexed readers must agree with.
+    """
+    with open(tasks_path, "r", encoding = "utf-8", newline = "") as task_info:
+        return [split_task_line(line) for line in task_info if line.strip()]
+
+class TaskIndexTest(unittest.TestCase):
+    """Handles the per-user offset index, which must find exactly the tasks
+    a scan of tasks.txt finds for each user.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tasks_path = os.path.join(directory.name, "tasks.txt")
+        self.usernames = generate_sample_data(directory.name, SAMPLE_TASKS,
+                                              SAMPLE_USERS)
+
+    def user_tasks(self, username, task_index = None):
+        return [task.entry() for task
+                in read_user_tasks(username, self.tasks_path, task_index)]
+
+    def scanned_tasks(self, username):
+        return [task_entry for task_entry in text_tasks(self.tasks_path)
+                if task_entry[0] == username]
+
+    def test_index_matches_scan(self):
+        task_index = build_task_index(self.tasks_path)
+        self.assertEqual(sum(map(len, task_index["users"].values())),
+                         SAMPLE_TASKS)
+        for username in self.usernames + ["nobody"]:
+            self.assertEqual(self.user_tasks(username, task_index),
+                             self.scanned_tasks(username))
+
+    def test_append_updates_index(self):
+        build_task_index(self.tasks_path)
+        writer = AppendWriter(self.tasks_path, on_commit = [partial(
+            index_tasks_append, tasks_path = self.tasks_path)])
+        self.addCleanup(writer.close)
+        writer.write(["user5", "Extra", "Appended, with a comma",
+                      "1 January 2030", "1 January 2029", "No "])
+
+        # The saved index was moved on with the file, not rebuilt
+        task_index = load_sidecar(self.tasks_path + ".idx")
+        self.assertEqual(task_index["stamp"], file_stamp(self.tasks_path))
+        self.assertEqual(self.user_tasks("user5")[-1][1:3],
+                         ["Extra", "Appended, with a comma"])
+        self.assertEqual(self.user_tasks("user5"),
+                         self.scanned_tasks("user5"))
+
+    def test_rewritten_file_rebuilds_index(self):
+        build_task_index(self.tasks_path)
+        with open(self.tasks_path, "rb") as task_info:
+            tasks = task_info.read()
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(tasks.replace(b"user5, ", b"user15, "))
+
+        task_index = load_task_index(self.tasks_path)
+        self.assertNotIn("user5", task_index["users"])
+        self.assertEqual(self.user_tasks("user15"),
+                         self.scanned_tasks("user15"))
+
+class DueIndexTest(unittest.TestCase):
+    """Handles the due date index, which must find exactly the incomplete
+    tasks a scan of tasks.txt finds due in each range, in due date order.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tasks_path = os.path.join(directory.name, "tasks.txt")
+        generate_sample_data(directory.name, SAMPLE_TASKS, SAMPLE_USERS)
+
+    def scanned_due(self, first_day, last_day, username = None):
+        due_tasks = []
+        for position, task_entry in enumerate(text_tasks(self.tasks_path)):
+            due_ordinal = parse_task_date(task_entry[3])
+            if task_entry[5] != "Yes" and due_ordinal is not None and \
+                first_day.toordinal() <= due_ordinal <= last_day.toordinal() \
+                and username in (None, task_entry[0]):
+                due_tasks.append((due_ordinal, position, task_entry))
+        return [due_task[2] for due_task in sorted(due_tasks)]
+
+    def check_queries(self, today):
+        task_index = build_task_index(self.tasks_path)
+        week_end = today + timedelta(days = 6 - today.weekday())
+        for username in (None, "admin", "user10", "nobody"):
+            self.assertEqual(
+                [task.entry() for task in read_overdue_tasks(
+                    self.tasks_path, username, today,
+                    task_index = task_index)],
+                self.scanned_due(date.min, today - timedelta(days = 1),
+                                 username))
+            self.assertEqual(
+                [task.entry() for task in read_tasks_due_this_week(
+                    self.tasks_path, username, today)],
+                self.scanned_due(today, week_end, username))
+
+        user_counts = {}
+        for task_entry in self.scanned_due(date.min,
+                                           today - timedelta(days = 1)):
+            user_counts[task_entry[0]] = user_counts.get(task_entry[0], 0) + 1
+        self.assertEqual(overdue_per_user(self.tasks_path, today),
+                         dict(sorted(user_counts.items())))
+
+    def test_queries_match_scan(self):
+        build_due_index(self.tasks_path)
+
+        # The generated tasks fall due over the year before today
+        for today in (date.today(), date.today() - timedelta(days = 100)):
+            self.check_queries(today)
+
+    def test_append_updates_due_index(self):
+        build_due_index(self.tasks_path)
+        writer = AppendWriter(self.tasks_path, on_commit = [partial(
+            due_index_append, tasks_path = self.tasks_path)])
+        self.addCleanup(writer.close)
+        today = date.today()
+        for due_date in (today.strftime("%d %B %Y"),
+                         (today - timedelta(days = 3)).strftime("%d %b %Y"),
+                         "Someday"):
+            writer.write(["user5", "Extra", "Appended", due_date,
+                          "1 January 2029", "No "])
+
+        # The saved index was moved on with the file, not rebuilt
+        due_index = load_sidecar(self.tasks_path + ".due")
+        self.assertEqual(due_index["stamp"], file_stamp(self.tasks_path))
+        self.assertEqual(len(due_index["offsets"]), SAMPLE_TASKS + 2)
+        self.check_queries(today)
+
+class TaskReaderTest(unittest.TestCase):
+    """Handles the memory-mapped reader, which must yield the same tasks as
+    a scan of tasks.txt whatever its line breaks and chunk boundaries.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tasks_path = os.path.join(directory.name, "tasks.txt")
+        self.usernames = generate_sample_data(directory.name, SAMPLE_TASKS,
+                                              SAMPLE_USERS)
+
+    def read_tasks(self, *arguments):
+        return [task.entry() for task
+                in iter_task_records(self.tasks_path, *arguments)]
+
+    def test_reader_matches_scan(self):
+        scanned = text_tasks(self.tasks_path)
+
+        # Small chunks make most lines cross a chunk boundary
+        for chunk_size in (task_manager_functions.READ_CHUNK_SIZE, 100):
+            with mock.patch.object(task_manager_functions, "READ_CHUNK_SIZE",
+                                   chunk_size):
+                self.assertEqual(self.read_tasks(), scanned)
+        for username in ("admin", "user1", "user10"):
+            self.assertEqual(self.read_tasks(username),
+                             [task_entry for task_entry in scanned
+                              if task_entry[0] == username])
+
+    def test_reader_splits_ranges(self):
+        size = os.path.getsize(self.tasks_path)
+        tasks = []
+        for range_start, range_end in split_task_ranges(self.tasks_path,
+                                                        size, 7):
+            tasks += self.read_tasks(None, range_start, range_end)
+        self.assertEqual(tasks, text_tasks(self.tasks_path))
+
+    def test_crlf_and_blank_lines(self):
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(b"admin, One, First, 1 Jan 2030, 1 Jan 2029, "
+                            b"No \r\n\r\nbob, Two, Second, 2 Jan 2030, "
+                            b"2 Jan 2029, Yes\r\n\n")
+        self.assertEqual([task[1] for task in self.read_tasks()],
+                         ["One", "Two"])
+        self.assertEqual(self.read_tasks("bob")[0][5], "Yes")
+
+        open(self.tasks_path, "wb").close()
+        self.assertEqual(self.read_tasks(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from task_manager_functions import TaskStore, enable_instrumentation, \
+disable_instrumentation, instrumented, instrument_counters, \
+start_operation, login_dict_function, OPERATION_COUNTERS
+
+USERS = b"admin, adm1n\nbob, password"
+
+TASKS = b"admin, Register Users, Use the r menu, 1 January 2030, " \
+    b"20 Oct 2019, No "
+
+# Operations the store runs inside a menu option, none inside another
+NESTED_OPERATIONS = ("TaskSnapshot.load", "TaskStore.assign_task",
+                     "TaskSnapshot.save")
+
+class InstrumentationTest(unittest.TestCase):
+    """Handles the opt-in instrumentation, which must add what each helper
+    did to the operations running around it and record them to any sink.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.users_path = os.path.join(self.directory, "user.txt")
+        with open(self.users_path, "wb") as users:
+            users.write(USERS)
+        with open(os.path.join(self.directory, "tasks.txt"), "wb") as tasks:
+            tasks.write(TASKS)
+        disable_instrumentation()
+        self.addCleanup(disable_instrumentation)
+
+    def assign_in_menu(self):
+        with instrumented("menu a"):
+            with TaskStore(self.directory) as store:
+                store.assign_task("bob", "Read Reports", "Use the s menu",
+                                  "2 January 2030")
+                self.assertEqual(len(list(store.user_tasks("bob"))), 1)
+
+    def test_off_by_default(self):
+        self.assertIsNone(start_operation("menu a"))
+        self.assign_in_menu()
+        self.assertEqual(instrument_counters(), {})
+
+    def test_memory_counters(self):
+        enable_instrumentation("memory")
+        login_dict_function(self.users_path)
+        self.assign_in_menu()
+        counters = instrument_counters()
+
+        self.assertEqual(counters["login_dict_function"]["records"], 2)
+        self.assertEqual(counters["login_dict_function"]["bytes_read"],
+                         len(USERS))
+        self.assertGreater(counters["TaskStore.assign_task"]["bytes_written"],
+                           0)
+
+        # The menu option includes everything its helpers did, along with
+        # the tasks it read itself
+        menu = counters["menu a"]
+        self.assertEqual(menu["calls"], 1)
+        nested = {counter: sum(counters[name][counter]
+                               for name in NESTED_OPERATIONS)
+                  for counter in OPERATION_COUNTERS[3:]}
+        self.assertGreater(menu["records"], nested["records"])
+        self.assertGreater(menu["bytes_read"], nested["bytes_read"])
+        self.assertEqual(menu["bytes_written"], nested["bytes_written"])
+
+    def test_jsonl_sink(self):
+        jsonl_path = os.path.join(self.directory, "operations.jsonl")
+        enable_instrumentation(f"jsonl:{jsonl_path}")
+        self.assign_in_menu()
+
+        # An operation left running is recorded when the sink is closed
+        start_operation("menu e")
+        disable_instrumentation()
+        with open(jsonl_path, "r", encoding = "utf-8") as jsonl_info:
+            measurements = [json.loads(line) for line in jsonl_info]
+        operations = [measurement["operation"]
+                      for measurement in measurements]
+        self.assertIn("TaskStore.assign_task", operations)
+        self.assertEqual(operations[-2:], ["menu a", "menu e"])
+        for measurement in measurements:
+            self.assertLessEqual(set(OPERATION_COUNTERS[1:]),
+                                 set(measurement))
+
+    def test_stderr_summary(self):
+        enable_instrumentation("stderr")
+        self.assign_in_menu()
+        with mock.patch("sys.stderr", new_callable = io.StringIO) as stderr:
+            disable_instrumentation()
+        lines = stderr.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith("Operation"))
+        self.assertTrue(lines[2].startswith("menu a "))
+        self.assertEqual(instrument_counters(), {})
+
+    def test_unknown_sink(self):
+        with self.assertRaises(ValueError):
+            enable_instrumentation("syslog")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import task_manager_functions
+from task_manager_functions import TaskStore, SqliteTaskStore, \
+hash_password, verify_password, is_password_hash, hash_user_file, \
+hash_database_passwords, import_text_files
+
+# Low costs keep the hashing in the tests fast
+TEST_COSTS = {"scrypt": 2 ** 10, "pbkdf2_sha256": 1000}
+
+class PasswordHashTest(unittest.TestCase):
+    """Handles hashing and verifying passwords, which must accept only the
+    password that was hashed whatever the method and cost.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ,
+                                  {"TASK_MANAGER_PASSWORD_COST": "1024"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hash_and_verify(self):
+        for method, cost in TEST_COSTS.items():
+            stored = hash_password("pässword", method, cost)
+            self.assertEqual(stored.split("$")[:2], [method, str(cost)])
+            self.assertTrue(is_password_hash(stored))
+            self.assertTrue(verify_password("pässword", stored))
+            self.assertFalse(verify_password("password", stored))
+
+            # Each hash has its own salt
+            self.assertNotEqual(hash_password("pässword", method, cost),
+                                stored)
+
+    def test_settings_from_environment(self):
+        with mock.patch.dict(os.environ, {"TASK_MANAGER_PASSWORD_HASH":
+                                          "pbkdf2_sha256"}):
+            self.assertEqual(hash_password("adm1n").split("$")[:2],
+                             ["pbkdf2_sha256", "1024"])
+        with self.assertRaises(ValueError):
+            hash_password("adm1n", "md5")
+
+    def test_plaintext_passwords_still_verify(self):
+        self.assertFalse(is_password_hash("adm1n"))
+        self.assertTrue(verify_password("adm1n", "adm1n"))
+        self.assertFalse(verify_password("admin", "adm1n"))
+
+    def test_verified_password_is_cached(self):
+        stored = hash_password("adm1n", "scrypt", TEST_COSTS["scrypt"])
+        self.assertTrue(verify_password("adm1n", stored))
+        with mock.patch.object(task_manager_functions, "derive_password") \
+            as derived:
+            self.assertTrue(verify_password("adm1n", stored))
+            self.assertFalse(verify_password("admin", stored))
+        derived.assert_not_called()
+
+class HashedUsersTest(unittest.TestCase):
+    """Handles hashing the passwords of user.txt and the database, after
+    which every user must still log in with their old password.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ,
+                                  {"TASK_MANAGER_PASSWORD_COST": "1024"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.users_path = os.path.join(self.directory, "user.txt")
+        self.bob_hash = hash_password("b0b")
+        with open(self.users_path, "wb") as users:
+            users.write(f"admin, adm1n\r\nbob, {self.bob_hash}\n"
+                        f"Carol, c4rol".encode("utf-8"))
+        open(os.path.join(self.directory, "tasks.txt"), "wb").close()
+
+    def check_logins(self, store):
+        self.assertEqual(store.authenticate("ADMIN", "adm1n"), "admin")
+        self.assertEqual(store.authenticate("bob", "b0b"), "bob")
+        self.assertEqual(store.authenticate("carol", "c4rol"), "carol")
+        self.assertIsNone(store.authenticate("carol", "carol"))
+        self.assertIsNone(store.authenticate("nobody", "c4rol"))
+
+    def test_hash_user_file(self):
+        with TaskStore(self.directory) as store:
+            self.check_logins(store)
+            self.assertEqual(hash_user_file(self.users_path), 2)
+            self.assertTrue(all(map(is_password_hash,
+                                    store.login_dict.values())))
+            self.check_logins(store)
+
+        # Line breaks and hashed passwords are kept as they were
+        with open(self.users_path, "rb") as users:
+            lines = users.read().split(b"\n")
+        self.assertTrue(lines[0].endswith(b"\r"))
+        self.assertEqual(lines[1], f"bob, {self.bob_hash}".encode("utf-8"))
+        self.assertEqual(hash_user_file(self.users_path), 0)
+
+    def test_registered_passwords_are_hashed(self):
+        import_text_files(self.directory)
+        for store_class in (TaskStore, SqliteTaskStore):
+            with store_class(self.directory) as store:
+                self.assertTrue(store.register_user("Dave", "d4ve"))
+                self.assertTrue(is_password_hash(store.login_dict["dave"]))
+                self.assertEqual(store.authenticate("dave", "d4ve"), "dave")
+                self.check_logins(store)
+
+    def test_hash_database_passwords(self):
+        import_text_files(self.directory)
+        self.assertEqual(hash_database_passwords(
+            os.path.join(self.directory, "tasks.db")), 2)
+        with SqliteTaskStore(self.directory) as store:
+            self.assertTrue(all(map(is_password_hash,
+                                    store.login_dict.values())))
+            self.check_logins(store)
+
+if __name__ == "__main__":
+    unittest.main()
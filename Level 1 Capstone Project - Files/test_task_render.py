@@ -0,0 +1,52 @@
+import io
+import unittest
+from unittest import mock
+import task_manager_functions
+from task_manager_functions import render_tasks, format_task
+
+TASK_ENTRIES = [[f"user{number % 3}", f"Task {number}", "Check it, twice",
+                 "1 January 2030", "1 January 2029", "No "]
+                for number in range(45)]
+
+class TerminalOutput(io.StringIO):
+    """Handles collecting output the way a terminal would show it.
+    """
+
+    def isatty(self):
+        return True
+
+class RenderTasksTest(unittest.TestCase):
+    """Handles the buffered renderer of the view menus, which must print
+    exactly what one print() per task used to.
+    """
+
+    def test_output_matches_format_task(self):
+        expected = "".join(format_task(task_entry) + "\n"
+                           for task_entry in TASK_ENTRIES)
+
+        # Small buffers make the renderer write many chunks
+        for buffer_size in (task_manager_functions.RENDER_BUFFER_SIZE, 300):
+            output = io.StringIO()
+            with mock.patch.object(task_manager_functions,
+                                   "RENDER_BUFFER_SIZE", buffer_size):
+                self.assertEqual(render_tasks(iter(TASK_ENTRIES),
+                                              output = output), 45)
+            self.assertEqual(output.getvalue(), expected)
+
+    def test_pages_on_a_terminal(self):
+        output = TerminalOutput()
+        with mock.patch("builtins.input", side_effect = ["", "q"]) as asked:
+            self.assertEqual(render_tasks(iter(TASK_ENTRIES), 20, output), 40)
+        self.assertEqual(asked.call_count, 2)
+        self.assertEqual(output.getvalue(),
+                         "".join(format_task(task_entry) + "\n"
+                                 for task_entry in TASK_ENTRIES[:40]))
+
+    def test_piped_output_is_not_paged(self):
+        output = io.StringIO()
+        with mock.patch("builtins.input") as asked:
+            self.assertEqual(render_tasks(iter(TASK_ENTRIES), 20, output), 45)
+        asked.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
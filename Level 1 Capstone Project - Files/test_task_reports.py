@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from task_manager_functions import TaskStore, write_reports, \
+parse_task_date, split_task_line
+from task_generator import generate_sample_data
+
+# Size of the generated files the reports are checked against
+SAMPLE_TASKS = 3000
+SAMPLE_USERS = 20
+
+TASKS = (b"admin, Register Users, Use the r menu, 10 Oct 2019, "
+         b"20 Oct 2019, No \n"
+         b"bob, Read Reports, Use the s menu, 1 January 2030, "
+         b"2 January 2029, Yes\n"
+         b"admin, Assign Tasks, Use the a menu, 1 January 2030, "
+         b"12 October 2022, No ")
+
+TASK_REPORT = """Total Tasks: 3
+Completed Tasks: 1
+Incomplete Tasks: 2
+Overdue Tasks: 1
+Percentage Incomplete: 66.67%
+Percentage Overdue: 33.33%
+"""
+
+USER_REPORT = """Total Users: 3
+Total Tasks: 3
+
+User: admin
+Tasks Assigned: 2
+Completed Tasks: 0
+Incomplete Tasks: 2
+Overdue Tasks: 1
+Percentage of Total Tasks: 66.67%
+Percentage Completed: 0.00%
+Percentage Incomplete: 100.00%
+Percentage Overdue: 50.00%
+
+User: bob
+Tasks Assigned: 1
+Completed Tasks: 1
+Incomplete Tasks: 0
+Overdue Tasks: 0
+Percentage of Total Tasks: 33.33%
+Percentage Completed: 100.00%
+Percentage Incomplete: 0.00%
+Percentage Overdue: 0.00%
+
+User: carol
+Tasks Assigned: 0
+Completed Tasks: 0
+Incomplete Tasks: 0
+Overdue Tasks: 0
+Percentage of Total Tasks: 0.00%
+Percentage Completed: 0.00%
+Percentage Incomplete: 0.00%
+Percentage Overdue: 0.00%
+"""
+
+def report_sections(report_path):
+    """Handles reading a report into one dictionary of "name: value" lines
+    per blank-line separated section.
+    """
+    with open(report_path, "r", encoding = "utf-8") as report_file:
+        return [dict(line.split(": ", 1) for line in section.splitlines())
+                for section in report_file.read().split("\n\n")]
+
+class WriteReportsTest(unittest.TestCase):
+    """Handles the overview reports, which must hold the counts a scan of
+    tasks.txt finds for every task and registered user.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.tasks_path = os.path.join(self.directory, "tasks.txt")
+        self.report_paths = (os.path.join(self.directory, "task_overview.txt"),
+                             os.path.join(self.directory, "user_overview.txt"))
+
+    def write_reports(self, today):
+        with TaskStore(self.directory) as store:
+            write_reports(store.stats(), store.login_dict, *self.report_paths,
+                          today = today.toordinal())
+
+    def test_report_text(self):
+        with open(os.path.join(self.directory, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n\nbob, password\ncarol, password")
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(TASKS)
+
+        self.write_reports(date(2024, 1, 1))
+        for report_path, report in zip(self.report_paths,
+                                       (TASK_REPORT, USER_REPORT)):
+            with open(report_path, "r", encoding = "utf-8") as report_file:
+                self.assertEqual(report_file.read(), report)
+
+    def test_reports_match_scan(self):
+        usernames = generate_sample_data(self.directory, SAMPLE_TASKS,
+                                         SAMPLE_USERS)
+        today = date.today()
+        self.write_reports(today)
+
+        # Counts tasks, completed tasks and overdue tasks for each user
+        scanned = {username: [0, 0, 0] for username in usernames}
+        with open(self.tasks_path, "r", encoding = "utf-8") as task_info:
+            for line in task_info:
+                task_entry = split_task_line(line)
+                counts = scanned[task_entry[0]]
+                counts[0] += 1
+                if task_entry[5] == "Yes":
+                    counts[1] += 1
+                elif parse_task_date(task_entry[3]) < today.toordinal():
+                    counts[2] += 1
+
+        task_report = report_sections(self.report_paths[0])[0]
+        self.assertEqual([int(task_report[name]) for name in
+                          ("Total Tasks", "Completed Tasks",
+                           "Overdue Tasks")],
+                         [sum(counts[position]
+                              for counts in scanned.values())
+                          for position in range(3)])
+
+        user_report = report_sections(self.report_paths[1])
+        self.assertEqual(user_report[0], {"Total Users": str(SAMPLE_USERS),
+                                          "Total Tasks": str(SAMPLE_TASKS)})
+        self.assertEqual({section["User"]: [int(section[name]) for name in
+                                            ("Tasks Assigned",
+                                             "Completed Tasks",
+                                             "Overdue Tasks")]
+                          for section in user_report[1:]}, scanned)
+
+if __name__ == "__main__":
+    unittest.main()
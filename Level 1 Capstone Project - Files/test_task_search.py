@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+from unittest import mock
+import task_manager_functions
+from task_manager_functions import AppendWriter, build_search_index, \
+load_sidecar, search_index_append, search_tasks, search_tokens, \
+build_task_index, split_task_line, load_search_directory, file_stamp
+from task_generator import generate_sample_data
+
+# Size of the generated files the search index is checked against
+SAMPLE_TASKS = 3000
+SAMPLE_USERS = 20
+
+# Searches made of words the generated titles and descriptions use, in
+# other cases, and of words they never use
+KEYWORDS = ("review", "Update REPORT", "team meeting", "plan test",
+            "client, email", "sign-off", "figures budget", "Überprüfen",
+            "missing", "")
+
+def scanned_search(tasks_path, keywords, username = None):
+    """Handles finding the tasks whose title or description contains every
+    word in keywords with a plain scan of tasks.txt.
+    """
+    tokens = search_tokens(keywords)
+    with open(tasks_path, "r", encoding = "utf-8", newline = "") as task_info:
+        task_entries = [split_task_line(line) for line in task_info
+                        if line.strip()]
+    if not tokens:
+        return []
+    return [task_entry for task_entry in task_entries
+            if tokens <= search_tokens(f"{task_entry[1]} {task_entry[2]}")
+            and username in (None, task_entry[0])]
+
+class SearchIndexTest(unittest.TestCase):
+    """Handles the keyword search index, which must find exactly the tasks
+    a scan of tasks.txt finds, before and after appends are merged into
+    its postings file.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tasks_path = os.path.join(directory.name, "tasks.txt")
+        generate_sample_data(directory.name, SAMPLE_TASKS, SAMPLE_USERS)
+
+    def check_appended_index(self):
+        """Handles checking the saved index was moved on with tasks.txt, as
+        a search would otherwise quietly rebuild it.
+        """
+        recent = load_sidecar(self.tasks_path + ".search")
+        self.assertEqual(recent["stamp"], file_stamp(self.tasks_path))
+        self.assertEqual(load_search_directory(self.tasks_path)["stamp"],
+                         recent["postings_stamp"])
+        return recent
+
+    def check_searches(self):
+        task_index = build_task_index(self.tasks_path)
+        for keywords in KEYWORDS:
+            self.assertEqual([task.entry() for task
+                              in search_tasks(keywords, self.tasks_path)],
+                             scanned_search(self.tasks_path, keywords))
+            for username in ("admin", "user10"):
+                self.assertEqual(
+                    [task.entry() for task in search_tasks(
+                        keywords, self.tasks_path, username, task_index)],
+                    scanned_search(self.tasks_path, keywords, username))
+
+    def test_search_matches_scan(self):
+        build_search_index(self.tasks_path)
+        self.check_searches()
+
+    def test_appends_are_merged(self):
+        built_stamp = build_search_index(self.tasks_path)[0]["stamp"]
+        writer = AppendWriter(self.tasks_path, batch_size = 3,
+                              on_commit = [partial(
+                                  search_index_append,
+                                  tasks_path = self.tasks_path)])
+        self.addCleanup(writer.close)
+
+        # A small merge threshold makes the appends merge several times
+        with mock.patch.object(task_manager_functions,
+                               "SEARCH_MERGE_POSTINGS", 40):
+            for number in range(30):
+                writer.write([f"user{number % 4}",
+                              f"Review Überprüfen {number}",
+                              "Check the client email, before sign-off",
+                              "1 January 2030", "1 January 2029", "No "])
+                if number == 10:
+                    writer.commit()
+                    self.check_appended_index()
+                    self.check_searches()
+            writer.commit()
+
+        recent = self.check_appended_index()
+        self.assertNotEqual(recent["postings_stamp"], built_stamp)
+        self.assertLess(recent["count"], 40)
+        self.check_searches()
+        self.assertEqual(len(scanned_search(self.tasks_path, "überprüfen")),
+                         30)
+
+if __name__ == "__main__":
+    unittest.main()
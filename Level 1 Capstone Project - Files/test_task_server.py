@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from task_manager_functions import TaskStore
+from task_server import TaskServer, TaskServerError, UNEXPECTED_ERROR, \
+open_client, send_request, SERVER_HOST
+
+# Assignments sent at once by the client test, which the writer should
+# commit in far fewer groups
+ASSIGNMENTS = 20
+
+class FailingCommitStore(TaskStore):
+    """Handles a task store whose next commit fails, as on a full disk.
+    """
+    fail_commit = False
+
+    def commit(self):
+        if self.fail_commit:
+            self.fail_commit = False
+            raise OSError("No space left on device")
+        super().commit()
+
+class CountingCommitStore(TaskStore):
+    """Handles a task store that counts how often it commits.
+    """
+    commits = 0
+
+    def commit(self):
+        self.commits += 1
+        super().commit()
+
+class TaskServerTest(unittest.IsolatedAsyncioTestCase):
+    """Handles the writer of a TaskServer, which must answer every queued
+    write even when committing them fails.
+    """
+
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n")
+        self.store = FailingCommitStore(directory.name, batch_size = 1 << 30)
+        self.addCleanup(self.store.close)
+
+        self.server = TaskServer(self.store)
+        writer_task = asyncio.create_task(self.server.run_writer())
+        self.addCleanup(writer_task.cancel)
+
+    async def request(self, command, *fields):
+        response, username = await asyncio.wait_for(
+            self.server.handle_request("admin", {"command": command,
+                                                 "fields": list(fields)}), 5)
+        return json.loads(response)
+
+    async def test_failed_commit_is_answered(self):
+        self.store.fail_commit = True
+        responses = await asyncio.gather(
+            self.request("assign", "admin", "First", "Write it",
+                         "1 January 2030"),
+            self.request("register", "bob", "password"))
+        self.assertEqual(responses, [{"ok": False,
+                                      "error": UNEXPECTED_ERROR}] * 2)
+
+        # The writer carries on with the next group of writes
+        response = await self.request("assign", "admin", "Second", "Write it",
+                                      "1 January 2030")
+        self.assertEqual(response["result"]["title"], "Second")
+        self.assertTrue((await self.request("stats"))["ok"])
+
+class TaskServerClientTest(unittest.IsolatedAsyncioTestCase):
+    """Handles clients talking to a TaskServer over TCP, which must see
+    their own and each other's writes in every later read.
+    """
+
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n\nbob, password")
+        self.store = CountingCommitStore(directory.name,
+                                         batch_size = 1 << 30)
+        self.addCleanup(self.store.close)
+
+        server = TaskServer(self.store)
+        writer_task = asyncio.create_task(server.run_writer())
+        self.addCleanup(writer_task.cancel)
+        listener = await asyncio.start_server(server.handle_client,
+                                              SERVER_HOST, 0)
+        self.addAsyncCleanup(listener.wait_closed)
+        self.addCleanup(listener.close)
+        self.port = listener.sockets[0].getsockname()[1]
+
+    async def connect(self, username = None, password = None):
+        reader, writer = await open_client(SERVER_HOST, self.port)
+        self.addCleanup(writer.close)
+        client = (reader, writer)
+        if username is not None:
+            self.assertEqual(await send_request(*client, "login", username,
+                                                password), username)
+        return client
+
+    async def test_requests_from_two_clients(self):
+        bob = await self.connect()
+        with self.assertRaisesRegex(TaskServerError, "Log in first"):
+            await send_request(*bob, "view")
+        with self.assertRaisesRegex(TaskServerError, "Incorrect"):
+            await send_request(*bob, "login", "bob", "adm1n")
+        self.assertEqual(await send_request(*bob, "login", "Bob",
+                                            "password"), "bob")
+        self.assertEqual(await send_request(*bob, "view"), [])
+        admin = await self.connect("admin", "adm1n")
+
+        # Concurrent writes are committed in groups
+        clients = [await self.connect("admin", "adm1n")
+                   for number in range(ASSIGNMENTS)]
+        assigned = await asyncio.gather(*(
+            send_request(*client, "assign", "bob", f"Task {number}", "Do it",
+                         "1 January 2030")
+            for number, client in enumerate(clients)))
+        self.assertEqual(sorted(task["title"] for task in assigned),
+                         sorted(f"Task {number}"
+                                for number in range(ASSIGNMENTS)))
+        self.assertLess(self.store.commits, ASSIGNMENTS)
+
+        # Bob's cached view was dropped when his tasks changed
+        bob_tasks = await send_request(*bob, "view")
+        self.assertEqual(len(bob_tasks), ASSIGNMENTS)
+        self.assertTrue(await send_request(*bob, "complete", "1"))
+        self.assertTrue((await send_request(*bob, "view"))[0]["completed"])
+        self.assertEqual((await send_request(*admin, "stats"))["completed"],
+                         1)
+
+        with self.assertRaisesRegex(TaskServerError, "Only admin"):
+            await send_request(*bob, "stats")
+        with self.assertRaisesRegex(TaskServerError, "No task number"):
+            await send_request(*bob, "complete", "99")
+        bob[1].write(b"not json\n")
+        self.assertIn(b"Invalid JSON", await bob[0].readline())
+
+if __name__ == "__main__":
+    unittest.main()
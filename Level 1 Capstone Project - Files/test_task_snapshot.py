@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from task_manager_functions import TaskStore, TaskSnapshot, SNAPSHOT_FILE
+from task_generator import generate_sample_data
+
+TASKS = (b"admin, Register Users, Use the r menu, 10 Oct 2019, "
+         b"20 Oct 2019, No \n"
+         b"bob, Read Reports, Use the s menu, 1 January 2030, "
+         b"2 January 2029, No \n"
+         b"admin, Assign Tasks, Use the a menu, 1 January 2030, "
+         b"12 October 2022, No \n")
+
+# Sessions saving the snapshot at once, how often each saves it, and the
+# tasks the snapshot they save covers
+SAVING_SESSIONS = 8
+SAVES_PER_SESSION = 10
+SAVED_TASKS = 20000
+
+def save_repeatedly(directory, session):
+    """Handles assigning a task and saving the snapshot several times, as a
+    busy session of its own.
+    """
+    for save in range(SAVES_PER_SESSION):
+        with TaskStore(directory) as store:
+            store.assign_task("admin", f"Task {session}.{save}", "Saved",
+                              "1 January 2030")
+            store.snapshot.save()
+
+class TaskSnapshotTest(unittest.TestCase):
+    """Handles loading the snapshot a TaskStore saves, which must replay
+    only what other sessions changed since.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.tasks_path = os.path.join(self.directory, "tasks.txt")
+        with open(os.path.join(self.directory, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n\nbob, password")
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(TASKS)
+
+        # Saves a snapshot covering the files above
+        TaskStore(self.directory).close()
+
+    def load_snapshot(self):
+        return TaskSnapshot(os.path.join(self.directory, SNAPSHOT_FILE),
+                            os.path.join(self.directory, "user.txt"),
+                            self.tasks_path).load()
+
+    def test_load_replays_appended_tasks(self):
+        appended = (b"bob, Tidy Up, Clear the desk, 3 March 2030, "
+                    b"1 March 2030, No \n")
+        with open(self.tasks_path, "ab") as task_info:
+            task_info.write(appended)
+
+        snapshot = self.load_snapshot()
+        self.assertEqual(snapshot.unsaved_bytes, len(appended))
+        task_stats = snapshot.stats()
+        self.assertEqual((task_stats["total_tasks"], task_stats["incomplete"],
+                          task_stats["total_users"]), (4, 4, 2))
+        self.assertEqual(len(snapshot.task_index()["users"]["bob"]), 2)
+        self.assertEqual(list(snapshot.due_index()["ordinals"]),
+                         sorted(snapshot.due_index()["ordinals"]))
+
+    def test_load_replays_journalled_completions(self):
+        snapshot = self.load_snapshot()
+        with TaskStore(self.directory) as store:
+            self.assertTrue(store.complete_task("admin", 2))
+
+        # The completion is replayed from the journal, not by a rebuild
+        snapshot.catch_up()
+        self.assertEqual(snapshot.unsaved_bytes, 16)
+        task_stats = snapshot.stats()
+        self.assertEqual((task_stats["completed"], task_stats["incomplete"]),
+                         (1, 2))
+        self.assertEqual(sum(task_stats["users"]["admin"]["due"].values()),
+                         1)
+
+        task_stats = self.load_snapshot().stats()
+        self.assertEqual((task_stats["completed"], task_stats["incomplete"]),
+                         (1, 2))
+
+    def test_rewritten_file_is_rebuilt(self):
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(TASKS.replace(b"bob, Read", b"admin, Read"))
+        snapshot = self.load_snapshot()
+        self.assertEqual(snapshot.unsaved_bytes, len(TASKS) + 2)
+        self.assertNotIn("bob", snapshot.task_index()["users"])
+
+    def test_concurrent_saves(self):
+        generate_sample_data(self.directory, SAVED_TASKS)
+        TaskStore(self.directory).close()
+        context = multiprocessing.get_context("fork")
+        sessions = [context.Process(target = save_repeatedly,
+                                    args = (self.directory, session))
+                    for session in range(SAVING_SESSIONS)]
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+        self.assertEqual([session.exitcode for session in sessions],
+                         [0] * SAVING_SESSIONS)
+
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         [SNAPSHOT_FILE, "tasks.txt", "user.txt"])
+        self.assertEqual(self.load_snapshot().stats()["total_tasks"],
+                         SAVED_TASKS + SAVING_SESSIONS * SAVES_PER_SESSION)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+from task_manager_functions import AppendWriter, load_task_stats, \
+recount_task_stats, stats_tasks_append, complete_user_task, load_sidecar, \
+split_task_line, TaskSnapshot
+from task_generator import generate_sample_data
+
+# Size of the generated files the statistics are checked against
+SAMPLE_TASKS = 3000
+SAMPLE_USERS = 20
+
+def scanned_counts(tasks_path):
+    """Handles counting the tasks, completed tasks and tasks per user with a
+    plain scan of tasks.txt.
+    """
+    with open(tasks_path, "r", encoding = "utf-8") as task_info:
+        task_entries = [split_task_line(line) for line in task_info
+                        if line.strip()]
+    user_tasks = {}
+    for task_entry in task_entries:
+        user_tasks[task_entry[0]] = user_tasks.get(task_entry[0], 0) + 1
+    return (len(task_entries),
+            sum(task_entry[5] == "Yes" for task_entry in task_entries),
+            user_tasks)
+
+class TaskStatsTest(unittest.TestCase):
+    """Handles the saved statistics, which must match a recount after each
+    append or completion they were updated for in place.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tasks_path = os.path.join(directory.name, "tasks.txt")
+        generate_sample_data(directory.name, SAMPLE_TASKS, SAMPLE_USERS)
+
+    def saved_stats(self):
+        return load_sidecar(self.tasks_path + ".stats")
+
+    def test_recount_matches_scan(self):
+        task_stats = load_task_stats(self.tasks_path)
+        total_tasks, completed, user_tasks = scanned_counts(self.tasks_path)
+        self.assertEqual((task_stats["total_tasks"], task_stats["completed"],
+                          task_stats["incomplete"]),
+                         (total_tasks, completed, total_tasks - completed))
+        self.assertEqual({username: user_stats["tasks"] for username,
+                          user_stats in task_stats["users"].items()},
+                         user_tasks)
+        self.assertEqual(sum(task_stats["due"].values()),
+                         total_tasks - completed)
+
+    def test_updates_match_recount(self):
+        load_task_stats(self.tasks_path)
+        writer = AppendWriter(self.tasks_path, batch_size = 2,
+                              on_commit = [partial(
+                                  stats_tasks_append,
+                                  tasks_path = self.tasks_path)])
+        writer.write(["user3", "Extra", "Appended", "1 January 2030",
+                      "1 January 2029", "No "])
+        writer.write(["newcomer", "Extra", "Appended", "2 January 2030",
+                      "1 January 2029", "No "])
+        writer.close()
+        self.assertTrue(complete_user_task("newcomer", 1, self.tasks_path))
+        complete_user_task("user3", 1, self.tasks_path)
+
+        updated = self.saved_stats()
+        self.assertEqual(updated["total_tasks"], SAMPLE_TASKS + 2)
+        self.assertEqual(updated, recount_task_stats(self.tasks_path))
+
+    def test_parallel_recount_matches_serial(self):
+        serial_stats = recount_task_stats(self.tasks_path, 1)
+
+        # An odd worker count leaves ranges that end mid-line to be aligned
+        for workers in (2, 7):
+            self.assertEqual(recount_task_stats(self.tasks_path, workers),
+                             serial_stats)
+
+    def test_parallel_snapshot_matches_serial(self):
+        directory = os.path.dirname(self.tasks_path)
+        snapshots = [TaskSnapshot(os.path.join(directory, f"snapshot{workers}"),
+                                  os.path.join(directory, "user.txt"),
+                                  self.tasks_path, workers).load()
+                     for workers in (1, 7)]
+        self.assertEqual(snapshots[1].stats(), snapshots[0].stats())
+        self.assertEqual(snapshots[1].task_index(), snapshots[0].task_index())
+        self.assertEqual(snapshots[1].due_index(), snapshots[0].due_index())
+
+    def test_changed_file_is_recounted(self):
+        load_task_stats(self.tasks_path)
+        with open(self.tasks_path, "ab") as task_info:
+            task_info.write(b"\nuser3, Extra, Appended elsewhere, "
+                            b"1 January 2030, 1 January 2029, No ")
+        self.assertEqual(load_task_stats(self.tasks_path)["total_tasks"],
+                         SAMPLE_TASKS + 1)
+
+if __name__ == "__main__":
+    unittest.main()
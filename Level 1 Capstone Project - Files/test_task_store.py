@@ -0,0 +1,250 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from datetime import date
+from task_manager_functions import TaskStore, SqliteTaskStore, AppendWriter, \
+migrate_to_shards, shard_path, load_sidecar, split_task_line, \
+import_text_files
+from task_generator import generate_sample_data
+
+# Longest a record waits to be committed in the batch tests, and how long
+# they give the timer to commit it
+BATCH_SECONDS = 0.05
+IDLE_SECONDS = 0.5
+
+# Sessions appending at once, the tasks each appends and how many each
+# commits together
+APPENDING_SESSIONS = 6
+APPENDS_PER_SESSION = 100
+APPEND_BATCH_SIZE = 7
+
+def append_tasks(directory, session):
+    """Handles registering a user and assigning tasks to several users in
+    small groups, as a busy session of its own.
+    """
+    with TaskStore(directory, batch_size = APPEND_BATCH_SIZE) as store:
+        store.register_user(f"session{session}", "password")
+        for number in range(APPENDS_PER_SESSION):
+            store.assign_task(("admin", "bob")[number % 2],
+                              f"Task {session}.{number}", "Appended, at once",
+                              "1 January 2030")
+
+TASKS = (b"admin, Register Users, Use the r menu, 10 Oct 2019, "
+         b"20 Oct 2019, No \n"
+         b"bob, Read Reports, Use the s menu, 1 January 2030, "
+         b"2 January 2029, No \n"
+         b"admin, Assign Tasks, Use the a menu, 1 January 2030, "
+         b"12 October 2022, No ")
+
+class TaskStoreTest(unittest.TestCase):
+    """Handles a TaskStore opened on a directory other than the working
+    directory, which must only ever use the files in that directory.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.tasks_path = os.path.join(self.directory, "tasks.txt")
+        with open(os.path.join(self.directory, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n\nbob, password")
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(TASKS)
+
+    def open_store(self):
+        store = TaskStore(self.directory)
+        self.addCleanup(store.close)
+        return store
+
+    def test_sharded_completion(self):
+        migrate_to_shards(self.tasks_path,
+                          os.path.join(self.directory, "tasks"))
+        store = self.open_store()
+        self.assertEqual(store.stats()["completed"], 0)
+
+        self.assertTrue(store.complete_task("admin", 2))
+        self.assertFalse(store.complete_task("admin", 2))
+        self.assertEqual([task[5] for task in store.user_tasks("admin")],
+                         ["No", "Yes"])
+
+        # The shard's statistics are updated in place, not recounted
+        admin_stats = load_sidecar(shard_path(
+            "admin", os.path.join(self.directory, "tasks")) + ".stats")
+        self.assertEqual((admin_stats["completed"],
+                          admin_stats["incomplete"]), (1, 1))
+        task_stats = store.stats()
+        self.assertEqual((task_stats["completed"], task_stats["incomplete"]),
+                         (1, 2))
+
+    def test_registration_keeps_shard_stats(self):
+        shards_path = os.path.join(self.directory, "tasks")
+        migrate_to_shards(self.tasks_path, shards_path)
+        store = self.open_store()
+        self.assertEqual(store.stats()["total_users"], 2)
+        stats_paths = [shard_path(username, shards_path) + ".stats"
+                       for username in ("admin", "bob")]
+        saved = [os.stat(path).st_mtime_ns for path in stats_paths]
+
+        self.assertTrue(store.register_user("carol", "password"))
+        task_stats = store.stats()
+        self.assertEqual((task_stats["total_users"],
+                          task_stats["total_tasks"]), (3, 3))
+        self.assertEqual([os.stat(path).st_mtime_ns for path in stats_paths],
+                         saved)
+
+class BatchCommitTest(unittest.TestCase):
+    """Handles committing a group of records once it has waited
+    batch_seconds, even when nothing else is written after it.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        with open(os.path.join(self.directory, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n")
+
+    def test_idle_writer_commits(self):
+        tasks_path = os.path.join(self.directory, "tasks.txt")
+        writer = AppendWriter(tasks_path, batch_size = 100,
+                              batch_seconds = BATCH_SECONDS)
+        self.addCleanup(writer.close)
+        writer.write(["admin", "Title", "Description", "1 January 2030",
+                      "1 January 2029", "No "])
+        time.sleep(IDLE_SECONDS)
+        self.assertEqual(writer.pending, [])
+        with open(tasks_path, "rb") as task_info:
+            self.assertEqual(task_info.read(), b"admin, Title, Description, "
+                             b"1 January 2030, 1 January 2029, No ")
+
+    def test_idle_database_session_commits(self):
+        store = SqliteTaskStore(self.directory, batch_size = 100,
+                                batch_seconds = BATCH_SECONDS)
+        self.addCleanup(store.close)
+        store.register_user("admin", "adm1n")
+        store.assign_task("admin", "Title", "Description", "1 January 2030")
+        time.sleep(IDLE_SECONDS)
+
+        # Another session can write at once and sees the task
+        connection = sqlite3.connect(os.path.join(self.directory, "tasks.db"),
+                                     timeout = 0)
+        self.addCleanup(connection.close)
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            self.assertEqual(connection.execute(
+                "SELECT title FROM tasks").fetchall(), [("Title",)])
+
+class ConcurrentAppendTest(unittest.TestCase):
+    """Handles several processes appending to the same files at once, which
+    must keep every line whole and every index in step.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.tasks_path = os.path.join(self.directory, "tasks.txt")
+        with open(os.path.join(self.directory, "user.txt"), "wb") as users:
+            users.write(b"admin, adm1n\nbob, password")
+        with open(self.tasks_path, "wb") as task_info:
+            task_info.write(TASKS)
+
+    def append_concurrently(self):
+        context = multiprocessing.get_context("fork")
+        sessions = [context.Process(target = append_tasks,
+                                    args = (self.directory, session))
+                    for session in range(APPENDING_SESSIONS)]
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+        self.assertEqual([session.exitcode for session in sessions],
+                         [0] * APPENDING_SESSIONS)
+
+    def check_tasks(self, task_entries):
+        titles = [task_entry[1] for task_entry in task_entries
+                  if task_entry[1].startswith("Task ")]
+        self.assertEqual(sorted(titles), sorted(
+            f"Task {session}.{number}"
+            for session in range(APPENDING_SESSIONS)
+            for number in range(APPENDS_PER_SESSION)))
+        for task_entry in task_entries:
+            self.assertEqual(len(task_entry), 6)
+
+    def check_store(self):
+        appended = APPENDING_SESSIONS * APPENDS_PER_SESSION
+        total_tasks = 3 + appended
+        with TaskStore(self.directory) as store:
+            task_stats = store.stats()
+            self.assertEqual((task_stats["total_tasks"],
+                              task_stats["total_users"]),
+                             (total_tasks, 2 + APPENDING_SESSIONS))
+            bob_tasks = [task.entry() for task in store.user_tasks("bob")]
+            self.assertEqual(len(bob_tasks), 1 + appended // 2)
+            self.check_tasks([task.entry() for task in store.tasks()])
+            self.assertTrue(store.authenticate("session3", "password"))
+
+    def test_concurrent_appends(self):
+        self.append_concurrently()
+        with open(self.tasks_path, "r", encoding = "utf-8") as task_info:
+            self.check_tasks([split_task_line(line) for line in task_info])
+        self.check_store()
+
+    def test_concurrent_sharded_appends(self):
+        migrate_to_shards(self.tasks_path,
+                          os.path.join(self.directory, "tasks"))
+        self.append_concurrently()
+        self.check_store()
+
+class SqliteParityTest(unittest.TestCase):
+    """Handles the SQLite backend, which must answer every query with the
+    same results as the text files it was imported from.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        generate_sample_data(self.directory, 500, 10)
+        import_text_files(self.directory)
+
+    def query_results(self, store):
+        task_lists = {"tasks": store.tasks(),
+                      "user3": store.user_tasks("user3"),
+                      "zed": store.user_tasks("zed"),
+                      "overdue": store.overdue_tasks(),
+                      "admin overdue": store.overdue_tasks("admin"),
+                      "this week": store.tasks_due_this_week(),
+                      "zed this week": store.tasks_due_this_week("zed"),
+                      "search": store.search_tasks("review report"),
+                      "user2 search": store.search_tasks("plan", "user2")}
+        results = {name: [list(task) for task in tasks]
+                   for name, tasks in task_lists.items()}
+        results.update(overdue_per_user = store.overdue_per_user(),
+                       stats = store.stats())
+        return results
+
+    def change_tasks(self, store):
+        self.assertTrue(store.register_user("Zed", "password"))
+        for due_date in ("1 January 2020", date.today().strftime("%d %B %Y")):
+            store.assign_task("zed", "Review Report", "Plan it", due_date)
+        self.assertTrue(store.complete_task("user3", 2))
+        self.assertTrue(store.complete_task("zed", 1))
+        with self.assertRaises(IndexError):
+            store.complete_task("zed", 3)
+
+    def test_results_match_text_files(self):
+        with TaskStore(self.directory) as text_store, \
+            SqliteTaskStore(self.directory) as sqlite_store:
+            self.assertEqual(self.query_results(sqlite_store),
+                             self.query_results(text_store))
+            for store in (text_store, sqlite_store):
+                self.change_tasks(store)
+            self.assertEqual(self.query_results(sqlite_store),
+                             self.query_results(text_store))
+
+if __name__ == "__main__":
+    unittest.main()
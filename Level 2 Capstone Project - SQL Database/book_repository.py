@@ -0,0 +1,394 @@
+import csv
+import json
+import re
+import sqlite3
+
+# Default location of the ebookstore database
+DATABASE_FILE = "ebookstore.db"
+
+# Creates a 'books' table with pertinent constraints
+BOOKS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {table_name}
+               (
+               id INTEGER PRIMARY KEY,
+               title TEXT UNIQUE,
+               author TEXT,
+               quantity INTEGER
+               )
+               '''
+
+# Full-text index over the title and author of each book, kept in step with
+# the 'books' table by triggers. The prefix indexes let the start of a word
+# match without scanning every indexed word.
+BOOK_SEARCH_SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_search USING fts5(
+        title, author, content = 'books', content_rowid = 'id',
+        prefix = '2 3');
+
+    CREATE TRIGGER IF NOT EXISTS books_search_insert AFTER INSERT ON books
+    BEGIN
+        INSERT INTO books_search(rowid, title, author)
+        VALUES (new.id, new.title, new.author);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS books_search_delete AFTER DELETE ON books
+    BEGIN
+        INSERT INTO books_search(books_search, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS books_search_update
+    AFTER UPDATE OF id, title, author ON books
+    BEGIN
+        INSERT INTO books_search(books_search, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+        INSERT INTO books_search(rowid, title, author)
+        VALUES (new.id, new.title, new.author);
+    END;
+    '''
+
+# Columns the search menu can search by, and the words of a search, split
+# the way the full-text index splits them
+SEARCH_COLUMNS = ("title", "author")
+SEARCH_WORD = re.compile(r"[^\W_]+")
+
+# Books inserted per transaction by the bulk import
+IMPORT_BATCH_SIZE = 50000
+
+# Insert statements used by insert_many() for each way of handling a book
+# whose ID or title already exists
+CONFLICT_STATEMENTS = {
+    "skip": "INSERT OR IGNORE",
+    "replace": "INSERT OR REPLACE",
+    "report": "INSERT",
+}
+
+class Book:
+    '''
+    Defines the Book object class.
+    This class structures the initial dataset and every book the repository
+    returns. __slots__ keeps each instance small and quick to build, as one
+    is made for every row read.
+    '''
+    __slots__ = ("bookid", "title", "author", "quantity")
+
+    def __init__(self, bookid, title, author, quantity):
+        self.bookid = bookid
+        self.title = title
+        self.author = author
+        self.quantity = quantity
+
+    def __repr__(self):
+        return f"Book({self.bookid!r}, {self.title!r}, {self.author!r}, " \
+            f"{self.quantity!r})"
+
+    def values(self):
+        '''
+        Returns the (id, title, author, quantity) row stored for the book.
+        '''
+        return (self.bookid, self.title, self.author, self.quantity)
+
+def book_row(cursor, row):
+    '''
+    Row factory building a Book straight from an (id, title, author,
+    quantity) row.
+    '''
+    return Book(*row)
+
+class DuplicateBookError(Exception):
+    '''
+    Raised when a revised ID or Title already belongs to another book.
+    field names which of the two it was.
+    '''
+    def __init__(self, field):
+        super().__init__(f"The revised {field} already exists for another "
+                         f"book.")
+        self.field = field
+
+def read_book_records(import_path):
+    '''
+    Yields the row number and fields of each book in a CSV file with an
+    id,title,author,quantity header row, or in a JSON Lines file (.jsonl)
+    of objects with those keys. A line that is not valid JSON yields None.
+    '''
+    with open(import_path, newline = "",
+              encoding = "utf-8-sig") as import_file:
+        if import_path.lower().endswith(".jsonl"):
+            for row_number, line in enumerate(import_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    book_record = json.loads(line)
+                except ValueError:
+                    book_record = None
+                yield row_number, book_record
+        else:
+            yield from enumerate(csv.DictReader(import_file), 1)
+
+def book_values(book_record):
+    '''
+    Converts the fields of an imported book into an (id, title, author,
+    quantity) row, raising ValueError if any are missing or invalid.
+    '''
+    try:
+        values = (int(book_record["id"]), book_record["title"],
+                  book_record["author"], int(book_record["quantity"]))
+    except (KeyError, TypeError):
+        raise ValueError("missing or invalid fields")
+    if not isinstance(values[1], str) or not isinstance(values[2], str):
+        raise ValueError("missing or invalid fields")
+    return values
+
+class BookRepository:
+    '''
+    Owns the connection to the ebookstore database and runs every query on
+    the 'books' table, so the menu, imports and any other code share one
+    tested path.
+    Books are returned as Book objects built by the row factory. Each
+    method that writes commits its own transaction, or rolls it back if it
+    fails. The statements come from a few fixed texts, far fewer than the
+    128 that sqlite3 caches by default, so each is prepared once per
+    connection and then only rebound.
+    '''
+    def __init__(self, database_path = DATABASE_FILE):
+        self.connection = sqlite3.connect(database_path)
+
+        # Lets the rows deleted by INSERT OR REPLACE fire the delete
+        # trigger, so they leave the full-text index as well
+        self.connection.execute("PRAGMA recursive_triggers = ON")
+        self.full_text_search = self.create_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def create_tables(self):
+        '''
+        Creates the 'books' table, or migrates one made without its
+        constraints, and the full-text index if this SQLite build includes
+        FTS5, filling it from any books already stored.
+        Returns whether the full-text index can be used.
+        '''
+        with self.connection:
+            self.connection.execute(BOOKS_SCHEMA.format(table_name = "books"))
+        if not self.has_book_constraints():
+            self.migrate_books_table()
+        try:
+            search_index_exists = self.connection.execute('''
+                SELECT name FROM sqlite_master WHERE name = ?''',
+                ("books_search",)).fetchone() is not None
+            self.connection.executescript(BOOK_SEARCH_SCHEMA)
+            if not search_index_exists:
+                with self.connection:
+                    self.connection.execute('''
+                        INSERT INTO books_search(books_search)
+                        VALUES ('rebuild')''')
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def has_book_constraints(self):
+        '''
+        Returns whether the 'books' table makes id its rowid and keeps every
+        title unique. Databases made before those constraints were added
+        have neither, so nothing there stops a duplicate book.
+        '''
+        key_columns = self.connection.execute('''
+            SELECT name, upper(type) FROM pragma_table_info('books')
+            WHERE pk > 0''').fetchall()
+        unique_title = self.connection.execute('''
+            SELECT 1 FROM pragma_index_list('books') AS book_index
+            WHERE book_index."unique" AND NOT book_index.partial
+            AND (SELECT group_concat(name)
+                 FROM pragma_index_info(book_index.name)) = 'title'
+            ''').fetchone()
+        return key_columns == [("id", "INTEGER")] and unique_title is not None
+
+    def migrate_books_table(self):
+        '''
+        Copies the books of a 'books' table made without its constraints
+        into a new table made from BOOKS_SCHEMA, then swaps the two, in one
+        transaction. The full-text index is dropped with the old table, for
+        create_tables() to rebuild.
+        Raises sqlite3.IntegrityError, leaving the old table as it was, if
+        it already holds two books with the same ID or title.
+        '''
+        try:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                self.connection.execute(
+                    BOOKS_SCHEMA.format(table_name = "books_migrated"))
+                self.connection.execute('''
+                    INSERT INTO books_migrated(id, title, author, quantity)
+                    SELECT id, title, author, quantity
+                    FROM books
+                    ORDER BY rowid''')
+                self.connection.execute("DROP TABLE books")
+                self.connection.execute("DROP TABLE IF EXISTS books_search")
+                self.connection.execute('''
+                    ALTER TABLE books_migrated RENAME TO books''')
+        except sqlite3.IntegrityError as e:
+            raise sqlite3.IntegrityError(
+                f"The books table holds duplicate IDs or titles, so it "
+                f"cannot be given unique keys: {e}")
+
+    def select_books(self, query, parameters = ()):
+        '''
+        Runs a query selecting id, title, author and quantity, returning
+        the rows as Book objects.
+        '''
+        cursor = self.connection.cursor()
+        cursor.row_factory = book_row
+        return cursor.execute(query, parameters).fetchall()
+
+    def count(self):
+        '''
+        Returns the number of books stored.
+        '''
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def get(self, book_id):
+        '''
+        Returns the book with an ID, or None if there is none.
+        '''
+        books = self.select_books('''
+            SELECT id, title, author, quantity
+            FROM books
+            WHERE id = ?''', (book_id,))
+        return books[0] if books else None
+
+    def search(self, column, search_text):
+        '''
+        Returns the books whose 'title' or 'author' column matches the
+        search text, best matches first.
+        With the full-text index, each word searched for must match the
+        start of a word in the column, so no table scan is needed. Without
+        it, or for a search with no words, the text is matched anywhere in
+        the column.
+        '''
+        if column not in SEARCH_COLUMNS:
+            raise ValueError(f"Cannot search by {column}.")
+        search_words = SEARCH_WORD.findall(search_text)
+        if self.full_text_search and search_words:
+            return self.select_books('''
+                SELECT books.id, books.title, books.author, books.quantity
+                FROM books_search
+                JOIN books ON books.id = books_search.rowid
+                WHERE books_search MATCH ?
+                ORDER BY books_search.rank''',
+                (" AND ".join(f'{column} : "{word}"*'
+                              for word in search_words),))
+        return self.select_books(f'''
+            SELECT id, title, author, quantity
+            FROM books
+            WHERE {column} LIKE ?''',
+            ('%' + search_text + '%',))
+
+    def insert(self, book):
+        '''
+        Inserts a new book. Raises sqlite3.IntegrityError if its ID or
+        title already exists.
+        '''
+        with self.connection:
+            self.connection.execute('''
+                INSERT INTO books(id, title, author, quantity)
+                VALUES(?,?,?,?)''', book.values())
+
+    def insert_many(self, book_rows, conflict_mode = "report"):
+        '''
+        Inserts (id, title, author, quantity) rows with one executemany in
+        one transaction.
+        conflict_mode handles a book whose ID or title already exists:
+        'skip' keeps the existing book, 'replace' replaces it and 'report'
+        keeps it and lists the row. A plain INSERT stops at the first such
+        book, so for 'report' the rows are then inserted again one at a
+        time to find them.
+        Returns the number of books inserted and a list of (position,
+        error message) pairs for the rows reported.
+        '''
+        insert_statement = f'''
+            {CONFLICT_STATEMENTS[conflict_mode]} INTO books(id, title,
+            author, quantity)
+            VALUES(?,?,?,?)'''
+        book_rows = list(book_rows)
+        try:
+            with self.connection:
+                cursor = self.connection.executemany(insert_statement,
+                                                     book_rows)
+            return cursor.rowcount, []
+        except sqlite3.IntegrityError:
+            if conflict_mode != "report":
+                raise
+
+        inserted = 0
+        conflicts = []
+        with self.connection:
+            for position, values in enumerate(book_rows):
+                try:
+                    self.connection.execute(insert_statement, values)
+                    inserted += 1
+                except sqlite3.IntegrityError as e:
+                    conflicts.append((position, str(e)))
+        return inserted, conflicts
+
+    def update(self, original_id, book):
+        '''
+        Updates every field of a book with one UPDATE statement in its own
+        transaction, leaving the UNIQUE constraints to catch a revised ID
+        or Title that another book already has, instead of checking first.
+        Returns the number of books updated, which is 0 if no book has the
+        original ID. Raises DuplicateBookError for a duplicate ID or Title.
+        '''
+        try:
+            with self.connection:
+                cursor = self.connection.execute('''
+                    UPDATE books
+                    SET id = ?,
+                    title = ?,
+                    author = ?,
+                    quantity = ?
+                    WHERE id = ?''',
+                    (*book.values(), original_id))
+        except sqlite3.IntegrityError as e:
+            # Names the column in the message, e.g. "... failed: books.title"
+            if str(e).endswith("books.id"):
+                raise DuplicateBookError("ID")
+            if str(e).endswith("books.title"):
+                raise DuplicateBookError("Title")
+            raise
+        return cursor.rowcount
+
+    def delete(self, book_id):
+        '''
+        Deletes the book with an ID, returning the number deleted.
+        '''
+        with self.connection:
+            cursor = self.connection.execute('''
+                DELETE FROM books WHERE id = ?''', (book_id,))
+        return cursor.rowcount
+
+    def adjust_quantity(self, book_id, change):
+        '''
+        Adds change, which may be negative, to a book's quantity in one
+        statement, so concurrent adjustments cannot overwrite each other.
+        Returns the new quantity, or None if there is no book with the ID.
+        '''
+        with self.connection:
+            cursor = self.connection.execute('''
+                UPDATE books
+                SET quantity = quantity + ?
+                WHERE id = ?''', (change, book_id))
+            if not cursor.rowcount:
+                return None
+            return self.connection.execute('''
+                SELECT quantity FROM books WHERE id = ?''',
+                (book_id,)).fetchone()[0]
+
+    def close(self):
+        '''
+        Closes the database connection.
+        '''
+        self.connection.close()
@@ -1,18 +1,6 @@
 import sqlite3
-
-db = sqlite3.connect("ebookstore.db")
-cursor = db.cursor()
-
-class Book:
-    '''
-    Defines the Book object class.
-    This class is used to structure the initial dataset.
-    '''
-    def __init__(self, bookid, title, author, quantity):
-        self.bookid = bookid
-        self.title = title
-        self.author = author
-        self.quantity = quantity
+from book_repository import BookRepository, Book, DuplicateBookError, \
+read_book_records, book_values, IMPORT_BATCH_SIZE, CONFLICT_STATEMENTS
 
 # Defines the initial dataset and collects them in a list for insertion
 book1 = Book(3001, "A Tale of Two Cities", "Charles Dickens",
@@ -39,45 +27,72 @@ def menu():
     2. Update Book
     3. Delete Book
     4. Search Books
+    5. Import Books
     0. Exit
         """)
 
+def insert_book_batch(book_batch, conflict_mode, import_counts):
+    '''
+    Inserts a batch of (row number, values) pairs in one transaction,
+    adding to the imported and skipped counts and printing each row the
+    repository reports as conflicting.
+    '''
+    imported, conflicts = repository.insert_many(
+        [values for row_number, values in book_batch], conflict_mode)
+    for position, error in conflicts:
+        row_number, values = book_batch[position]
+        print(f"\nRow {row_number}: Book {values[0]} "
+              f"'{values[1]}' not imported: {error}")
+
+    import_counts["imported"] += imported
+    import_counts["skipped"] += len(book_batch) - imported
+    print(f"\rImported {import_counts['imported']} books...", end = "",
+          flush = True)
+
+def import_books(import_path, conflict_mode):
+    '''
+    Imports every book in a CSV or JSON Lines file in transactions of
+    IMPORT_BATCH_SIZE books, printing a running count.
+    conflict_mode handles a book whose ID or title already exists: 'skip'
+    keeps the existing book, 'replace' replaces it and 'report' keeps it and
+    prints the row.
+    Returns the number of books imported, skipped and rejected as invalid.
+    '''
+    import_counts = {"imported": 0, "skipped": 0, "rejected": 0}
+    book_batch = []
+
+    for row_number, book_record in read_book_records(import_path):
+        try:
+            book_batch.append((row_number, book_values(book_record)))
+        except ValueError as e:
+            print(f"\nRow {row_number}: Invalid book, {e}.")
+            import_counts["rejected"] += 1
+            continue
+
+        if len(book_batch) >= IMPORT_BATCH_SIZE:
+            insert_book_batch(book_batch, conflict_mode, import_counts)
+            book_batch = []
+
+    insert_book_batch(book_batch, conflict_mode, import_counts)
+    return (import_counts["imported"], import_counts["skipped"],
+            import_counts["rejected"])
+
 # --- Table Creation Section ---
 try:
-    # Drop table command used for testing purposes
-    # cursor.execute('''
-    #                DROP TABLE books''')
-
-    # Creates the 'books' table with pertinent constraints
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS books
-                   (
-                   id INTEGER PRIMARY KEY,
-                   title TEXT UNIQUE,
-                   author TEXT,
-                   quantity INTEGER
-                   )
-                   ''')
-    db.commit()
+    # Opens the database, creating the 'books' table and its full-text
+    # index if they do not exist yet, or adding the ID and Title
+    # constraints to a table made without them
+    repository = BookRepository("ebookstore.db")
 
     # --- Initial Data Insertion Section ---
 
-    # Selects all books in the table for validation
-    cursor.execute("SELECT COUNT(*) FROM books")
-    if cursor.fetchone()[0] == 0:
+    # Counts all books in the table for validation
+    if repository.count() == 0:
         print("Populating database with initial book data...")
 
         # Inserts the contents of initial_book_data into the table on startup
-        for book_item in initial_book_data:
-            cursor.execute('''
-                INSERT INTO books(id, title, author, quantity)
-                VALUES(?,?,?,?)''',
-                (book_item.bookid,
-                 book_item.title,
-                 book_item.author,
-                 book_item.quantity))
-
-        db.commit()
+        repository.insert_many([book_item.values()
+                                for book_item in initial_book_data])
         print("Initial book data committed.")
 
     else:
@@ -85,7 +100,6 @@ try:
 
 except sqlite3.Error as e:
     print(f"Error during databse initialization: {e}")
-    db.rollback()
     exit()
 
 # --- Main runtime application ---
@@ -105,31 +119,23 @@ while True:
                 book_new_quantity = int(input("Enter Quantity: "))
 
                 # Inserts the new book into the table
-                cursor.execute('''
-                    INSERT INTO books(id, title, author, quantity)
-                    VALUES(?,?,?,?)''',
-                    (book_new_id,
-                     book_new_title,
-                     book_new_author,
-                     book_new_quantity))
-
-                db.commit()
+                repository.insert(Book(book_new_id,
+                                       book_new_title,
+                                       book_new_author,
+                                       book_new_quantity))
+
                 print(f"\nBook '{book_new_title}' (ID: {book_new_id}) "
                       f"successfully entered.")
 
             except ValueError:
                 print("\nInvalid input. Please ensure ID and Quantity " \
                 "are integers.")
-                db.rollback()
             except sqlite3.IntegrityError as e:
                 print(f"\nError: A book with this ID or Title already exists: {e}")
-                db.rollback()
             except sqlite3.Error as e:
                 print(f"Database error during book entry: {e}")
-                db.rollback()
             except Exception as e:
                 print(f"An unexpected error occured during book entry: {e}")
-                db.rollback()
 
         # --- Update Book Section ---
         if user_input == 2:
@@ -139,10 +145,7 @@ while True:
                 original_id = int(input("Enter Original Book ID: "))
 
                 # Selects the relevant book in the table
-                cursor.execute('''
-                                SELECT id FROM books WHERE id = ?''',
-                                (original_id,))
-                existing_db_book = cursor.fetchone()
+                existing_db_book = repository.get(original_id)
 
                 # Executes if no valid book was selected for validation
                 if not existing_db_book:
@@ -157,47 +160,21 @@ while True:
                 author_update = input("Enter Revised Author: ")
                 quantity_update = int(input("Enter Revised Quantity: "))
 
-                # Selects the relevant book in the table for updating
-                cursor.execute('''
-                    SELECT id FROM books WHERE id = ? AND id != ?''',
-                    (id_update, original_id))
-
-                # Executes if a duplicate id is detected
-                if cursor.fetchone():
-                    print("\nInvalid input. The revised ID already exists " \
-                    "for another book.")
-                    continue
-
-                # Selects the relevant book in the table for updating
-                cursor.execute('''
-                    SELECT title FROM books WHERE title = ? AND id != ?''',
-                    (title_update,
-                     original_id))
-
-                # Executes if a duplicate title is detected
-                if cursor.fetchone():
-                    print("\nInvalid input. The revised Title already exists "
-                    "for another book.")
-                    continue
-
                 # Updates the relevant book with the collected inputs
-                cursor.execute('''
-                    UPDATE books
-                    SET id = ?,
-                    title = ?,
-                    author = ?,
-                    quantity = ?
-                    WHERE id = ?''',
-                    (id_update,
-                     title_update,
-                     author_update,
-                     quantity_update,
-                     original_id))
-
-                db.commit()
+                try:
+                    updated = repository.update(original_id,
+                                                Book(id_update,
+                                                     title_update,
+                                                     author_update,
+                                                     quantity_update))
+
+                # Executes if a duplicate id or title is detected
+                except DuplicateBookError as e:
+                    print(f"\nInvalid input. {e}")
+                    continue
 
                 # Checks if the update operation was successful
-                if cursor.rowcount > 0:
+                if updated > 0:
                     print(f"\nBook with ID {original_id} successfully updated" \
                           f"to ID {id_update}.")
                 # Executes if changes were not made
@@ -208,13 +185,10 @@ while True:
             except ValueError:
                 print("\n Invalid input. Please ensure IDs and quantities are " \
                 "integers.")
-                db.rollback()
             except sqlite3.Error as e:
                 print(f"\nDatabase error during book update: {e}")
-                db.rollback()
             except Exception as e:
                 print(f"\nAn unexpected error occured during book update: {e}")
-                db.rollback()
 
         # --- Delete Book Section ---
         elif user_input == 3:
@@ -224,9 +198,7 @@ while True:
                 book_id_to_delete = int(input("Enter Book ID to delete: "))
 
                 # Selects the relevant book in the table
-                cursor.execute('''SELECT id FROM books WHERE id = ?''',
-                               (book_id_to_delete,))
-                existing_db_book = cursor.fetchone()
+                existing_db_book = repository.get(book_id_to_delete)
 
                 # Executes if no valid book was selected
                 if not existing_db_book:
@@ -235,13 +207,10 @@ while True:
                     continue
 
                 # Deletes the selected book from the table
-                cursor.execute('''DELETE FROM books WHERE id = ?''',
-                               (book_id_to_delete,))
-
-                db.commit()
+                deleted = repository.delete(book_id_to_delete)
 
                 # Checks if the update operation was successful
-                if cursor.rowcount > 0:
+                if deleted > 0:
                     print(f"\nBook with ID {book_id_to_delete}" \
                           f"successfully deleted.")
                 # Executes if changes were not made
@@ -250,14 +219,11 @@ while True:
 
             except ValueError:
                 print("\nInvalid input. Please ensure the ID is an integer.")
-                db.rollback()
             except sqlite3.Error as e:
                 print(f"Database error during book deletion: {e}")
-                db.rollback()
             except Exception as e:
                 print(f"\nAn unexpected error occured during book" \
                       f"deletion: {e}")
-                db.rollback()
 
         # --- Search Books Section ---
         elif user_input == 4:
@@ -274,15 +240,15 @@ while True:
 
                 # Defines a variable for validation check
                 search_query_executed = False
+                search_output = []
 
                 # --- ID Search Section ---
                 if search_category_input == 1:
                     # Collects id input and selects the relevant book
                     search_id = int(input("\nEnter ID: "))
-                    cursor.execute('''
-                                    SELECT id, title, author, quantity
-                                   FROM books
-                                   WHERE id = ?''', (search_id,))
+                    found_book = repository.get(search_id)
+                    if found_book:
+                        search_output = [found_book]
                     # Updates validation bool
                     search_query_executed = True
 
@@ -290,12 +256,8 @@ while True:
                 elif search_category_input == 2:
                     # Collects title input and selects the relevant book
                     search_title = input("\nEnter Title " \
-                    "(Inc. Partial Matches): ")
-                    cursor.execute('''
-                                    SELECT id, title, author, quantity
-                                   FROM books
-                                   WHERE title LIKE ?''',
-                                   ('%' + search_title + '%',))
+                    "(Matches Words by Their Beginning): ")
+                    search_output = repository.search("title", search_title)
                     # Updates validation bool
                     search_query_executed = True
 
@@ -303,12 +265,8 @@ while True:
                 elif search_category_input == 3:
                     # Collects author input and selects the relevant book
                     search_author = input("\nEnter Author " \
-                    "(Inc. Partial Matches): ")
-                    cursor.execute('''
-                                    SELECT id, title, author, quantity
-                                   FROM books
-                                   WHERE author LIKE ?''',
-                                   ('%' + search_author + '%',))
+                    "(Matches Words by Their Beginning): ")
+                    search_output = repository.search("author", search_author)
                     # Updates validation bool
                     search_query_executed = True
 
@@ -322,16 +280,14 @@ while True:
 
                 # Executes if validation check is True
                 if search_query_executed:
-                    search_output = cursor.fetchall()
-
                     # Prints each field for the relevant books
                     if search_output:
                         print("\n--- Search Results ---")
-                        for row in search_output:
-                            print(f"ID: {row[0]}\n"
-                                  f"Title: {row[1]}\n"
-                                  f"Author: {row[2]}\n"
-                                  f"Quantity: {row[3]}\n"
+                        for book_item in search_output:
+                            print(f"ID: {book_item.bookid}\n"
+                                  f"Title: {book_item.title}\n"
+                                  f"Author: {book_item.author}\n"
+                                  f"Quantity: {book_item.quantity}\n"
                                   f"--------------------")
                     # Executes if no valid books are present
                     else:
@@ -346,6 +302,35 @@ while True:
             except Exception as e:
                 print(f"\nAn unexpected error occured during search: {e}")
 
+        # --- Import Books Section ---
+        elif user_input == 5:
+            try:
+                # Collects the file to import and how to handle books that
+                # already exist
+                print("\n--- Import Books ---")
+                import_path = input("Enter CSV or JSON Lines (.jsonl) "
+                                    "File Path: ")
+                conflict_mode = input("If the ID or Title already exists "
+                                      "(skip/replace/report): ").strip().lower()
+
+                # Executes if the conflict handling is not recognised
+                if conflict_mode not in CONFLICT_STATEMENTS:
+                    print("\nInvalid input. Please enter skip, replace or "
+                          "report.")
+                    continue
+
+                imported, skipped, rejected = import_books(import_path,
+                                                           conflict_mode)
+                print(f"\n\nImport complete: {imported} books imported, "
+                      f"{skipped} skipped and {rejected} invalid rows.")
+
+            except OSError as e:
+                print(f"\nError: The import file could not be read: {e}")
+            except sqlite3.Error as e:
+                print(f"\nDatabase error during book import: {e}")
+            except Exception as e:
+                print(f"\nAn unexpected error occured during book import: {e}")
+
         # --- Exit Application Section ---
         elif user_input == 0:
             print("\nExiting Application.")
@@ -358,5 +343,5 @@ while True:
         print(f"\nAn unexpected error occured: {e}")
 
 # Closes the database connection
-db.close()
+repository.close()
 print("Database connection terminated.")
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from book_repository import BookRepository, Book, DuplicateBookError, \
+read_book_records, book_values
+
+# Schema of the 'books' table in databases made before it had constraints
+LEGACY_BOOKS_SCHEMA = '''
+    CREATE TABLE books(
+               id INTEGER,
+               title STRING,
+               author STRING,
+               quantity INTEGER)'''
+
+class LegacyDatabaseTest(unittest.TestCase):
+    '''
+    Opens the repository on a database whose 'books' table has no PRIMARY
+    KEY or UNIQUE constraints, as the shipped ebookstore.db does.
+    '''
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database_path = os.path.join(directory.name, "ebookstore.db")
+
+        connection = sqlite3.connect(self.database_path)
+        connection.execute(LEGACY_BOOKS_SCHEMA)
+        connection.executemany('''
+            INSERT INTO books(id, title, author, quantity)
+            VALUES(?,?,?,?)''',
+            [(3001, "A Tale of Two Cities", "Charles Dickens", 30),
+             (3002, "The Lord of the Rings", "J.R.R Tolkien", 37)])
+        connection.commit()
+        connection.close()
+
+    def open_repository(self):
+        repository = BookRepository(self.database_path)
+        self.addCleanup(repository.close)
+        return repository
+
+    def test_migration_keeps_books(self):
+        repository = self.open_repository()
+        self.assertTrue(repository.has_book_constraints())
+        self.assertEqual(repository.count(), 2)
+        self.assertEqual(repository.get(3002).title, "The Lord of the Rings")
+
+    def test_update_rejects_duplicates(self):
+        repository = self.open_repository()
+        with self.assertRaises(DuplicateBookError) as raised:
+            repository.update(3001, Book(3002, "Dune", "Frank Herbert", 5))
+        self.assertEqual(raised.exception.field, "ID")
+        with self.assertRaises(DuplicateBookError) as raised:
+            repository.update(3001, Book(3001, "The Lord of the Rings",
+                                         "Frank Herbert", 5))
+        self.assertEqual(raised.exception.field, "Title")
+        self.assertEqual(repository.get(3001).title, "A Tale of Two Cities")
+
+    def test_search_joins_books_by_rowid(self):
+        repository = self.open_repository()
+        repository.update(3002, Book(3010, "The Lord of the Rings",
+                                     "J.R.R Tolkien", 37))
+        self.assertEqual([book.bookid for book
+                          in repository.search("title", "lor ring")], [3010])
+        self.assertEqual(repository.search("author", "dick")[0].bookid, 3001)
+
+        query_plan = repository.connection.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT books.id FROM books_search
+            JOIN books ON books.id = books_search.rowid
+            WHERE books_search MATCH 'lord*' ''').fetchall()
+        self.assertNotIn("SCAN books", [step[3] for step in query_plan])
+        repository.connection.execute('''
+            INSERT INTO books_search(books_search)
+            VALUES ('integrity-check')''')
+
+    def test_import_skips_existing_books(self):
+        repository = self.open_repository()
+        imported, conflicts = repository.insert_many(
+            [(3001, "Dune", "Frank Herbert", 5),
+             (3003, "A Tale of Two Cities", "Charles Dickens", 30),
+             (3004, "Emma", "Jane Austen", 4)], "skip")
+        self.assertEqual((imported, conflicts), (1, []))
+        self.assertEqual(repository.count(), 3)
+
+    def test_import_reports_existing_books(self):
+        repository = self.open_repository()
+        imported, conflicts = repository.insert_many(
+            [(3004, "Emma", "Jane Austen", 4),
+             (3002, "Dune", "Frank Herbert", 5)], "report")
+        self.assertEqual(imported, 1)
+        self.assertEqual([position for position, error in conflicts], [1])
+        self.assertEqual(repository.get(3002).title, "The Lord of the Rings")
+
+    def test_import_replaces_existing_books(self):
+        repository = self.open_repository()
+        import_path = os.path.join(os.path.dirname(self.database_path),
+                                   "books.csv")
+        with open(import_path, "w", newline = "") as import_file:
+            import_file.write("id,title,author,quantity\r\n"
+                              "3001,Dune,Frank Herbert,5\r\n")
+        book_rows = [book_values(book_record) for row_number, book_record
+                     in read_book_records(import_path)]
+
+        repository.insert_many(book_rows, "replace")
+        self.assertEqual(repository.count(), 2)
+        self.assertEqual(repository.get(3001).title, "Dune")
+        self.assertEqual([book.bookid for book
+                          in repository.search("title", "dune")], [3001])
+
+    def test_duplicate_books_block_migration(self):
+        connection = sqlite3.connect(self.database_path)
+        connection.execute('''
+            INSERT INTO books(id, title, author, quantity)
+            VALUES(3001, 'Dune', 'Frank Herbert', 5)''')
+        connection.commit()
+        connection.close()
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            BookRepository(self.database_path)
+
+        # The old table is left as it was
+        connection = sqlite3.connect(self.database_path)
+        self.addCleanup(connection.close)
+        self.assertEqual(connection.execute(
+            "SELECT COUNT(*) FROM books").fetchone()[0], 3)
+
+if __name__ == "__main__":
+    unittest.main()